@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
-import psycopg2
+from db_pool import get_connection
+from option_poller import SYMBOLS
+from option_rollups import MAX_POINTS, RAW_ONLY_COLUMNS, fetch_contract_series
 import matplotlib.pyplot as plt
 from datetime import datetime
 
@@ -15,35 +17,20 @@ DB_CONFIG = {
 
 LOT_SIZE = 75  # Each option lot size
 
-# Function to get PostgreSQL connection
+# Function to get PostgreSQL connection (pooled; conn.close() returns it to the pool)
 def get_db_connection():
     try:
-        conn = psycopg2.connect(
-            dbname=DB_CONFIG["dbname"],
-            user=DB_CONFIG["user"],
-            password=DB_CONFIG["password"],
-            host=DB_CONFIG["host"],
-            port=DB_CONFIG["port"],
-        )
-        return conn
+        return get_connection(DB_CONFIG)
     except Exception as e:
         st.error(f"Error connecting to PostgreSQL: {e}")
         return None
 
-# Function to fetch last_price data from PostgreSQL
-def fetch_last_price_data(strike_price, expiry_date, option_type):
-    query = """
-        SELECT timestamp, last_price, open_interest, change_in_open_interest,total_traded_volume, implied_volatility, total_buy_quantity, total_sell_quantity, bid_qty, bid_price, ask_qty, ask_price
-        FROM option_chain
-        WHERE strike_price = %s
-          AND expiry_date = %s
-          AND option_type = %s
-        ORDER BY timestamp DESC;
-    """
+# Function to fetch last_price data from PostgreSQL (raw rows or the rollup that fits max_points)
+def fetch_last_price_data(strike_price, expiry_date, option_type, symbol="NIFTY", max_points=MAX_POINTS):
     conn = get_db_connection()
     if conn:
         try:
-            df = pd.read_sql_query(query, conn, params=(strike_price, expiry_date, option_type))
+            df = fetch_contract_series(conn, symbol, expiry_date, strike_price, option_type, max_points=max_points)
             return df
         except Exception as e:
             st.error(f"Error fetching data: {e}")
@@ -67,9 +54,11 @@ def main():
     st.sidebar.title("Order Placement Options")
 
     # User input for filtering
+    symbol = st.sidebar.selectbox("Select Symbol:", SYMBOLS)
     strike_price = st.sidebar.number_input("Enter Strike Price:", min_value=0.0, value=0.0, step=0.5)
     expiry_date = st.sidebar.date_input("Select Expiry Date:", min_value=datetime(2020, 1, 1))
     option_type = st.sidebar.selectbox("Select Option Type (CE/PE):", ["CE", "PE"])
+    max_points = st.sidebar.number_input("Max Points to Plot:", min_value=10, value=MAX_POINTS, step=50)
     order_type = st.sidebar.selectbox("Order Type (Buy/Sell):", ["Buy", "Sell"])
     entry_price = st.sidebar.number_input("Enter Entry Price:", min_value=0.0, value=0.0, step=0.01)
     num_lots = st.sidebar.number_input("Enter Number of Lots:", min_value=1, value=1, step=1)
@@ -77,9 +66,9 @@ def main():
     # Fetch and display data on button click
     if st.sidebar.button("Place Order and Track P/L"):
         with st.spinner("Fetching data..."):
-            data = fetch_last_price_data(strike_price, expiry_date, option_type)
+            data = fetch_last_price_data(strike_price, expiry_date, option_type, symbol, max_points)
             if data is not None and not data.empty:
-                st.success("Data fetched successfully!")
+                st.success(f"Data fetched successfully! {len(data)} points at {data.attrs['resolution']} resolution.")
                 data["timestamp"] = pd.to_datetime(data["timestamp"])
 
                 # Calculate profit/loss
@@ -87,7 +76,12 @@ def main():
 
                 # Display data in Streamlit
                 st.subheader(f"Profit/Loss for {order_type} Order ({strike_price}, {expiry_date})")
-                st.write(data[["timestamp", "last_price", "open_interest","change_in_open_interest","total_traded_volume", "implied_volatility", "total_buy_quantity",  "total_sell_quantity", "bid_qty", "bid_price", "ask_qty", "ask_price",  "profit_loss"]])
+                # Latest first; at a rollup resolution last_price is the bucket's close and volume is traded within it,
+                # and the order book columns (raw rows only) are left out
+                raw_columns = [column for column in RAW_ONLY_COLUMNS if column in data]
+                if not raw_columns:
+                    st.caption("Open interest change and order book columns are shown at raw resolution (raise Max Points to Plot).")
+                st.write(data[["timestamp", "last_price", "open", "high", "low", "open_interest", "total_traded_volume", "volume", "implied_volatility"] + raw_columns + ["profit_loss"]].iloc[::-1])
 
                 # Plot the profit/loss
                 fig, ax = plt.subplots(figsize=(10, 5))
@@ -0,0 +1,82 @@
+"""
+Kafka producing benchmark: the old per-message produce+flush (one JSON message per
+contract) against produce_snapshot used by option_insert.stream_option_data, which sends
+the whole snapshot as one encoded array buffer.
+
+By default it runs against an in-process stand-in broker that charges one network round
+trip per request, so it runs without Kafka. Pass --broker to measure a real (local) broker:
+
+    python benchmark_kafka.py --contracts 1500 --round-trip-ms 2
+    python benchmark_kafka.py --broker localhost:9092 --topic option_chain_bench
+"""
+import argparse
+import json
+import random
+import time
+
+from kafka_stand_in import StandInBroker
+from option_insert import KAFKA_PRODUCER_CONFIG, produce_snapshot
+from replay_server import synthetic_response
+from snapshot import parse_snapshot
+
+# One JSON message per CE/PE record of a synthetic chain (replay_server's generator)
+def synthetic_messages(num_contracts, timestamp="2025-01-02 10:15:00", seed=0):
+    num_strikes = (num_contracts + 1) // 2
+    records = synthetic_response("NIFTY", num_strikes, 1, random.Random(seed))["optionChainData"]["records"]["data"]
+    messages = [
+        {**record[option_type], "optionType": option_type, "timestamp": timestamp}
+        for record in records for option_type in ("CE", "PE")
+    ]
+    return messages[:num_contracts]
+
+# The previous behaviour: one produce and one synchronous flush per record
+def produce_per_message(producer, messages, topic):
+    start = time.perf_counter()
+    for option_data in messages:
+        producer.produce(topic, value=json.dumps(option_data).encode("utf-8"))
+        producer.flush()
+    return time.perf_counter() - start
+
+def make_producer(args):
+    if args.broker:
+        from confluent_kafka import Producer
+        return Producer({**KAFKA_PRODUCER_CONFIG, "bootstrap.servers": args.broker})
+    return StandInBroker().producer(args.round_trip_ms, KAFKA_PRODUCER_CONFIG["batch.size"])
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-message and whole-snapshot Kafka producing.")
+    parser.add_argument("--contracts", type=int, default=1500, help="CE/PE records per snapshot.")
+    parser.add_argument("--cycles", type=int, default=3, help="Snapshots produced per mode.")
+    parser.add_argument("--round-trip-ms", type=float, default=2.0, help="Stand-in broker round trip.")
+    parser.add_argument("--broker", help="bootstrap.servers of a real broker; the stand-in is used if omitted.")
+    parser.add_argument("--topic", default="option_chain_bench")
+    args = parser.parse_args()
+
+    messages = synthetic_messages(args.contracts)
+    target = args.broker or f"stand-in broker ({args.round_trip_ms} ms round trip)"
+    print(f"{args.contracts} messages per snapshot, {args.cycles} cycles, {target}")
+
+    per_message = [produce_per_message(make_producer(args), messages, args.topic) for _ in range(args.cycles)]
+    # Encoding is part of the measured cycle, as json.dumps is for the per-message mode
+    batched = []
+    for _ in range(args.cycles):
+        start = time.perf_counter()
+        snapshot = parse_snapshot([{message["optionType"]: message} for message in messages], messages[0]["timestamp"])
+        result = produce_snapshot(make_producer(args), snapshot, topic=args.topic)
+        result["seconds"] = time.perf_counter() - start
+        batched.append(result)
+    batched_seconds = [result["seconds"] for result in batched]
+
+    for label, seconds in (("per-message flush", per_message), ("snapshot buffer", batched_seconds)):
+        best = min(seconds)
+        print(f"{label:<18} best {best * 1000:9.1f} ms  {args.contracts / best:12,.0f} contracts/s")
+    print(f"speed-up: {min(per_message) / min(batched_seconds):.1f}x")
+
+    last = batched[-1]
+    print(
+        f"last snapshot: {last['contracts']} contracts in {last['bytes']:,} bytes, {last['delivered']} delivered, "
+        f"{last['failed']} failed, {last['undelivered']} undelivered"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Offline pricing benchmarks for the BS, GBM Monte Carlo and Markov-chain engines.
+
+Builds synthetic NIFTY-like chains and reports throughput, latency percentiles and peak
+memory per engine as JSON, so runs can be compared across commits:
+
+    python benchmark_pricing.py --sizes 100 1000 10000 --output bench.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+import option_ultimate
+import options
+from black_scholes import black_scholes_greeks, implied_volatility
+
+SPOT = 23000.0
+STRIKE_STEP = 50
+EXPIRY_DAYS = (3, 10, 17, 31, 94)  # Weekly and monthly expiries
+RISK_FREE_RATE = 0.01
+
+# Synthetic chain: CE/PE pairs around the spot for every expiry, with a volatility smile
+def build_synthetic_chain(num_contracts, seed=0):
+    rng = np.random.default_rng(seed)
+    strikes_per_expiry = max(-(-num_contracts // (2 * len(EXPIRY_DAYS))), 1)
+    offsets = (np.arange(strikes_per_expiry) - strikes_per_expiry // 2) * STRIKE_STEP
+
+    K = np.tile(np.repeat(SPOT + offsets, 2), len(EXPIRY_DAYS))[:num_contracts]
+    days = np.repeat(EXPIRY_DAYS, 2 * strikes_per_expiry)[:num_contracts]
+    is_call = np.tile([True, False], num_contracts // 2 + 1)[:num_contracts]
+    sigma = 0.12 + 2.0 * np.log(K / SPOT) ** 2 + rng.uniform(-0.01, 0.01, num_contracts)
+    T = days / 365
+    price = black_scholes_greeks(SPOT, K, T, RISK_FREE_RATE, sigma, is_call).fair_value
+
+    return {
+        "S0": np.full(num_contracts, SPOT),
+        "K": K,
+        "T": T,
+        "sigma": sigma,
+        "is_call": is_call,
+        "option_type": np.where(is_call, "call", "put"),
+        "expiry": np.array([f"+{d}d" for d in days]),
+        "price": price,
+        "volume": rng.integers(1_000, 300_000, num_contracts).astype(float),
+        "open_interest": rng.integers(1_000, 100_000, num_contracts).astype(float),
+    }
+
+# Per-contract engines are called once per sampled contract
+def _options_fair_value(chain, i):
+    options.calculate_fair_value(chain["S0"][i], chain["K"][i], chain["T"][i], RISK_FREE_RATE, chain["sigma"][i], chain["option_type"][i])
+
+def _options_mcmc(chain, i, sampler="pseudo"):
+    options.calculate_mcmc_fair_value(
+        chain["S0"][i], chain["K"][i], chain["T"][i], RISK_FREE_RATE, chain["sigma"][i], chain["option_type"][i],
+        volume=chain["volume"][i], open_interest=chain["open_interest"][i], sampler=sampler
+    )
+
+def _ultimate_greeks(chain, i):
+    option_ultimate.calculate_greeks_and_fair_values(
+        chain["S0"][i], chain["K"][i], chain["T"][i], option_ultimate.r, chain["sigma"][i], chain["option_type"][i]
+    )
+
+def _ultimate_mcmc(chain, i, **kwargs):
+    option_ultimate.calculate_mcmc_fair_value(
+        chain["S0"][i], chain["K"][i], chain["T"][i], chain["sigma"][i], chain["option_type"][i], **kwargs
+    )
+
+# Chain engines price every contract in one call
+def _bs_kernel(chain):
+    black_scholes_greeks(chain["S0"], chain["K"], chain["T"], RISK_FREE_RATE, chain["sigma"], chain["is_call"])
+
+def _iv_solver(chain):
+    implied_volatility(chain["price"], chain["S0"], chain["K"], chain["T"], RISK_FREE_RATE, chain["is_call"])
+
+def _options_chain_mcmc(chain):
+    options.mc_cache.clear()  # Measure a cold cache, as on the first snapshot of a cycle
+    for expiry in np.unique(chain["expiry"]):
+        in_expiry = chain["expiry"] == expiry
+        options.calculate_chain_mcmc_fair_values(
+            chain["S0"][in_expiry], chain["K"][in_expiry], chain["T"][in_expiry][0], RISK_FREE_RATE,
+            chain["sigma"][in_expiry], chain["option_type"][in_expiry], chain["volume"][in_expiry],
+            chain["open_interest"][in_expiry]
+        )
+
+def _ultimate_chain_mcmc(chain, **kwargs):
+    option_ultimate.mc_cache.clear()
+    option_ultimate.price_chain_mcmc(
+        "NIFTY", chain["expiry"], chain["S0"], chain["K"], chain["T"], chain["sigma"], chain["is_call"], **kwargs
+    )
+
+PER_CONTRACT_ENGINES = {
+    "options.calculate_fair_value": _options_fair_value,
+    "options.calculate_mcmc_fair_value": _options_mcmc,
+    "options.calculate_mcmc_fair_value[sobol]": lambda chain, i: _options_mcmc(chain, i, sampler="sobol"),
+    "option_ultimate.calculate_greeks_and_fair_values": _ultimate_greeks,
+    "option_ultimate.calculate_mcmc_fair_value": _ultimate_mcmc,
+    "option_ultimate.calculate_mcmc_fair_value[fixed]": lambda chain, i: _ultimate_mcmc(chain, i, tolerance=None),
+    "option_ultimate.calculate_mcmc_fair_value[sobol]": lambda chain, i: _ultimate_mcmc(chain, i, sampler="sobol"),
+}
+
+CHAIN_ENGINES = {
+    "black_scholes.black_scholes_greeks": _bs_kernel,
+    "black_scholes.implied_volatility": _iv_solver,
+    "options.calculate_chain_mcmc_fair_values": _options_chain_mcmc,
+    "option_ultimate.price_chain_mcmc": _ultimate_chain_mcmc,
+    "option_ultimate.price_chain_mcmc[sobol]": lambda chain: _ultimate_chain_mcmc(chain, sampler="sobol"),
+}
+
+def _latency_summary(latencies):
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        "mean": float(latencies_ms.mean()),
+        "p50": float(np.percentile(latencies_ms, 50)),
+        "p90": float(np.percentile(latencies_ms, 90)),
+        "p99": float(np.percentile(latencies_ms, 99)),
+        "max": float(latencies_ms.max()),
+    }
+
+# Peak Python-heap (including NumPy buffers) allocated while running fn once
+def _peak_memory_mb(fn):
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    finally:
+        tracemalloc.stop()
+
+def run_per_contract_engine(name, engine, chain, max_contracts, seed=0):
+    num_contracts = len(chain["K"])
+    sample = np.random.default_rng(seed).choice(num_contracts, min(max_contracts, num_contracts), replace=False)
+    latencies = []
+    for i in sample:
+        start = time.perf_counter()
+        engine(chain, i)
+        latencies.append(time.perf_counter() - start)
+
+    total = sum(latencies)
+    return {
+        "engine": name,
+        "kind": "per_contract",
+        "num_contracts": num_contracts,
+        "contracts_priced": len(sample),
+        "total_seconds": total,
+        "throughput_contracts_per_sec": len(sample) / total if total else None,
+        "latency_ms": _latency_summary(latencies),
+        "peak_memory_mb": _peak_memory_mb(lambda: engine(chain, sample[0])),
+    }
+
+def run_chain_engine(name, engine, chain, repeats):
+    num_contracts = len(chain["K"])
+    engine(chain)  # Warm-up (imports, lazily built tables)
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        engine(chain)
+        latencies.append(time.perf_counter() - start)
+
+    total = sum(latencies)
+    return {
+        "engine": name,
+        "kind": "chain",
+        "num_contracts": num_contracts,
+        "contracts_priced": num_contracts * repeats,
+        "total_seconds": total,
+        "throughput_contracts_per_sec": num_contracts * repeats / total if total else None,
+        "latency_ms": _latency_summary(latencies),
+        "peak_memory_mb": _peak_memory_mb(lambda: engine(chain)),
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def run_benchmarks(sizes, repeats=5, max_per_contract=200, engine_filter=None):
+    selected = lambda name: not engine_filter or any(pattern in name for pattern in engine_filter)
+    results = []
+    for size in sizes:
+        chain = build_synthetic_chain(size)
+        for name, engine in PER_CONTRACT_ENGINES.items():
+            if selected(name):
+                print(f"[{size}] {name}")
+                results.append(run_per_contract_engine(name, engine, chain, max_per_contract))
+        for name, engine in CHAIN_ENGINES.items():
+            if selected(name):
+                print(f"[{size}] {name}")
+                results.append(run_chain_engine(name, engine, chain, repeats))
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "settings": {"sizes": sizes, "repeats": repeats, "max_per_contract": max_per_contract},
+        "results": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the option pricing engines on synthetic chains.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="Contracts per chain.")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per chain engine.")
+    parser.add_argument("--max-per-contract", type=int, default=200,
+                        help="Contracts sampled for per-contract engines (the slow MC engines are not run on every contract).")
+    parser.add_argument("--engines", nargs="*", help="Only run engines whose name contains one of these substrings.")
+    parser.add_argument("--output", default="pricing_benchmark.json", help="JSON results file.")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.sizes, args.repeats, args.max_per_contract, args.engines)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for result in report["results"]:
+        print(
+            f"{result['engine']:<55} n={result['num_contracts']:<6} "
+            f"{result['throughput_contracts_per_sec']:>12,.0f} contracts/s  "
+            f"p50={result['latency_ms']['p50']:.3f} ms  p99={result['latency_ms']['p99']:.3f} ms  "
+            f"peak={result['peak_memory_mb']:.1f} MB"
+        )
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Parse+transform time and memory per snapshot: the previous per-contract dict handling
+(flatten and mutate every CE/PE dict, json.dumps each one for Kafka, .get each column for
+the DB row, strptime each expiry for pricing) against parse_snapshot's structured array,
+encode_snapshot and snapshot_rows.
+
+    python benchmark_snapshot_parse.py --strikes 200 --expiries 8
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from datetime import datetime
+
+from option_store import OPTION_CHAIN_COLUMNS
+from replay_server import synthetic_response
+from snapshot import FEED_FIELDS, encode_snapshot, parse_snapshot, snapshot_rows
+
+FEED_KEYS = {field: key for field, key, _ in FEED_FIELDS}
+
+# Encoded response body of a synthetic chain (replay_server's generator)
+def synthetic_body(num_strikes, num_expiries, seed=0):
+    return json.dumps(synthetic_response("NIFTY", num_strikes, num_expiries, random.Random(seed))).encode("utf-8")
+
+# The previous handling of one snapshot
+def transform_dicts(data, timestamp, symbol):
+    messages = []
+    for record in data:
+        for option_type in ["CE", "PE"]:
+            if option_type in record:
+                option_data = record[option_type]
+                option_data["optionType"] = option_type
+                option_data["timestamp"] = timestamp
+                option_data["symbol"] = symbol
+                messages.append(option_data)
+    kafka_values = [json.dumps(option_data).encode("utf-8") for option_data in messages]
+    keys = {"expiry_date": "expiryDate", "option_type": "optionType", "timestamp": "timestamp", "symbol": "symbol", **FEED_KEYS}
+    db_rows = [tuple(option_data.get(keys[column]) for column in OPTION_CHAIN_COLUMNS) for option_data in messages]
+    now = datetime.now()
+    pricing_inputs = [
+        (option_data.get("underlyingValue"), option_data["strikePrice"],
+         max((datetime.strptime(option_data["expiryDate"], "%d-%b-%Y") - now).days / 365, 0),
+         (option_data.get("impliedVolatility") or 0) / 100)
+        for option_data in messages
+    ]
+    return messages, kafka_values, db_rows, pricing_inputs
+
+def transform_columnar(data, timestamp, symbol):
+    snapshot = parse_snapshot(data, timestamp, symbol)
+    return snapshot, encode_snapshot(snapshot), snapshot_rows(snapshot, OPTION_CHAIN_COLUMNS)
+
+def measure(transform, body, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        transform(json.loads(body)["optionChainData"]["records"]["data"], "2025-01-02 10:15:00", "NIFTY")
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+# Memory retained per snapshot: what stays alive once it is parsed (the decoded dicts, or the array)
+def retained_bytes(transform, body):
+    tracemalloc.start()
+    data = json.loads(body)["optionChainData"]["records"]["data"]
+    kept = transform(data, "2025-01-02 10:15:00", "NIFTY")[0]  # The messages, or the snapshot
+    del data
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return size
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark snapshot parsing and transformation.")
+    parser.add_argument("--strikes", type=int, default=200, help="Strikes per expiry.")
+    parser.add_argument("--expiries", type=int, default=8)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    body = synthetic_body(args.strikes, args.expiries)
+    contracts = 2 * args.strikes * args.expiries
+    print(f"{contracts} contracts per snapshot, {len(body) / 1e6:.2f} MB response, best of {args.repeats}")
+
+    decode = measure(lambda data, timestamp, symbol: None, body, args.repeats)
+    results = {}
+    for label, transform in (("dicts", transform_dicts), ("columnar", transform_columnar)):
+        seconds = measure(transform, body, args.repeats) - decode
+        results[label] = (seconds, retained_bytes(transform, body))
+    print(f"json.loads alone: {decode * 1000:.1f} ms")
+    for label, (seconds, size) in results.items():
+        print(f"{label:<9} transform {seconds * 1000:8.1f} ms  retained {size / 1e6:7.2f} MB  ({size / contracts:,.0f} B/contract)")
+    print(
+        f"speed-up: {results['dicts'][0] / results['columnar'][0]:.1f}x, "
+        f"memory: {results['dicts'][1] / results['columnar'][1]:.1f}x smaller"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Per-cycle database time for one option chain snapshot: the old per-record upsert (one
+connection and one commit per row) against write_snapshot's single-transaction methods.
+
+Writes into a scratch copy of option_insert's option_chain table (dropped afterwards):
+
+    python benchmark_snapshot_write.py --contracts 1500 --dbname optiondb --host localhost
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import psycopg2
+
+from option_store import OPTION_CHAIN_COLUMNS, OPTION_CHAIN_KEY
+from snapshot_writer import write_snapshot
+
+BENCH_TABLE = "option_chain_write_bench"
+
+def synthetic_rows(num_contracts, timestamp):
+    rows = []
+    for i in range(num_contracts):
+        values = {
+            "strike_price": 22000 + 50 * (i // 2), "expiry_date": "09-Jan-2025", "option_type": "CE" if i % 2 == 0 else "PE",
+            "open_interest": 1200, "change_in_open_interest": -35, "pchange_in_open_interest": -2.83,
+            "total_traded_volume": 48213, "implied_volatility": 13.42, "last_price": 118.5, "change": -4.2,
+            "p_change": -3.42, "total_buy_quantity": 81250, "total_sell_quantity": 64300, "bid_qty": 75,
+            "bid_price": 118.3, "ask_qty": 150, "ask_price": 118.65, "underlying_value": 23050.35,
+            "timestamp": timestamp, "symbol": "NIFTY",
+        }
+        rows.append(tuple(values[column] for column in OPTION_CHAIN_COLUMNS))
+    return rows
+
+# The previous behaviour: a new connection, one upsert and one commit per record
+def write_per_record(db_config, columns, rows):
+    update_columns = [column for column in columns if column not in OPTION_CHAIN_KEY]
+    query = (
+        f"INSERT INTO {BENCH_TABLE} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON CONFLICT ({', '.join(OPTION_CHAIN_KEY)}) DO UPDATE SET "
+        + ", ".join(f"{column} = EXCLUDED.{column}" for column in update_columns)
+    )
+    start = time.perf_counter()
+    for row in rows:
+        conn = psycopg2.connect(**db_config)
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(query, row)
+            conn.commit()
+        finally:
+            conn.close()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-snapshot option_chain writes.")
+    parser.add_argument("--contracts", type=int, default=1500, help="Rows per snapshot.")
+    parser.add_argument("--cycles", type=int, default=3, help="Snapshots written per method.")
+    parser.add_argument("--dbname", default="optiondb")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5432)
+    args = parser.parse_args()
+    db_config = {"dbname": args.dbname, "user": args.user, "password": args.password, "host": args.host, "port": args.port}
+
+    columns = list(OPTION_CHAIN_COLUMNS)
+    update_columns = [column for column in columns if column not in OPTION_CHAIN_KEY]
+    conn = psycopg2.connect(**db_config)
+    base_time = datetime(2025, 1, 2, 9, 15)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+            cursor.execute(f"""
+                CREATE TABLE {BENCH_TABLE} (
+                    symbol VARCHAR(20) NOT NULL, strike_price NUMERIC NOT NULL, expiry_date DATE NOT NULL,
+                    option_type VARCHAR(2) NOT NULL, timestamp TIMESTAMP NOT NULL,
+                    {', '.join(f'{column} NUMERIC' for column in columns if column not in OPTION_CHAIN_KEY)},
+                    PRIMARY KEY ({', '.join(OPTION_CHAIN_KEY)})
+                )""")
+        conn.commit()
+
+        timings = {"per-record": [], "values": [], "copy": []}
+        for cycle in range(args.cycles):
+            for offset, method in enumerate(timings):
+                timestamp = (base_time + timedelta(minutes=3 * cycle + offset)).strftime("%Y-%m-%d %H:%M:%S")
+                rows = synthetic_rows(args.contracts, timestamp)
+                if method == "per-record":
+                    timings[method].append(write_per_record(db_config, columns, rows))
+                else:
+                    result = write_snapshot(conn, BENCH_TABLE, columns, rows, OPTION_CHAIN_KEY, update_columns, method=method)
+                    timings[method].append(result["seconds"])
+
+        print(f"{args.contracts} rows per snapshot, best of {args.cycles} cycles")
+        baseline = min(timings["per-record"])
+        for method, seconds in timings.items():
+            best = min(seconds)
+            print(f"{method:<11} {best * 1000:9.1f} ms  {args.contracts / best:10,.0f} rows/s  {baseline / best:6.1f}x")
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+        conn.commit()
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+from collections import namedtuple
+
+import numpy as np
+from scipy.special import ndtr
+
+DAYS_IN_YEAR = 365  # Used to normalize Theta calculation
+SQRT_2PI = np.sqrt(2 * np.pi)
+
+CALL_LABELS = ("CE", "CALL", "C")
+PUT_LABELS = ("PE", "PUT", "P")
+
+Greeks = namedtuple("Greeks", ["delta", "gamma", "vega", "theta", "rho", "fair_value"])
+
+# Map CE/PE (or call/put) labels to a boolean is_call array
+def option_type_flags(option_type):
+    """
+    Args:
+        option_type (str or array-like): "CE"/"PE", "call"/"put" (case-insensitive),
+            or booleans that are already call flags.
+
+    Returns:
+        np.ndarray: True for calls, False for puts.
+    """
+    labels = np.asarray(option_type)
+    if labels.dtype == bool:
+        return labels
+    labels = np.char.upper(labels.astype(str))
+    is_call = np.isin(labels, CALL_LABELS)
+    if not np.all(is_call | np.isin(labels, PUT_LABELS)):
+        raise ValueError("Invalid option type. Use 'CE'/'call' for Call or 'PE'/'put' for Put.")
+    return is_call
+
+# Black-Scholes Greeks and fair value for a whole option chain in one call
+def black_scholes_greeks(S, K, T, r, sigma, is_call):
+    """
+    Array-in/array-out Black-Scholes kernel. d1/d2 are computed once per contract
+    and every output is derived from them. Inputs broadcast against each other.
+
+    Args:
+        S (array-like): Underlying asset price.
+        K (array-like): Strike price.
+        T (array-like): Time to expiration in years.
+        r (array-like): Risk-free rate (e.g., 0.05 for 5%).
+        sigma (array-like): Implied volatility (decimal form).
+        is_call (array-like): True for calls, False for puts (see option_type_flags).
+
+    Returns:
+        Greeks: delta, gamma, vega (per 1% vol), theta (per day), rho and fair value.
+        Contracts with a non-positive S, K, T or sigma get NaN in every field.
+    """
+    S, K, T, r, sigma = (np.asarray(x, dtype=float) for x in (S, K, T, r, sigma))
+    sign = np.where(np.asarray(is_call, dtype=bool), 1.0, -1.0)
+    S, K, T, r, sigma, sign = np.broadcast_arrays(S, K, T, r, sigma, sign)
+
+    valid = (S > 0) & (K > 0) & (T > 0) & (sigma > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sqrt_T = np.sqrt(T)
+        sigma_sqrt_T = sigma * sqrt_T
+        d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / sigma_sqrt_T
+        d2 = d1 - sigma_sqrt_T
+
+        pdf_d1 = np.exp(-0.5 * d1 ** 2) / SQRT_2PI
+        cdf_d1 = ndtr(sign * d1)  # N(d1) for calls, N(-d1) for puts
+        cdf_d2 = ndtr(sign * d2)  # N(d2) for calls, N(-d2) for puts
+        discounted_K = K * np.exp(-r * T)
+
+        delta = sign * cdf_d1
+        gamma = pdf_d1 / (S * sigma_sqrt_T)
+        vega = S * pdf_d1 * sqrt_T / 100  # Vega is reported per 1% change in volatility
+        theta = (-S * pdf_d1 * sigma / (2 * sqrt_T) - sign * r * discounted_K * cdf_d2) / DAYS_IN_YEAR
+        rho = sign * discounted_K * T * cdf_d2
+        fair_value = sign * (S * cdf_d1 - discounted_K * cdf_d2)
+
+    return Greeks(*(np.where(valid, out, np.nan) for out in (delta, gamma, vega, theta, rho, fair_value)))
+
+# Implied volatility for a whole option chain at once: Newton steps safeguarded by bisection
+def implied_volatility(price, S, K, T, r, is_call, tol=1e-6, max_iter=100, lower=1e-4, upper=5.0):
+    """
+    Every contract keeps a bracket [lo, hi] around its root. A Newton step is taken when it
+    stays inside the bracket and bisection otherwise, so each contract converges even where
+    vega is tiny. The starting point is the Corrado-Miller approximation.
+
+    Args:
+        price (array-like): Observed option price (last price or bid/ask mid).
+        S, K, T, r (array-like): Underlying price, strike, years to expiry and risk-free rate.
+        is_call (array-like): True for calls, False for puts (see option_type_flags).
+        tol (float): Volatility tolerance, on the Newton step and on the bracket width.
+        max_iter (int): Maximum iterations.
+        lower, upper (float): Volatility search bounds (decimal form).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Implied volatilities (NaN where not converged) and
+        per-contract convergence flags.
+    """
+    price, S, K, T, r = (np.asarray(x, dtype=float) for x in (price, S, K, T, r))
+    price, S, K, T, r, is_call = np.broadcast_arrays(price, S, K, T, r, np.asarray(is_call, dtype=bool))
+    sigma = np.full(price.shape, np.nan)
+    converged = np.zeros(price.shape, dtype=bool)
+
+    # Prices must lie inside the no-arbitrage bounds for a volatility to exist
+    with np.errstate(invalid="ignore", over="ignore"):
+        discounted_K = K * np.exp(-r * T)
+        call_price = np.where(is_call, price, price + S - discounted_K)  # Put-call parity
+        active = (S > 0) & (K > 0) & (T > 0) & (call_price > np.maximum(S - discounted_K, 0)) & (call_price < S)
+    if not active.any():
+        return sigma, converged
+
+    idx = np.flatnonzero(active)
+    S, K, T, r, is_call, price = S[idx], K[idx], T[idx], r[idx], is_call[idx], price[idx]
+    discounted_K, call_price = discounted_K[idx], call_price[idx]
+
+    # Corrado-Miller initial guess, clipped into the search bounds
+    half_gap = 0.5 * (S - discounted_K)
+    with np.errstate(invalid="ignore"):
+        root = np.sqrt(np.maximum((call_price - half_gap) ** 2 - (S - discounted_K) ** 2 / np.pi, 0))
+    guess = np.sqrt(2 * np.pi / T) / (S + discounted_K) * (call_price - half_gap + root)
+    guess = np.clip(np.nan_to_num(guess, nan=0.2), lower, upper)
+
+    lo, hi = np.full(idx.size, lower), np.full(idx.size, upper)
+    solving = np.ones(idx.size, dtype=bool)
+    done = np.zeros(idx.size, dtype=bool)
+    for _ in range(max_iter):
+        greeks = black_scholes_greeks(S[solving], K[solving], T[solving], r[solving], guess[solving], is_call[solving])
+        diff = greeks.fair_value - price[solving]
+        vega = greeks.vega * 100  # Per unit of volatility
+
+        current = guess[solving]
+        lo[solving] = np.where(diff < 0, current, lo[solving])
+        hi[solving] = np.where(diff > 0, current, hi[solving])
+        finished = (np.abs(diff) <= tol * vega) | (hi[solving] - lo[solving] < tol)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = current - diff / vega
+        inside = np.isfinite(newton) & (newton > lo[solving]) & (newton < hi[solving])
+        guess[solving] = np.where(finished, current, np.where(inside, newton, 0.5 * (lo[solving] + hi[solving])))
+
+        positions = np.flatnonzero(solving)
+        done[positions[finished]] = True
+        solving[positions[finished]] = False
+        if not solving.any():
+            break
+
+    sigma[idx[done]] = guess[done]
+    converged[idx[done]] = True
+    return sigma, converged
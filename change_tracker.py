@@ -0,0 +1,58 @@
+import threading
+
+# Last persisted values per contract, used to write only contracts that changed
+class ChangeTracker:
+    """
+    Rows are plain tuples laid out as `columns`. A row is "changed" when any of its
+    compare_columns differs from the last row committed for the same key_columns (or the
+    contract has not been seen yet). State is only updated by commit(), after the write
+    succeeded, so a failed write is retried in full on the next snapshot.
+    """
+
+    def __init__(self, columns, key_columns, compare_columns):
+        self.columns = list(columns)
+        self._key_positions = [self.columns.index(column) for column in key_columns]
+        self._value_positions = [self.columns.index(column) for column in compare_columns]
+        self._last = {}
+        self._lock = threading.Lock()
+        self.rows_seen = 0
+        self.rows_changed = 0
+
+    def _key(self, row):
+        return tuple(row[i] for i in self._key_positions)
+
+    def _values(self, row):
+        return tuple(row[i] for i in self._value_positions)
+
+    # Rows are compared in order, so a batch may hold several snapshots of the same contract
+    def changed_rows(self, rows):
+        with self._lock:
+            pending = {}
+            changed = []
+            for row in rows:
+                key, values = self._key(row), self._values(row)
+                if pending.get(key, self._last.get(key)) != values:
+                    changed.append(row)
+                pending[key] = values
+            self.rows_seen += len(rows)
+            self.rows_changed += len(changed)
+        return changed
+
+    def commit(self, rows):
+        with self._lock:
+            for row in rows:
+                self._last[self._key(row)] = self._values(row)
+
+    # Forget all contracts (e.g. when another process may have written them since)
+    def reset(self):
+        with self._lock:
+            self._last.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "contracts": len(self._last),
+                "rows_seen": self.rows_seen,
+                "rows_changed": self.rows_changed,
+                "change_ratio": self.rows_changed / self.rows_seen if self.rows_seen else 0.0,
+            }
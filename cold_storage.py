@@ -0,0 +1,299 @@
+"""
+Parquet cold storage for option_chain history.
+
+Expiry partitions that option_partitions has detached (RETENTION_DAYS past expiry) are
+exported to COLD_STORAGE_DIR as a hive-partitioned Parquet dataset:
+
+    symbol=NIFTY/expiry_date=2025-01-09/trade_date=2025-01-06/option_chain_p20250109-0.parquet
+
+Rows in each file are sorted by contract (strike_price, option_type) and timestamp and
+written in row groups with min/max statistics, so a read of one contract skips every
+directory of other symbols, expiries and days and every row group of other strikes. The
+detached table is dropped once the files hold all of its rows.
+
+fetch_history reads a symbol's expiry (optionally one contract, a strike range and a time
+range) from the Parquet files (memory-mapped) and option_chain together, so analysis pages
+do not need to know where the rows live. The rollups (option_rollups) are never archived.
+
+    python cold_storage.py archive [--retention-days 30] [--keep-tables]
+    python cold_storage.py list
+"""
+import argparse
+import os
+import tempfile
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+from psycopg2 import sql
+
+from option_partitions import RETENTION_DAYS, TABLE_NAME, detach_expired_partitions
+
+# Constants
+COLD_STORAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cold_storage", TABLE_NAME)
+MAX_ROWS_PER_GROUP = 65_536  # A few strikes of one day per row group
+MIN_ROWS_PER_GROUP = 16_384
+PARTITION_SCHEMA = pa.schema([("symbol", pa.string()), ("expiry_date", pa.date32()), ("trade_date", pa.date32())])
+# Columns stored in the files, sort key first; symbol, expiry_date and trade_date are in the path
+FILE_SCHEMA = pa.schema([
+    ("strike_price", pa.float64()),
+    ("option_type", pa.string()),
+    ("timestamp", pa.timestamp("us")),
+    ("open_interest", pa.int64()),
+    ("change_in_open_interest", pa.int64()),
+    ("pchange_in_open_interest", pa.float64()),
+    ("total_traded_volume", pa.int64()),
+    ("implied_volatility", pa.float64()),
+    ("last_price", pa.float64()),
+    ("change", pa.float64()),
+    ("p_change", pa.float64()),
+    ("total_buy_quantity", pa.int64()),
+    ("total_sell_quantity", pa.int64()),
+    ("bid_qty", pa.int64()),
+    ("bid_price", pa.float64()),
+    ("ask_qty", pa.int64()),
+    ("ask_price", pa.float64()),
+    ("underlying_value", pa.float64()),
+])
+SORT_KEY = ["strike_price", "option_type", "timestamp"]
+HISTORY_COLUMNS = ["symbol", "expiry_date"] + FILE_SCHEMA.names
+
+def _partitioning(schema=PARTITION_SCHEMA):
+    return ds.partitioning(schema, flavor="hive")
+
+def _file_format():
+    return ds.ParquetFileFormat()
+
+# Detached expiry partitions of option_chain (ordinary tables named like its partitions)
+def list_detached_partitions(conn, table=TABLE_NAME):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname
+            FROM pg_class c
+            WHERE c.relkind = 'r' AND c.relname ~ %s
+              AND NOT EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhrelid = c.oid)
+            ORDER BY c.relname
+            """,
+            (f"^{table}_p[0-9]{{8}}$",),
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    conn.commit()
+    return names
+
+# Write one partition table to the Parquet dataset
+def export_partition(conn, name, root=COLD_STORAGE_DIR):
+    """
+    The table is copied out as CSV to a temporary file (not memory) in export order and
+    streamed into the dataset, replacing any files a previous export of the same
+    symbol/expiry/day directories left behind.
+
+    Args:
+        conn: psycopg2 connection.
+        name (str): Table holding one expiry's rows, e.g. option_chain_p20250109.
+        root (str): Dataset directory.
+
+    Returns:
+        tuple[int, int]: Rows copied out of PostgreSQL and rows written to Parquet.
+    """
+    # Floats as PostgreSQL prints them (a REAL as 118.3, like a query returns it), and
+    # timestamps as IST wall-clock times (the files' timestamps have no time zone)
+    casts = {pa.int64(): "::bigint", pa.string(): "::text", pa.timestamp("us"): "::timestamp"}
+    select_list = sql.SQL(", ").join(
+        [sql.Identifier("symbol"), sql.Identifier("expiry_date"), sql.SQL("timestamp::timestamp::date AS trade_date")]
+        + [sql.SQL("{}{}").format(sql.Identifier(field.name), sql.SQL(casts.get(field.type, ""))) for field in FILE_SCHEMA]
+    )
+    query = sql.SQL("COPY (SELECT {} FROM {} ORDER BY symbol, trade_date, {}) TO STDOUT WITH (FORMAT csv, HEADER)").format(
+        select_list, sql.Identifier(name), sql.SQL(", ").join(map(sql.Identifier, SORT_KEY))
+    )
+    written = []
+    with tempfile.TemporaryFile() as spool:
+        with conn.cursor() as cursor:
+            cursor.copy_expert(query, spool)
+            copied = cursor.rowcount
+        conn.commit()
+        if not copied:
+            return 0, 0
+        spool.seek(0)
+        schema = pa.schema(list(PARTITION_SCHEMA) + list(FILE_SCHEMA))
+        reader = pa_csv.open_csv(
+            spool, convert_options=pa_csv.ConvertOptions(column_types=schema, include_columns=schema.names)
+        )
+        ds.write_dataset(
+            reader, root, format="parquet", partitioning=_partitioning(),
+            basename_template=f"{name}-{{i}}.parquet",
+            file_options=_file_format().make_write_options(
+                compression="zstd", write_statistics=True,
+                sorting_columns=[pq.SortingColumn(FILE_SCHEMA.get_field_index(column)) for column in SORT_KEY],
+            ),
+            min_rows_per_group=MIN_ROWS_PER_GROUP, max_rows_per_group=MAX_ROWS_PER_GROUP,
+            use_threads=False,  # Keeps the rows in export order
+            existing_data_behavior="delete_matching",
+            file_visitor=lambda written_file: written.append(written_file.metadata.num_rows),
+        )
+    return copied, sum(written)
+
+# Detach partitions past retention, export every detached partition, and drop the exported tables
+def archive_partitions(conn, root=COLD_STORAGE_DIR, retention_days=RETENTION_DAYS, drop=True, progress=print):
+    detach_expired_partitions(conn, retention_days)
+    archived = []
+    for name in list_detached_partitions(conn):
+        copied, written = export_partition(conn, name, root)
+        if copied != written:
+            # Leave the table for the next run rather than lose rows
+            print(f"Error archiving {name}: {copied:,} rows copied but {written:,} written")
+            continue
+        if drop:
+            with conn.cursor() as cursor:
+                cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(name)))
+            conn.commit()
+        archived.append(name)
+        if progress:
+            progress(f"Archived {name}: {written:,} rows{'' if drop else ' (table kept)'}")
+    return archived
+
+def _expiry_dir(symbol, expiry_date, root=COLD_STORAGE_DIR):
+    return os.path.join(root, f"symbol={quote(symbol, safe='')}", f"expiry_date={expiry_date:%Y-%m-%d}")
+
+# Cold rows of one symbol's expiry; an empty frame if nothing was archived
+def read_cold(symbol, expiry_date, strike_price=None, option_type=None, strike_range=None, start=None, end=None,
+              columns=None, root=COLD_STORAGE_DIR):
+    """
+    Only the expiry's directory is listed; the day directories outside [start, end] and the
+    row groups whose statistics exclude the strike/type/time filters are never read.
+
+    Args:
+        symbol (str), expiry_date (date): The expiry to read.
+        strike_price (float, optional), option_type (str, optional): One contract.
+        strike_range (tuple, optional): (low, high) strikes, inclusive.
+        start, end (datetime, optional): Time range, inclusive.
+        columns (list[str], optional): HISTORY_COLUMNS to return (all by default).
+        root (str): Dataset directory.
+
+    Returns:
+        pandas.DataFrame: Rows in file order (by contract, then timestamp).
+    """
+    columns = columns or HISTORY_COLUMNS
+    directory = _expiry_dir(symbol, expiry_date, root)
+    if not os.path.isdir(directory):
+        return pd.DataFrame(columns=columns)
+    dataset = ds.dataset(
+        directory, format=_file_format(), partitioning=_partitioning(pa.schema([PARTITION_SCHEMA.field("trade_date")])),
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+    )
+    conditions = []
+    if strike_price is not None:
+        conditions.append(ds.field("strike_price") == float(strike_price))
+    if option_type is not None:
+        conditions.append(ds.field("option_type") == option_type)
+    if strike_range is not None:
+        conditions.append((ds.field("strike_price") >= float(strike_range[0])) & (ds.field("strike_price") <= float(strike_range[1])))
+    if start is not None:
+        conditions.append((ds.field("trade_date") >= pa.scalar(pd.Timestamp(start).date(), pa.date32()))
+                          & (ds.field("timestamp") >= pa.scalar(pd.Timestamp(start), pa.timestamp("us"))))
+    if end is not None:
+        conditions.append((ds.field("trade_date") <= pa.scalar(pd.Timestamp(end).date(), pa.date32()))
+                          & (ds.field("timestamp") <= pa.scalar(pd.Timestamp(end), pa.timestamp("us"))))
+    condition = None
+    for part in conditions:
+        condition = part if condition is None else condition & part
+    file_columns = [column for column in columns if column in FILE_SCHEMA.names]
+    df = dataset.to_table(columns=file_columns, filter=condition).to_pandas()
+    if "symbol" in columns:
+        df["symbol"] = symbol
+    if "expiry_date" in columns:
+        df["expiry_date"] = expiry_date
+    return df[columns]
+
+# Rows of one symbol's expiry from cold storage and option_chain together, oldest first
+def fetch_history(conn, symbol, expiry_date, strike_price=None, option_type=None, strike_range=None, start=None,
+                  end=None, columns=None, root=COLD_STORAGE_DIR):
+    """
+    Takes the same filters as read_cold. A row present in both (a partition exported but not
+    yet dropped) is returned once. Without archived rows the PostgreSQL result is returned
+    unchanged.
+    """
+    columns = columns or HISTORY_COLUMNS
+    conditions = [sql.SQL("symbol = %s"), sql.SQL("expiry_date = %s")]
+    params = [symbol, expiry_date]
+    for clause, value in (("strike_price = %s", strike_price), ("option_type = %s", option_type),
+                          ("timestamp >= %s", start), ("timestamp <= %s", end)):
+        if value is not None:
+            conditions.append(sql.SQL(clause))
+            params.append(value)
+    if strike_range is not None:
+        conditions.append(sql.SQL("strike_price BETWEEN %s AND %s"))
+        params.extend(strike_range)
+    # Local wall-clock timestamps, like the Parquet files'
+    select_list = sql.SQL(", ").join(
+        sql.SQL("timestamp::timestamp AS timestamp") if column == "timestamp"
+        else sql.SQL("option_type::text AS option_type") if column == "option_type"
+        else sql.Identifier(column)
+        for column in columns
+    )
+    query = sql.SQL("SELECT {} FROM {} WHERE {} ORDER BY timestamp ASC").format(
+        select_list, sql.Identifier(TABLE_NAME), sql.SQL(" AND ").join(conditions)
+    )
+    hot = pd.read_sql_query(query.as_string(conn), conn, params=params)
+    cold = read_cold(symbol, expiry_date, strike_price, option_type, strike_range, start, end, columns, root)
+    if cold.empty:
+        return hot
+    if not hot.empty:
+        numeric = [column for column in columns if column in FILE_SCHEMA.names and column not in ("option_type", "timestamp")]
+        hot = hot.astype({column: "float64" for column in numeric})
+        if "timestamp" in columns:
+            hot["timestamp"] = pd.to_datetime(hot["timestamp"])
+        df = pd.concat([cold, hot], ignore_index=True)
+    else:
+        df = cold
+    key = [column for column in ("strike_price", "option_type", "timestamp") if column in columns]
+    if key:
+        df = df.drop_duplicates(subset=key, keep="last")
+    return df.sort_values("timestamp", kind="stable").reset_index(drop=True) if "timestamp" in columns else df
+
+# Archived expiries per symbol, with their files and rows
+def list_cold_storage(root=COLD_STORAGE_DIR):
+    if not os.path.isdir(root):
+        return []
+    dataset = ds.dataset(root, format=_file_format(), partitioning=_partitioning())
+    summary = {}
+    for fragment in dataset.get_fragments():
+        keys = ds.get_partition_keys(fragment.partition_expression)
+        entry = summary.setdefault((keys["symbol"], keys["expiry_date"]), [0, 0, 0])
+        metadata = fragment.metadata
+        entry[0] += 1
+        entry[1] += metadata.num_rows
+        entry[2] += os.path.getsize(fragment.path)
+    return [(symbol, expiry, *values) for (symbol, expiry), values in sorted(summary.items())]
+
+def main():
+    # Imported here: option_store imports this module (through option_rollups)
+    from db_pool import get_maintenance_connection
+    from option_store import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Archive expired option_chain partitions to Parquet.")
+    parser.add_argument("--root", default=COLD_STORAGE_DIR, help="Dataset directory.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    archive = commands.add_parser("archive", help="Detach expired partitions and export them.")
+    archive.add_argument("--retention-days", type=int, default=RETENTION_DAYS)
+    archive.add_argument("--keep-tables", action="store_true", help="Keep the detached tables after exporting.")
+    commands.add_parser("list", help="List archived expiries.")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for symbol, expiry, files, rows, size in list_cold_storage(args.root):
+            print(f"{symbol:<12} expiry {expiry}  {files} files  {rows:,} rows  {size / 1e6:.1f} MB")
+        return
+    conn = get_maintenance_connection(DB_CONFIG)
+    try:
+        archived = archive_partitions(conn, args.root, args.retention_days, drop=not args.keep_tables)
+        print(f"Archived {len(archived)} partition(s) to {args.root}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Chunked CSV backfill into the option_data table.
+
+The file is read CHUNK_ROWS rows at a time, coerced to the table's column types, COPYed into
+a temporary staging table and merged with INSERT ... ON CONFLICT DO NOTHING, one
+transaction per chunk. Memory stays bounded by the chunk size whatever the file size, and
+an interrupted backfill can simply be re-run.
+
+    python csv_backfill.py dump_2024.csv dump_2025.csv --dbname option_data --host localhost
+"""
+import argparse
+import io
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+DB_CONFIG = {
+    "dbname": "option_data",
+    "user": "root",
+    "password": "arka1256",
+    "host": "localhost",
+    "port": 5432,
+}
+
+TABLE_NAME = "option_data"
+CHUNK_ROWS = 50_000
+
+KEY_COLUMNS = ["strike_price", "option_type", "expiry_date", "timestamp"]
+NUMERIC_COLUMNS = [
+    "strike_price", "open_interest", "change_in_open_interest", "pchange_in_open_interest",
+    "total_traded_volume", "implied_volatility", "last_price", "change", "p_change",
+    "total_buy_quantity", "total_sell_quantity", "bid_qty", "bid_price", "ask_qty", "ask_price",
+    "underlying_value",
+]
+# Table column order
+COLUMNS = [
+    "strike_price", "expiry_date", "option_type", "open_interest", "change_in_open_interest",
+    "pchange_in_open_interest", "total_traded_volume", "implied_volatility", "last_price",
+    "change", "p_change", "total_buy_quantity", "total_sell_quantity", "bid_qty", "bid_price",
+    "ask_qty", "ask_price", "underlying_value", "timestamp",
+]
+
+# Coerce one chunk to the table types; rows with an unusable key are dropped
+def coerce_chunk(chunk):
+    """
+    Args:
+        chunk (pd.DataFrame): Raw CSV rows; column names are matched case-insensitively and
+            columns the table does not have are ignored.
+
+    Returns:
+        tuple[pd.DataFrame, int]: Rows in COLUMNS order ready for COPY, and the number rejected.
+    """
+    chunk = chunk.rename(columns=lambda name: str(name).strip().lower())
+    missing_keys = [column for column in KEY_COLUMNS if column not in chunk.columns]
+    if missing_keys:
+        raise ValueError(f"CSV is missing required columns: {', '.join(missing_keys)}")
+    chunk = chunk.reindex(columns=COLUMNS)
+
+    # Values stay strings (PostgreSQL parses them on COPY); invalid numbers become NULL.
+    # Re-formatting parsed floats for COPY would cost more than the parse itself.
+    for column in NUMERIC_COLUMNS:
+        raw = chunk[column].astype("string").str.strip()
+        chunk[column] = raw.where(np.isfinite(pd.to_numeric(raw, errors="coerce").astype(float)))
+    # Accepts both exported ISO dates and NSE-style 09-Jan-2025
+    chunk["expiry_date"] = pd.to_datetime(
+        chunk["expiry_date"], format="mixed", dayfirst=True, errors="coerce"
+    ).dt.strftime("%Y-%m-%d")
+    chunk["timestamp"] = pd.to_datetime(chunk["timestamp"], format="mixed", errors="coerce").dt.strftime("%Y-%m-%d %H:%M:%S.%f")
+    chunk["option_type"] = chunk["option_type"].astype("string").str.strip().str.upper()
+
+    valid = chunk[KEY_COLUMNS].notna().all(axis=1) & chunk["option_type"].isin(["CE", "PE"])
+    return chunk[valid], int((~valid).sum())
+
+def _copy_and_merge(cursor, chunk, table):
+    buffer = io.StringIO()
+    chunk.to_csv(buffer, header=False, index=False)  # Missing values are written empty, which COPY reads as NULL
+    buffer.seek(0)
+    cursor.execute(f"TRUNCATE {table}_staging")
+    cursor.copy_expert(f"COPY {table}_staging ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    cursor.execute(
+        f"INSERT INTO {table} ({', '.join(COLUMNS)}) "
+        f"SELECT {', '.join(COLUMNS)} FROM {table}_staging "
+        f"ON CONFLICT ({', '.join(KEY_COLUMNS)}) DO NOTHING"
+    )
+    return cursor.rowcount
+
+# Stream a CSV file (path or file object) into the table chunk by chunk
+def load_csv(conn, source, table=TABLE_NAME, chunk_rows=CHUNK_ROWS, progress=None):
+    """
+    Args:
+        conn: psycopg2 connection; each chunk is committed separately.
+        source (str or file-like): CSV path or an open (binary or text) file, e.g. a Streamlit upload.
+        table (str): Target table (must have the option_data columns and primary key).
+        chunk_rows (int): Rows read, coerced and copied per transaction.
+        progress (callable, optional): Called with the running stats dict after every chunk.
+
+    Returns:
+        dict: rows_read, rows_rejected, rows_inserted, rows_duplicate, chunks, bytes_read,
+        total_bytes (None if unknown) and seconds.
+    """
+    handle = open(source, "rb") if isinstance(source, (str, os.PathLike)) else source
+    try:
+        total_bytes = os.fstat(handle.fileno()).st_size
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        total_bytes = getattr(handle, "size", None)
+
+    stats = {
+        "rows_read": 0, "rows_rejected": 0, "rows_inserted": 0, "rows_duplicate": 0, "chunks": 0,
+        "bytes_read": 0, "total_bytes": total_bytes, "seconds": 0.0,
+    }
+    start = time.perf_counter()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS {table}_staging (LIKE {table} INCLUDING DEFAULTS)")
+        conn.commit()
+
+        for raw_chunk in pd.read_csv(handle, chunksize=chunk_rows, dtype=str, keep_default_na=True):
+            chunk, rejected = coerce_chunk(raw_chunk)
+            with conn.cursor() as cursor:
+                inserted = _copy_and_merge(cursor, chunk, table)
+            conn.commit()
+
+            stats["rows_read"] += len(raw_chunk)
+            stats["rows_rejected"] += rejected
+            stats["rows_inserted"] += inserted
+            stats["rows_duplicate"] += len(chunk) - inserted
+            stats["chunks"] += 1
+            try:
+                stats["bytes_read"] = handle.tell()
+            except (OSError, io.UnsupportedOperation):
+                pass
+            stats["seconds"] = time.perf_counter() - start
+            if progress:
+                progress(stats)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}_staging")
+        conn.commit()
+        if handle is not source:
+            handle.close()
+
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+def print_progress(stats):
+    done = f"{100 * stats['bytes_read'] / stats['total_bytes']:5.1f}% " if stats["total_bytes"] else ""
+    rate = stats["rows_read"] / stats["seconds"] if stats["seconds"] else 0
+    print(
+        f"{done}chunk {stats['chunks']}: {stats['rows_read']:,} read, {stats['rows_inserted']:,} inserted, "
+        f"{stats['rows_duplicate']:,} duplicate, {stats['rows_rejected']:,} rejected ({rate:,.0f} rows/s)"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill option chain CSV dumps into PostgreSQL.")
+    parser.add_argument("files", nargs="+", help="CSV files to load.")
+    parser.add_argument("--table", default=TABLE_NAME)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    for key, value in DB_CONFIG.items():
+        parser.add_argument(f"--{key}", type=type(value), default=value)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**{key: getattr(args, key) for key in DB_CONFIG})
+    try:
+        for path in args.files:
+            print(f"Loading {path}")
+            stats = load_csv(conn, path, args.table, args.chunk_rows, progress=print_progress)
+            print(f"Done in {stats['seconds']:.1f}s: {stats['rows_inserted']:,} of {stats['rows_read']:,} rows inserted.")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
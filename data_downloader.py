@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
-import psycopg2
+from db_pool import get_connection
+from schema import OPTION_CHAIN_TYPES
 
 # Database Configuration
 DB_CONFIG = {
@@ -11,27 +12,21 @@ DB_CONFIG = {
     "port": 5432,
 }
 
-# Function to establish a database connection
+# Function to establish a database connection (pooled; conn.close() returns it to the pool)
 def get_db_connection():
     try:
-        conn = psycopg2.connect(
-            dbname=DB_CONFIG["dbname"],
-            user=DB_CONFIG["user"],
-            password=DB_CONFIG["password"],
-            host=DB_CONFIG["host"],
-            port=DB_CONFIG["port"],
-        )
-        return conn
+        return get_connection(DB_CONFIG)
     except Exception as e:
         st.error(f"Error connecting to PostgreSQL: {e}")
         return None
 
-# Function to fetch data from the database
+# Function to fetch the current chain (one row per live contract, kept by the ingest path)
 def fetch_data():
-    query = """
-        SELECT *
-        FROM option_chain
-        WHERE total_traded_volume > 10000
+    # Columns in feed order (the table stores them widest first)
+    query = f"""
+        SELECT {', '.join(OPTION_CHAIN_TYPES)}
+        FROM option_chain_latest
+        WHERE total_traded_volume > 10000 AND expiry_date >= CURRENT_DATE
         ORDER BY timestamp DESC, strike_price ASC;
     """
     conn = get_db_connection()
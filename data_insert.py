@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
-import psycopg2
-from psycopg2.extras import execute_values
+from db_pool import get_connection
+from csv_backfill import load_csv
 
 # Constants
 DB_CONFIG = {
@@ -14,17 +14,10 @@ DB_CONFIG = {
 
 TABLE_NAME = "option_data"
 
-# Function to establish a PostgreSQL connection
+# Function to establish a PostgreSQL connection (pooled; conn.close() returns it to the pool)
 def get_db_connection():
     try:
-        conn = psycopg2.connect(
-            dbname=DB_CONFIG["dbname"],
-            user=DB_CONFIG["user"],
-            password=DB_CONFIG["password"],
-            host=DB_CONFIG["host"],
-            port=DB_CONFIG["port"],
-        )
-        return conn
+        return get_connection(DB_CONFIG)
     except Exception as e:
         st.error(f"Error connecting to PostgreSQL: {e}")
         return None
@@ -67,30 +60,28 @@ def create_option_chain_table():
         finally:
             conn.close()
 
-# Function to insert data into the database
+# Function to insert data into the database, streamed in chunks through COPY (see csv_backfill)
 def insert_csv_data(file_path):
     conn = get_db_connection()
     if conn:
-        try:
-            data = pd.read_csv(file_path)
-            data = data.rename(columns=str.lower)  # Ensure columns are lowercase to match DB fields
-            insert_query = f"""
-            INSERT INTO {TABLE_NAME} (
-                strike_price, expiry_date, option_type, open_interest, change_in_open_interest,
-                pchange_in_open_interest, total_traded_volume, implied_volatility, last_price,
-                change, p_change, total_buy_quantity, total_sell_quantity, bid_qty, bid_price,
-                ask_qty, ask_price, underlying_value, timestamp
-            ) VALUES %s
-            ON CONFLICT (strike_price, option_type, expiry_date, timestamp) DO NOTHING;
-            """
-            # Prepare data for bulk insertion
-            records = data.to_records(index=False)
-            values = list(records)
+        progress_bar = st.progress(0.0, text="Loading CSV...")
 
-            with conn.cursor() as cursor:
-                execute_values(cursor, insert_query, values)
-            conn.commit()
-            st.success("Data successfully inserted into the database.")
+        def show_progress(stats):
+            fraction = min(stats["bytes_read"] / stats["total_bytes"], 1.0) if stats["total_bytes"] else 0.0
+            progress_bar.progress(
+                fraction,
+                text=f"{stats['rows_read']:,} rows read, {stats['rows_inserted']:,} inserted, "
+                     f"{stats['rows_rejected']:,} rejected",
+            )
+
+        try:
+            stats = load_csv(conn, file_path, TABLE_NAME, progress=show_progress)
+            progress_bar.progress(1.0, text="Done")
+            st.success(
+                f"Data successfully inserted into the database: {stats['rows_inserted']:,} new rows, "
+                f"{stats['rows_duplicate']:,} already present, {stats['rows_rejected']:,} rejected "
+                f"({stats['seconds']:.1f}s)."
+            )
         except Exception as e:
             st.error(f"Error inserting data: {e}")
         finally:
@@ -1,5 +1,6 @@
 import psycopg2
 from psycopg2 import sql
+from db_pool import get_pool
 import streamlit as st
 import pandas as pd
 
@@ -45,7 +46,7 @@ def main():
 
     # Connect to the database
     try:
-        with psycopg2.connect(**db_params) as conn:
+        with get_pool(db_params).connection() as conn:
             tables = get_all_tables(conn)
 
             if not tables:
@@ -0,0 +1,162 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+# Pool settings shared by the ingest scripts and the Streamlit pages
+MIN_CONNECTIONS = 1
+MAX_CONNECTIONS = 10
+STATEMENT_TIMEOUT_MS = 30_000  # Server-side limit for any single statement
+CHECKOUT_TIMEOUT = 10  # Seconds to wait for a free connection before giving up
+HEALTH_CHECK_IDLE_SECONDS = 30  # Connections idle longer than this are pinged on checkout
+# Session time zone: the feed's timestamps are NSE (IST) wall-clock times without an offset, so
+# they are read into TIMESTAMPTZ columns, and CURRENT_DATE and ::date are taken, in IST
+SESSION_TIMEZONE = "Asia/Kolkata"
+
+# psycopg2 connection whose close() hands it back to the pool it was checked out from,
+# so existing `conn = get_db_connection() ... finally: conn.close()` code keeps working
+class PooledConnection(psycopg2.extensions.connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+        self.last_used = time.monotonic()
+
+    def close(self):
+        if self.pool is not None and not self.pool.closed:
+            self.pool.putconn(self)
+        else:
+            super().close()
+
+# Thread-safe PostgreSQL pool with blocking checkout, health checks and wait-time metrics
+class ConnectionPool:
+    """
+    Wraps psycopg2's ThreadedConnectionPool, which raises as soon as max_connections are in
+    use. Here checkout waits up to checkout_timeout for one to be returned. Connections that
+    were idle for a while are pinged before being handed out and replaced if broken.
+    """
+
+    def __init__(self, db_config, min_connections=MIN_CONNECTIONS, max_connections=MAX_CONNECTIONS,
+                 statement_timeout_ms=STATEMENT_TIMEOUT_MS, checkout_timeout=CHECKOUT_TIMEOUT,
+                 timezone=SESSION_TIMEZONE):
+        self.checkout_timeout = checkout_timeout
+        self._pool = ThreadedConnectionPool(
+            min_connections, max_connections, connection_factory=PooledConnection,
+            options=f"-c statement_timeout={statement_timeout_ms} -c timezone={timezone}", **db_config
+        )
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self.max_connections = max_connections
+        self.closed = False
+        self.checkouts = 0
+        self.in_use = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+        self.replaced_connections = 0
+
+    def _healthy_connection(self):
+        conn = self._pool.getconn()
+        if not conn.closed and time.monotonic() - conn.last_used < HEALTH_CHECK_IDLE_SECONDS:
+            return conn
+        try:
+            if conn.closed:
+                raise psycopg2.InterfaceError("connection already closed")
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return conn
+        except psycopg2.Error:
+            self._pool.putconn(conn, close=True)
+            with self._lock:
+                self.replaced_connections += 1
+            return self._pool.getconn()
+
+    def getconn(self):
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise PoolError(f"Timed out after {self.checkout_timeout}s waiting for a database connection")
+        try:
+            conn = self._healthy_connection()
+        except Exception:
+            self._slots.release()
+            raise
+
+        wait = time.perf_counter() - start
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.wait_seconds_total += wait
+            self.wait_seconds_max = max(self.wait_seconds_max, wait)
+        conn.pool = self
+        return conn
+
+    def putconn(self, conn):
+        conn.pool = None
+        conn.last_used = time.monotonic()
+        try:
+            # ThreadedConnectionPool rolls back unfinished transactions and discards broken connections
+            self._pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_connections": self.max_connections,
+                "in_use": self.in_use,
+                "checkouts": self.checkouts,
+                "mean_wait_ms": 1000 * self.wait_seconds_total / self.checkouts if self.checkouts else 0.0,
+                "max_wait_ms": 1000 * self.wait_seconds_max,
+                "timeouts": self.timeouts,
+                "replaced_connections": self.replaced_connections,
+            }
+
+    def closeall(self):
+        self.closed = True  # Checked-out connections really close instead of returning
+        self._pool.closeall()
+
+# One pool per distinct DB_CONFIG, created on first use and kept for the life of the process
+# (Streamlit reruns re-execute the page script but reuse imported modules, and so the pools)
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_config, **pool_options):
+    key = tuple(sorted(db_config.items()))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(db_config, **pool_options)
+        return _pools[key]
+
+# Check out a connection for db_config; conn.close() returns it to the pool
+def get_connection(db_config):
+    return get_pool(db_config).getconn()
+
+# Unpooled connection for the maintenance commands (migrations, rollup rebuilds, archiving):
+# the same session time zone, but no statement timeout, as their statements may run for minutes
+def get_maintenance_connection(db_config, timezone=SESSION_TIMEZONE):
+    return psycopg2.connect(options=f"-c statement_timeout=0 -c timezone={timezone}", **db_config)
+
+def pool_stats():
+    with _pools_lock:
+        return {f"{dict(key)['dbname']}@{dict(key)['host']}": pool.stats() for key, pool in _pools.items()}
+
+def close_all_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.closeall()
+        _pools.clear()
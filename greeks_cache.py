@@ -0,0 +1,94 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import streamlit as st
+
+from black_scholes import Greeks, black_scholes_greeks
+
+# Quantization steps for cache keys: inputs closer than one step share an entry
+PRICE_STEP = 0.05  # Exchange tick size
+TIME_STEP = 1 / (365 * 24 * 60)  # One minute, in years
+VOLATILITY_STEP = 1e-4
+RATE_STEP = 1e-6
+
+# Bounded LRU memo of Black-Scholes Greeks and fair values keyed on quantized inputs
+class GreeksCache:
+    """
+    Misses are evaluated in one kernel call at the quantized inputs, so an entry's value does
+    not depend on which request inside its bucket filled it. Safe to share between the threads
+    Streamlit runs sessions on.
+    """
+
+    def __init__(self, max_entries=100_000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, S, K, T, r, sigma, is_call):
+        """
+        Args:
+            S, K, T, r, sigma (array-like): Same meaning as black_scholes_greeks.
+            is_call (array-like): True for calls, False for puts (see option_type_flags).
+
+        Returns:
+            Greeks: Arrays shaped like the broadcast inputs.
+        """
+        S, K, T, r, sigma, is_call = np.broadcast_arrays(
+            *(np.asarray(x, dtype=float) for x in (S, K, T, r, sigma)), np.asarray(is_call, dtype=bool)
+        )
+        quantized = [
+            np.rint(x / step).astype(np.int64)
+            for x, step in ((S, PRICE_STEP), (K, PRICE_STEP), (T, TIME_STEP), (sigma, VOLATILITY_STEP), (r, RATE_STEP))
+        ]
+        keys = list(zip(*(q.ravel().tolist() for q in quantized), is_call.ravel().tolist()))
+        values = np.full((len(keys), len(Greeks._fields)), np.nan)
+
+        missing = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    self._entries.move_to_end(key)
+                    values[i] = entry
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            unique_keys = np.array([key[:5] for key in missing], dtype=float)
+            steps = np.array([PRICE_STEP, PRICE_STEP, TIME_STEP, VOLATILITY_STEP, RATE_STEP])
+            S_q, K_q, T_q, sigma_q, r_q = (unique_keys * steps).T
+            computed = np.column_stack(
+                black_scholes_greeks(S_q, K_q, T_q, r_q, sigma_q, [key[5] for key in missing])
+            )
+            with self._lock:
+                for (key, rows), row_values in zip(missing.items(), computed):
+                    values[rows] = row_values
+                    self._entries[key] = row_values
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return Greeks(*(values[:, field].reshape(S.shape) for field in range(len(Greeks._fields))))
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+# One cache per Streamlit server process, shared across reruns and sessions
+@st.cache_resource
+def get_shared_greeks_cache():
+    return GreeksCache()
@@ -0,0 +1,197 @@
+"""
+In-process stand-in for a Kafka broker, for running the producer and consumer services
+without Kafka. Producers and consumers expose the subset of the confluent_kafka API that
+option_insert and option_consumer use; consumers of the same group split the partitions
+and share committed offsets, so a restarted or added consumer resumes from the last commit.
+
+    broker = StandInBroker(partitions=4)
+    produce_snapshot(broker.producer(), messages)
+    consumer = broker.consumer("option_chain_writers")
+    consumer.subscribe(["option_chain_data"])
+"""
+import threading
+import time
+import zlib
+from collections import defaultdict
+
+class StandInMessage:
+    def __init__(self, topic, partition, offset, key, value):
+        self._topic, self._partition, self._offset = topic, partition, offset
+        self._key, self._value = key, value
+
+    def topic(self):
+        return self._topic
+
+    def partition(self):
+        return self._partition
+
+    def offset(self):
+        return self._offset
+
+    def key(self):
+        return self._key
+
+    def value(self):
+        return self._value
+
+    def error(self):
+        return None
+
+class StandInBroker:
+    def __init__(self, partitions=4):
+        self.partitions = partitions
+        self._logs = defaultdict(lambda: [[] for _ in range(self.partitions)])  # topic -> partition -> messages
+        self._committed = defaultdict(dict)  # group -> {(topic, partition): next offset}
+        self._members = defaultdict(list)  # group -> consumers, in join order
+        self._lock = threading.Lock()
+
+    def append(self, topic, key, value):
+        # Same key, same partition (as with Kafka's default partitioner), so per-contract order is kept
+        partition = zlib.crc32(key) % self.partitions if key is not None else 0
+        with self._lock:
+            log = self._logs[topic][partition]
+            log.append(StandInMessage(topic, partition, len(log), key, value))
+
+    def end_offsets(self, topic):
+        with self._lock:
+            return [len(log) for log in self._logs[topic]]
+
+    def producer(self, round_trip_ms=0.0, batch_size=1_000_000):
+        return StandInBrokerProducer(self, round_trip_ms, batch_size)
+
+    def consumer(self, group_id):
+        return StandInConsumer(self, group_id)
+
+    def committed(self, group_id, topic, partition):
+        with self._lock:
+            return self._committed[group_id].get((topic, partition), 0)
+
+    # Round-robin partitions over the group's members, like a rebalance on every join/leave
+    def _rebalance(self, group_id):
+        members = self._members[group_id]
+        for index, member in enumerate(members):
+            owned = {(topic, p) for topic in member.topics for p in range(self.partitions) if p % len(members) == index}
+            member._positions = {
+                tp: member._positions.get(tp, self._committed[group_id].get(tp, 0)) for tp in owned
+            }
+            member._paused &= owned
+            member._assigned = True
+
+    def _serve_rebalance(self, consumer):
+        # Called outside the lock, from the consumer's own consume(), as librdkafka does
+        if getattr(consumer, "_assigned", False):
+            consumer._assigned = False
+            if consumer._on_assign:
+                consumer._on_assign(consumer, consumer.assignment())
+
+# Messages are batched like librdkafka's: sent as one request once batch_size bytes are
+# pending, or on poll/flush, and every request costs one round trip
+class StandInBrokerProducer:
+    def __init__(self, broker, round_trip_ms=0.0, batch_size=1_000_000):
+        self.broker = broker
+        self.round_trip = round_trip_ms / 1000
+        self.batch_size = batch_size
+        self.requests = 0
+        self._pending = []
+        self._pending_bytes = 0
+        self._callbacks = []
+
+    def _send(self):
+        if self._pending:
+            if self.round_trip:
+                time.sleep(self.round_trip)
+            self.requests += 1
+            for topic, key, value, on_delivery in self._pending:
+                self.broker.append(topic, key, value)
+                self._callbacks.append(on_delivery)
+            self._pending, self._pending_bytes = [], 0
+
+    def produce(self, topic, value=None, key=None, on_delivery=None):
+        self._pending.append((topic, key, value, on_delivery))
+        self._pending_bytes += len(value or b"") + len(key or b"")
+        if self._pending_bytes >= self.batch_size:
+            self._send()
+
+    def poll(self, timeout=0):
+        self._send()
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            if callback:
+                callback(None, None)
+        return len(callbacks)
+
+    def flush(self, timeout=None):
+        self.poll()
+        return 0
+
+class StandInTopicPartition:
+    def __init__(self, topic, partition, offset=-1001):
+        self.topic, self.partition, self.offset = topic, partition, offset
+
+class StandInConsumer:
+    def __init__(self, broker, group_id):
+        self.broker = broker
+        self.group_id = group_id
+        self.topics = []
+        self._positions = {}  # (topic, partition) -> next offset to read
+        self._paused = set()
+        self._on_assign = None
+        self.commits = 0
+
+    def subscribe(self, topics, on_assign=None, on_revoke=None):
+        with self.broker._lock:
+            self.topics = list(topics)
+            self._on_assign = on_assign
+            self.broker._members[self.group_id].append(self)
+            self.broker._rebalance(self.group_id)
+
+    def assignment(self):
+        return [StandInTopicPartition(topic, partition) for topic, partition in sorted(self._positions)]
+
+    def consume(self, num_messages=1, timeout=-1):
+        self.broker._serve_rebalance(self)
+        messages = []
+        with self.broker._lock:
+            for tp in sorted(self._positions):
+                if tp in self._paused:
+                    continue
+                log = self.broker._logs[tp[0]][tp[1]]
+                batch = log[self._positions[tp]:self._positions[tp] + num_messages - len(messages)]
+                self._positions[tp] += len(batch)
+                messages.extend(batch)
+                if len(messages) >= num_messages:
+                    break
+        if not messages and timeout and timeout > 0:
+            time.sleep(timeout)  # Nothing to read: block for the timeout like a real consumer
+        return messages
+
+    def poll(self, timeout=None):
+        messages = self.consume(1, timeout)
+        return messages[0] if messages else None
+
+    def commit(self, message=None, offsets=None, asynchronous=True):
+        with self.broker._lock:
+            if message is not None:
+                offsets = [StandInTopicPartition(message.topic(), message.partition(), message.offset() + 1)]
+            for tp in offsets or []:
+                self.broker._committed[self.group_id][(tp.topic, tp.partition)] = tp.offset
+        self.commits += 1
+
+    def seek(self, partition):
+        with self.broker._lock:
+            if (partition.topic, partition.partition) in self._positions:
+                self._positions[(partition.topic, partition.partition)] = partition.offset
+
+    def pause(self, partitions):
+        self._paused |= {(tp.topic, tp.partition) for tp in partitions}
+
+    def resume(self, partitions):
+        self._paused -= {(tp.topic, tp.partition) for tp in partitions}
+
+    def close(self):
+        with self.broker._lock:
+            members = self.broker._members[self.group_id]
+            if self in members:
+                members.remove(self)
+                self._positions = {}
+                self.broker._rebalance(self.group_id)
@@ -0,0 +1,196 @@
+"""
+Ingestion load test against the stand-in option chain API (replay_server.py).
+
+Runs the real poller for a number of cycles against a local server and drives one of the
+two ingest paths with every snapshot:
+
+    insert    option_insert: parse, produce to an in-process stand-in Kafka broker, and
+              persist through option_consumer (changed contracts only) on a consumer thread
+    ultimate  option_ultimate: price the chain and store it
+
+and reports snapshots/s, end-to-end latency (from the poll boundary to the committed
+write) and database rows/s. Use a scratch database: insert writes option_chain and ultimate
+option_greeks (see schema.py).
+
+    python load_generator.py --pipeline insert --symbols 20 --strikes 100 --interval 2 --cycles 15 --dbname loadtest
+    python load_generator.py --pipeline ultimate --endpoint http://localhost:5000/index-option-chain
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from aiohttp import web
+
+import option_insert
+import option_store
+import option_ultimate
+from db_pool import pool_stats
+from kafka_stand_in import StandInBroker
+from option_consumer import OptionChainConsumer, SnapshotStore
+from option_poller import SYMBOLS, run_poller
+from replay_server import SYNTHETIC_EXPIRIES, SYNTHETIC_STRIKES, SnapshotSource, create_app
+from snapshot import parse_snapshot
+
+# Collected by the pipelines as snapshots reach the database
+class LoadStats:
+    def __init__(self):
+        self.latencies = []
+        self.rows = 0
+        self.write_seconds = 0.0
+        self.polled = 0
+        self.first_boundary = None
+        self._lock = threading.Lock()
+
+    def stored(self, timestamp, rows, seconds):
+        # The poller's timestamp is the boundary the cycle started on
+        boundary = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S").timestamp()
+        with self._lock:
+            self.first_boundary = min(self.first_boundary or boundary, boundary)
+            self.latencies.append(time.time() - boundary)
+            self.rows += rows
+            self.write_seconds += seconds
+
+    # elapsed runs from the first poll boundary to the last write
+    def report(self, elapsed, expected):
+        latencies = np.array(self.latencies) * 1000
+        stored = len(latencies)
+        print(f"snapshots: {self.polled} polled, {stored} stored of {expected} expected in {elapsed:.1f}s")
+        print(f"throughput: {stored / elapsed:.2f} snapshots/s, {self.rows / elapsed:,.0f} DB rows/s overall, "
+              f"{self.rows / self.write_seconds if self.write_seconds else 0:,.0f} rows/s while writing")
+        if stored:
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+            print(f"end-to-end latency ms: p50 {p50:.0f}  p90 {p90:.0f}  p99 {p99:.0f}  max {latencies.max():.0f}")
+        print(f"connection pools: {json.dumps(pool_stats())}")
+
+# option_insert path: stand-in broker plus an option_consumer thread writing to PostgreSQL
+class InsertPipeline:
+    def __init__(self, stats, batch_size):
+        self.stats = stats
+        self.broker = StandInBroker()
+        self.producer = self.broker.producer()
+        store = SnapshotStore(db_config=option_store.DB_CONFIG)
+
+        def write_batch(snapshots):
+            result = store(snapshots)
+            for snapshot in snapshots:
+                self.stats.stored(snapshot.timestamp, result["rows"] / len(snapshots), result["seconds"] / len(snapshots))
+            return result
+
+        self.consumer = OptionChainConsumer(
+            self.broker.consumer("load_test"), write_batch, batch_size=batch_size, batch_timeout=0.05,
+            on_assign=store.reload,
+        )
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._consume, daemon=True)
+
+    # After stop(), keep going until a batch that started after the stop comes back empty
+    def _consume(self):
+        while True:
+            stopping = self._stop.is_set()
+            if not self.consumer.process_batch() and stopping:
+                break
+
+    def start(self):
+        option_store.create_option_chain_table()
+        self._thread.start()
+
+    def handle_snapshot(self, symbol, data, timestamp):
+        self.stats.polled += 1
+        option_insert.produce_snapshot(self.producer, parse_snapshot(data, timestamp, symbol))
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.consumer.consumer.close()
+
+# option_ultimate path: pricing and the write happen on the polling thread
+class UltimatePipeline:
+    def __init__(self, stats):
+        self.stats = stats
+
+    def start(self):
+        option_ultimate.init_db()
+
+    def handle_snapshot(self, symbol, data, timestamp):
+        self.stats.polled += 1
+        records = option_ultimate.process_option_chain(parse_snapshot(data, timestamp, symbol), timestamp, symbol)
+        if records:
+            start = time.perf_counter()
+            option_ultimate.store_option_data(records)
+            self.stats.stored(timestamp, len(records), time.perf_counter() - start)
+
+    def stop(self):
+        pass
+
+# Run the stand-in server on its own event loop thread; returns a stop function
+def start_server(app, port):
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+    return stop
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test option chain ingestion against the stand-in API.")
+    parser.add_argument("--pipeline", choices=["insert", "ultimate"], default="insert")
+    parser.add_argument("--symbols", default="4",
+                        help="Number of symbols (the index symbols first, then SYM5, SYM6, ...) or a comma-separated list.")
+    parser.add_argument("--interval", type=int, default=5, help="Seconds between polls (whole seconds, as timestamps are).")
+    parser.add_argument("--cycles", type=int, default=6)
+    parser.add_argument("--endpoint", help="Existing option chain endpoint; a local synthetic server is started if omitted.")
+    parser.add_argument("--server-port", type=int, default=5055, help="Port of the local server.")
+    parser.add_argument("--strikes", type=int, default=SYNTHETIC_STRIKES)
+    parser.add_argument("--expiries", type=int, default=SYNTHETIC_EXPIRIES)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=25.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--batch-size", type=int, default=20, help="Consumer batch size (insert pipeline).")
+    for key, value in option_store.DB_CONFIG.items():
+        parser.add_argument(f"--{key}", type=type(value), default=value)
+    args = parser.parse_args()
+
+    if args.symbols.isdigit():
+        count = int(args.symbols)
+        symbols = (SYMBOLS + [f"SYM{i + 1}" for i in range(len(SYMBOLS), count)])[:count]
+    else:
+        symbols = args.symbols.split(",")
+    db_config = {key: getattr(args, key) for key in option_store.DB_CONFIG}
+    option_store.DB_CONFIG.update(db_config)
+    option_ultimate.DB_CONFIG.update(db_config)
+
+    stop_server = None
+    endpoint = args.endpoint
+    if not endpoint:
+        source = SnapshotSource(num_strikes=args.strikes, num_expiries=args.expiries)
+        for symbol in symbols:
+            source.next_body(symbol)  # Generate the chains before the clock starts
+        stop_server = start_server(
+            create_app(source, args.latency_ms, args.jitter_ms, args.error_rate), args.server_port
+        )
+        endpoint = f"http://127.0.0.1:{args.server_port}/index-option-chain"
+
+    stats = LoadStats()
+    pipeline = InsertPipeline(stats, args.batch_size) if args.pipeline == "insert" else UltimatePipeline(stats)
+    pipeline.start()
+    print(f"{args.pipeline}: {len(symbols)} symbols every {args.interval}s for {args.cycles} cycles from {endpoint}")
+    try:
+        asyncio.run(run_poller(pipeline.handle_snapshot, symbols, endpoint, args.interval, cycles=args.cycles))
+    finally:
+        pipeline.stop()
+        if stop_server:
+            stop_server()
+    stats.report(time.time() - (stats.first_boundary or time.time()), len(symbols) * args.cycles)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Lightweight in-process metrics for the ingest pipeline: counters, gauges and histograms
+with labels, rendered in the Prometheus text format (served on /metrics by
+start_metrics_server) and summarized as structured JSON log lines by log_event.
+
+Recording is a dict lookup, a bisect and a few additions under a lock (a few microseconds),
+so it is done per stage and snapshot, never per contract.
+
+    with StageTimer("option_ultimate", "pricing"):
+        ...
+"""
+import json
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Constants
+METRICS_PORT = 9108
+# Seconds; covers a sub-millisecond parse up to a minute-long cycle
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _label_text(labelnames, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labelnames, key)} {value}")
+        return lines
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]  # Per-bucket counts, sum
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    # Count, sum and approximate quantiles (bucket upper bounds) of one series
+    def summary(self, **labels):
+        with self._lock:
+            counts, total = self._values.get(self._key(labels), [[0] * (len(self.buckets) + 1), 0.0])
+            counts = list(counts)
+        count = sum(counts)
+        quantiles = {}
+        for q in (0.5, 0.9, 0.99):
+            running = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                running += bucket_count
+                if count and running >= q * count:
+                    quantiles[f"p{int(q * 100)}"] = bound
+                    break
+        return {"count": count, "sum": total, **quantiles}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                    lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {cumulative}")
+        return lines
+
+# Every metric, in registration order
+REGISTRY = []
+
+def _register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+STAGE_SECONDS = _register(Histogram(
+    "ingest_stage_seconds", "Time spent per snapshot in each ingest stage.", ["pipeline", "stage"]
+))
+STAGE_ERRORS = _register(Counter(
+    "ingest_errors_total", "Errors raised in each ingest stage.", ["pipeline", "stage"]
+))
+RECORDS = _register(Counter(
+    "ingest_records_total", "Option records processed.", ["pipeline", "symbol"]
+))
+CYCLE_RECORDS = _register(Gauge(
+    "ingest_cycle_records", "Option records processed in the last cycle.", ["pipeline", "symbol"]
+))
+POLL_FETCH_SECONDS = _register(Histogram(
+    "poll_fetch_seconds", "Time to fetch every symbol of a polling cycle."
+))
+POLL_CYCLE_SECONDS = _register(Histogram(
+    "poll_cycle_seconds", "Time from a poll boundary to the end of the cycle's processing."
+))
+POLL_FETCH_ERRORS = _register(Counter(
+    "poll_fetch_errors_total", "Symbols that returned no data after all retries.", ["symbol"]
+))
+POLL_SKIPPED_CYCLES = _register(Counter(
+    "poll_skipped_cycles_total", "Poll boundaries skipped because a cycle overran."
+))
+
+# Time a block into ingest_stage_seconds; an exception escaping it counts as an error of that stage
+class StageTimer:
+    __slots__ = ("pipeline", "stage", "seconds", "_start")
+
+    def __init__(self, pipeline, stage):
+        self.pipeline = pipeline
+        self.stage = stage
+        self.seconds = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self._start
+        STAGE_SECONDS.observe(self.seconds, pipeline=self.pipeline, stage=self.stage)
+        if exc_type is not None:
+            STAGE_ERRORS.inc(pipeline=self.pipeline, stage=self.stage)
+        return False
+
+# Count errors that are handled (e.g. printed) rather than raised
+def record_error(pipeline, stage):
+    STAGE_ERRORS.inc(pipeline=pipeline, stage=stage)
+
+def record_records(pipeline, symbol, count):
+    RECORDS.inc(count, pipeline=pipeline, symbol=symbol)
+    CYCLE_RECORDS.set(count, pipeline=pipeline, symbol=symbol)
+
+# Prometheus text exposition of every registered metric
+def render_prometheus():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# One JSON object per line, e.g. {"ts": "...", "event": "snapshot", "symbol": "NIFTY", ...}
+def log_event(event, **fields):
+    print(json.dumps({"ts": datetime.now().isoformat(timespec="milliseconds"), "event": event, **fields}, default=str),
+          flush=True)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes are not worth a log line each
+
+_server = None
+_server_lock = threading.Lock()
+
+# Serve /metrics on a daemon thread; idempotent, so Streamlit reruns reuse the running server
+def start_metrics_server(port=METRICS_PORT, host="0.0.0.0"):
+    global _server
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                print(f"Error starting metrics server on port {port}: {e}")
+                return None
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+            print(f"Serving metrics on http://{host}:{port}/metrics")
+        return _server
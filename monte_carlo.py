@@ -0,0 +1,510 @@
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from scipy.special import ndtri
+from scipy.stats import qmc
+
+# Markov Chain states based on sentiment, encoded as integers for the batched engine
+MARKOV_STATES = ["bullish", "bearish", "neutral"]
+BULLISH, BEARISH, NEUTRAL = range(len(MARKOV_STATES))
+
+# Move every path to its next state at once from the cumulative transition matrix
+def _next_markov_states(cumulative_matrix, states, uniforms):
+    # Same rule as np.random.choice: the first state whose cumulative probability exceeds u
+    return (cumulative_matrix[states] <= uniforms[:, None]).sum(axis=1)
+
+# Per-step uniforms: column 0 picks the initial state, column k the k-th transition
+def _markov_uniform_columns(num_steps, num_simulations, rng, uniforms):
+    if uniforms is not None:
+        return (uniforms[:, step] for step in range(num_steps + 1))
+    rng = np.random.default_rng() if rng is None else rng
+    return (rng.random(num_simulations) for _ in range(num_steps + 1))
+
+def _cumulative_transition_matrix(transition_matrix):
+    cumulative_matrix = np.cumsum(np.asarray(transition_matrix, dtype=float), axis=1)
+    cumulative_matrix /= cumulative_matrix[:, -1:]
+    return cumulative_matrix
+
+# Count bullish and bearish days per path without materialising the paths
+def simulate_markov_state_counts(transition_matrix, num_steps, num_simulations, rng=None, uniforms=None):
+    """
+    Args:
+        transition_matrix (np.ndarray): 3x3 bullish/bearish/neutral transition probabilities.
+        num_steps (int): Number of daily transitions.
+        num_simulations (int): Number of paths.
+        rng (np.random.Generator, optional): Random generator; a fresh one is used if omitted.
+        uniforms (np.ndarray, optional): (num_simulations x num_steps + 1) uniforms to drive
+            the chain instead of rng, e.g. from sobol_uniforms.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Bullish and bearish day counts per path.
+    """
+    cumulative_matrix = _cumulative_transition_matrix(transition_matrix)
+    uniform_columns = _markov_uniform_columns(num_steps, num_simulations, rng, uniforms)
+    states = (next(uniform_columns) * len(MARKOV_STATES)).astype(np.int64)
+    bullish_days = np.zeros(num_simulations, dtype=np.int64)
+    bearish_days = np.zeros(num_simulations, dtype=np.int64)
+
+    for step_uniforms in uniform_columns:
+        states = _next_markov_states(cumulative_matrix, states, step_uniforms)
+        bullish_days += states == BULLISH
+        bearish_days += states == BEARISH
+
+    return bullish_days, bearish_days
+
+# Terminal prices only: every bullish day multiplies by (1 + step), every bearish day by (1 - step)
+def simulate_markov_terminal_prices(S0, num_steps, transition_matrix, num_simulations, step_size, rng=None,
+                                    uniforms=None):
+    bullish_days, bearish_days = simulate_markov_state_counts(
+        transition_matrix, num_steps, num_simulations, rng, uniforms
+    )
+    return S0 * (1 + step_size) ** bullish_days * (1 - step_size) ** bearish_days
+
+# Full price paths (num_simulations x num_steps + 1), including the starting price
+def simulate_markov_price_paths(S0, num_steps, transition_matrix, num_simulations, step_size, rng=None,
+                                uniforms=None):
+    cumulative_matrix = _cumulative_transition_matrix(transition_matrix)
+    uniform_columns = _markov_uniform_columns(num_steps, num_simulations, rng, uniforms)
+    states = (next(uniform_columns) * len(MARKOV_STATES)).astype(np.int64)
+    price_moves = np.array([1 + step_size, 1 - step_size, 1.0])
+
+    factors = np.empty((num_simulations, num_steps + 1))
+    factors[:, 0] = S0
+    for step, step_uniforms in enumerate(uniform_columns, start=1):
+        states = _next_markov_states(cumulative_matrix, states, step_uniforms)
+        factors[:, step] = price_moves[states]
+
+    return np.cumprod(factors, axis=1)
+
+TRADING_DAYS_IN_YEAR = 252
+DEFAULT_MAX_MEMORY_MB = 64  # Cap on the simulated-path chunk held in memory at once
+
+# Daily GBM discretisation shared by the terminal and path engines
+def gbm_step_parameters(T, sigma):
+    num_steps = max(int(T * TRADING_DAYS_IN_YEAR), 1)
+    daily_volatility = sigma / np.sqrt(TRADING_DAYS_IN_YEAR)
+    return num_steps, daily_volatility
+
+# Sample the terminal GBM price directly: a sum of num_steps iid normal log-returns is itself normal
+def simulate_gbm_terminal_prices(S0, T, sigma, num_simulations, rng=None):
+    """
+    Same distribution as the final column of the daily-step paths, without the
+    num_simulations x num_steps matrix.
+
+    Args:
+        S0 (float): Underlying asset price.
+        T (float): Time to expiration in years.
+        sigma (float): Implied volatility (decimal form).
+        num_simulations (int): Number of samples.
+        rng (np.random.Generator, optional): Random generator; a fresh one is used if omitted.
+
+    Returns:
+        np.ndarray: Terminal prices.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    num_steps, daily_volatility = gbm_step_parameters(T, sigma)
+    log_returns = rng.normal(
+        -0.5 * daily_volatility ** 2 * num_steps, daily_volatility * np.sqrt(num_steps), num_simulations
+    )
+    return S0 * np.exp(log_returns)
+
+# Stream daily GBM paths in chunks so no more than max_memory_mb is held at once
+def simulate_gbm_path_chunks(S0, T, sigma, num_simulations, max_memory_mb=DEFAULT_MAX_MEMORY_MB, rng=None):
+    """
+    Yields:
+        np.ndarray: A (chunk_size x num_steps) block of price paths, excluding S0.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    num_steps, daily_volatility = gbm_step_parameters(T, sigma)
+    chunk_size = max(int(max_memory_mb * 1024 ** 2 // (num_steps * 8)), 1)
+
+    for start in range(0, num_simulations, chunk_size):
+        paths = rng.normal(-0.5 * daily_volatility ** 2, daily_volatility, (min(chunk_size, num_simulations - start), num_steps))
+        np.cumsum(paths, axis=1, out=paths)
+        np.exp(paths, out=paths)
+        paths *= S0
+        yield paths
+
+# Discounted European GBM price with antithetic variates and a Black-Scholes control variate,
+# simulated in batches until the standard error drops below tolerance
+def price_gbm_european_adaptive(S0, K, T, r, sigma, is_call, control_value, tolerance,
+                                batch_size=1000, max_simulations=10000, rng=None):
+    """
+    The priced model is the daily-step GBM of simulate_gbm_terminal_prices. The control
+    is the same payoff under risk-neutral GBM driven by the same normals, whose mean
+    is exactly the closed-form Black-Scholes price (control_value).
+
+    Args:
+        S0, K, T, r, sigma (float): Contract inputs.
+        is_call (bool): True for calls, False for puts.
+        control_value (float): Black-Scholes fair value for the same inputs.
+        tolerance (float): Target standard error of the price.
+        batch_size (int): Paths per batch (half of them antithetic).
+        max_simulations (int): Simulation budget if the tolerance is never reached.
+        rng (np.random.Generator, optional): Random generator; a fresh one is used if omitted.
+
+    Returns:
+        tuple[float, float]: Fair value and its standard error.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    num_steps, daily_volatility = gbm_step_parameters(T, sigma)
+    drift, scale = -0.5 * daily_volatility ** 2 * num_steps, daily_volatility * np.sqrt(num_steps)
+    control_drift, control_scale = (r - 0.5 * sigma ** 2) * T, sigma * np.sqrt(T)
+    discount = np.exp(-r * T)
+    sign = 1.0 if is_call else -1.0
+
+    def antithetic_payoffs(drift, scale, normals):
+        up = np.maximum(sign * (S0 * np.exp(drift + scale * normals) - K), 0)
+        down = np.maximum(sign * (S0 * np.exp(drift - scale * normals) - K), 0)
+        return 0.5 * (up + down) * discount
+
+    # Running sums over antithetic pair averages, shifted by control_value for numerical stability
+    num_pairs = sum_x = sum_c = sum_xx = sum_cc = sum_xc = 0.0
+    fair_value, std_error = np.nan, np.inf
+    while 2 * num_pairs < max_simulations:
+        normals = rng.standard_normal(max(batch_size // 2, 1))
+        x = antithetic_payoffs(drift, scale, normals) - control_value
+        c = antithetic_payoffs(control_drift, control_scale, normals) - control_value
+        num_pairs += normals.size
+        sum_x, sum_c = sum_x + x.sum(), sum_c + c.sum()
+        sum_xx, sum_cc, sum_xc = sum_xx + x @ x, sum_cc + c @ c, sum_xc + x @ c
+        if num_pairs < 2:
+            continue
+
+        mean_x, mean_c = sum_x / num_pairs, sum_c / num_pairs
+        var_x = (sum_xx - num_pairs * mean_x ** 2) / (num_pairs - 1)
+        var_c = (sum_cc - num_pairs * mean_c ** 2) / (num_pairs - 1)
+        cov_xc = (sum_xc - num_pairs * mean_x * mean_c) / (num_pairs - 1)
+        beta = cov_xc / var_c if var_c > 0 else 0.0
+
+        fair_value = control_value + mean_x - beta * mean_c
+        std_error = np.sqrt(max(var_x - beta * cov_xc, 0.0) / num_pairs)
+        if std_error <= tolerance:
+            break
+
+    return fair_value, std_error
+
+# Scrambled Sobol points in (0, 1), rounded up to a power of two as Sobol balance requires
+def sobol_uniforms(num_points, dimension, rng=None):
+    sampler = qmc.Sobol(d=dimension, scramble=True, seed=rng)
+    uniforms = sampler.random_base2(max(int(np.ceil(np.log2(max(num_points, 2)))), 1))
+    return np.clip(uniforms, np.finfo(float).eps, 1 - np.finfo(float).eps)
+
+# Randomized QMC: average an estimator over independently scrambled Sobol point sets
+def rqmc_estimate(estimator, num_points, dimension, num_randomizations=8, rng=None):
+    """
+    Args:
+        estimator (callable): Maps a (num_points x dimension) array of uniforms to an estimate.
+        num_points (int): Sobol points per randomization (rounded up to a power of two).
+        dimension (int): Uniforms per path.
+        num_randomizations (int): Independent scrambles; their spread gives the error estimate.
+        rng (np.random.Generator, optional): Random generator; a fresh one is used if omitted.
+
+    Returns:
+        tuple[float, float]: Estimate and its standard error across randomizations.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    estimates = np.array([
+        estimator(sobol_uniforms(num_points, dimension, rng)) for _ in range(num_randomizations)
+    ])
+    return estimates.mean(), estimates.std(ddof=1) / np.sqrt(num_randomizations)
+
+# Terminal GBM prices from one column of uniforms via the inverse-normal transform
+def gbm_terminal_prices_from_uniforms(S0, T, sigma, uniforms):
+    num_steps, daily_volatility = gbm_step_parameters(T, sigma)
+    normals = ndtri(uniforms[:, 0])
+    return S0 * np.exp(-0.5 * daily_volatility ** 2 * num_steps + daily_volatility * np.sqrt(num_steps) * normals)
+
+# Brownian bridge order for a unit-variance random walk on steps 1..num_steps: the terminal point
+# first, then midpoints by bisection, so the leading (best distributed) Sobol dimensions carry
+# most of the path variance
+@lru_cache(maxsize=64)
+def _brownian_bridge_plan(num_steps):
+    plan = [(num_steps, 0, num_steps, 0.0, 0.0, np.sqrt(num_steps))]
+    intervals = [(0, num_steps)]
+    while intervals:
+        next_intervals = []
+        for left, right in intervals:
+            mid = (left + right) // 2
+            if mid == left:
+                continue
+            length = right - left
+            plan.append((mid, left, right, (right - mid) / length, (mid - left) / length,
+                         np.sqrt((mid - left) * (right - mid) / length)))
+            next_intervals += [(left, mid), (mid, right)]
+        intervals = next_intervals
+    return tuple(plan)
+
+# Daily GBM paths (num_points x num_steps, excluding S0) from uniforms via a Brownian bridge
+def gbm_paths_from_uniforms(S0, T, sigma, uniforms):
+    num_steps, daily_volatility = gbm_step_parameters(T, sigma)
+    normals = ndtri(uniforms[:, :num_steps])
+    walk = np.zeros((uniforms.shape[0], num_steps + 1))
+    for dimension, (mid, left, right, left_weight, right_weight, std) in enumerate(_brownian_bridge_plan(num_steps)):
+        walk[:, mid] = left_weight * walk[:, left] + right_weight * walk[:, right] + std * normals[:, dimension]
+
+    log_paths = -0.5 * daily_volatility ** 2 * np.arange(1, num_steps + 1) + daily_volatility * walk[:, 1:]
+    return S0 * np.exp(log_paths)
+
+# Sorted simulated S_T / S0 ratios with prefix sums, so any strike's expected payoff is a lookup
+class TerminalDistribution:
+    def __init__(self, ratios):
+        self.ratios = np.sort(np.asarray(ratios, dtype=float))
+        self.prefix_sums = np.concatenate(([0.0], np.cumsum(self.ratios)))
+        self.created_at = time.monotonic()
+
+    def expected_payoffs(self, S0, K, is_call):
+        """
+        Undiscounted mean CE/PE payoff for every (S0, K) pair against the same sample.
+
+        Args:
+            S0 (array-like): Underlying asset price.
+            K (array-like): Strike price.
+            is_call (array-like): True for calls, False for puts.
+
+        Returns:
+            np.ndarray: Expected payoffs.
+        """
+        S0, K, is_call = np.broadcast_arrays(np.asarray(S0, dtype=float), np.asarray(K, dtype=float), is_call)
+        num_simulations = self.ratios.size
+        moneyness = K / S0
+        num_below = np.searchsorted(self.ratios, moneyness, side="right")
+        sum_below = self.prefix_sums[num_below]
+
+        call_payoffs = (self.prefix_sums[-1] - sum_below) - moneyness * (num_simulations - num_below)
+        put_payoffs = moneyness * num_below - sum_below
+        return S0 * np.where(is_call, call_payoffs, put_payoffs) / num_simulations
+
+# Standard normal draws shared by every contract of an expiry; each contract scales them to its own
+# sigma and T, so the draws stay valid as volatilities and time to expiry move between cycles
+class NormalSample:
+    def __init__(self, normals):
+        self.normals = np.asarray(normals, dtype=float)
+        self.created_at = time.monotonic()
+
+# Terminal simulations shared by every strike of an expiry, evicted by LRU and by age
+class TerminalPriceCache:
+    """
+    Holds two kinds of entries. GBM chains (price_gbm_chain) cache one NormalSample per
+    (underlying, expiry, seed, number of simulations), so a whole chain needs one entry per
+    expiry. Other models (price_european_chain) cache simulated S_T / S0 ratios per
+    (underlying, expiry, time bucket, vol bucket, model, seed, number of simulations); the
+    same seed is used for every bucket, so strikes priced from neighbouring buckets share
+    common random numbers and cross-strike fair values stay consistent.
+    """
+
+    def __init__(self, max_entries=256, max_age_seconds=300, vol_bucket_width=0.005,
+                 time_bucket_width=1 / (365 * 24 * 60)):
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.vol_bucket_width = vol_bucket_width
+        self.time_bucket_width = time_bucket_width  # Years; simulations are reused within a minute of T
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def vol_bucket(self, sigma):
+        return np.maximum(np.rint(np.asarray(sigma, dtype=float) / self.vol_bucket_width), 1).astype(int)
+
+    def time_bucket(self, T):
+        return int(round(T / self.time_bucket_width))
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if now - entry.created_at <= self.max_age_seconds:
+                break
+            del self._entries[key]
+
+    def _lookup(self, key, build):
+        self._evict_expired()
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+
+        self.misses += 1
+        entry = build()
+        self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    # simulate(sigma, rng) returns terminal S_T / S0 ratios for the bucket's volatility
+    def get(self, underlying, expiry, T, bucket, model, seed, num_simulations, simulate):
+        return self._lookup(
+            (underlying, expiry, self.time_bucket(T), int(bucket), model, seed, num_simulations),
+            lambda: TerminalDistribution(simulate(bucket * self.vol_bucket_width, np.random.default_rng(seed))),
+        )
+
+    # num_simulations standard normals for one expiry's GBM contracts; sampler="sobol" gives
+    # num_randomizations rows of independently scrambled Sobol normals instead
+    def normals(self, underlying, expiry, seed, num_simulations, sampler="pseudo", num_randomizations=1):
+        def build():
+            rng = np.random.default_rng(seed)
+            if sampler == "sobol":
+                return NormalSample(ndtri(np.stack([
+                    sobol_uniforms(num_simulations, 1, rng)[:, 0] for _ in range(num_randomizations)
+                ])))
+            return NormalSample(rng.standard_normal(num_simulations))
+
+        return self._lookup(("normals", underlying, expiry, seed, num_simulations, sampler, num_randomizations), build)
+
+    def clear(self):
+        self._entries.clear()
+
+# Discounted MC fair values for every contract of one underlying/expiry from cached simulations
+def price_european_chain(cache, underlying, expiry, S0, K, T, r, sigma, is_call, simulate, model="gbm", seed=None,
+                         num_simulations=None):
+    """
+    Contracts are grouped by (vol bucket, model) and each group is priced as a vectorized
+    payoff against a single cached sample, so both CE and PE of every strike share it.
+
+    Args:
+        cache (TerminalPriceCache): Cache to read from and fill.
+        underlying (str): Underlying symbol, e.g. "NIFTY".
+        expiry (str): Expiry date label.
+        S0, K, sigma, is_call (array-like): Per-contract inputs.
+        T (float): Time to expiration in years (the same for the whole expiry).
+        r (float): Risk-free rate.
+        simulate (callable): simulate(model, sigma, rng) -> terminal S_T / S0 ratios.
+        model (str or array-like): Model label per contract.
+        seed (int, optional): Seed shared by every simulation of this chain.
+        num_simulations (int, optional): Sample size simulate draws; part of the cache key.
+
+    Returns:
+        np.ndarray: Fair values; NaN where sigma <= 0 or T <= 0.
+    """
+    S0, K, sigma, is_call, model = np.broadcast_arrays(
+        np.asarray(S0, dtype=float), np.asarray(K, dtype=float), np.asarray(sigma, dtype=float),
+        np.asarray(is_call, dtype=bool), np.asarray(model)
+    )
+    fair_values = np.full(K.shape, np.nan)
+    if T <= 0:
+        return fair_values
+
+    valid = sigma > 0
+    buckets = cache.vol_bucket(np.where(valid, sigma, cache.vol_bucket_width))
+    groups = {}
+    for i in np.flatnonzero(valid):
+        groups.setdefault((buckets[i], model[i]), []).append(i)
+
+    for (bucket, group_model), indices in groups.items():
+        distribution = cache.get(
+            underlying, expiry, T, bucket, group_model, seed, num_simulations,
+            lambda bucket_sigma, rng: simulate(group_model, bucket_sigma, rng)
+        )
+        fair_values[indices] = distribution.expected_payoffs(S0[indices], K[indices], is_call[indices])
+
+    return fair_values * np.exp(-r * T)
+
+# Discounted MC fair values for every contract of one underlying/expiry under the daily-step GBM
+# of simulate_gbm_terminal_prices, each contract simulated at its own sigma from the expiry's
+# cached normals. Like price_gbm_european_adaptive, but for the whole chain at once: antithetic
+# pairs, an optional Black-Scholes control variate, and samples added in doubling stages until
+# each contract's standard error is below tolerance. sampler="sobol" prices from scrambled Sobol
+# normals in one stage instead, the error coming from the spread across randomizations
+def price_gbm_chain(cache, underlying, expiry, S0, K, T, r, sigma, is_call, num_simulations, seed=None,
+                    control_values=None, tolerance=None, batch_size=1000, sampler="pseudo", num_randomizations=4,
+                    max_memory_mb=DEFAULT_MAX_MEMORY_MB):
+    """
+    Args:
+        cache (TerminalPriceCache): Cache to read from and fill (one entry per expiry).
+        underlying (str): Underlying symbol, e.g. "NIFTY".
+        expiry (str): Expiry date label.
+        S0, K, sigma, is_call (array-like): Per-contract inputs.
+        T (float): Time to expiration in years (the same for the whole expiry).
+        r (float): Risk-free rate.
+        num_simulations (int): Simulation budget per contract (half of them antithetic); with
+            sampler="sobol", Sobol points per randomization (rounded up to a power of two).
+        seed (int, optional): Seed of the expiry's normals.
+        control_values (array-like, optional): Black-Scholes fair values; the control is the same
+            payoff under risk-neutral GBM driven by the same normals, whose mean they are.
+        tolerance (float, optional): Target standard error; None uses the whole budget.
+        batch_size (int): Samples in the first stage.
+        sampler (str): "pseudo" or "sobol" (randomized QMC; tolerance and batch_size are unused).
+        num_randomizations (int): Independent Sobol scrambles when sampler="sobol".
+        max_memory_mb (float): Cap on the contracts x samples block priced at once.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Fair values and their standard errors; NaN where
+        sigma <= 0 or T <= 0.
+    """
+    S0, K, sigma, is_call = np.broadcast_arrays(
+        np.asarray(S0, dtype=float), np.asarray(K, dtype=float), np.asarray(sigma, dtype=float),
+        np.asarray(is_call, dtype=bool)
+    )
+    fair_values, std_errors = np.full(K.shape, np.nan), np.full(K.shape, np.nan)
+    active = np.flatnonzero(sigma > 0)
+    if T <= 0 or not active.size:
+        return fair_values, std_errors
+
+    # Contracts without a finite control are priced from the payoffs alone
+    control = np.full(K.shape, np.nan) if control_values is None else np.broadcast_to(np.asarray(control_values, dtype=float), K.shape)
+    has_control = np.isfinite(control)
+    control = np.where(has_control, control, 0.0)
+
+    # Terminal log-return of num_steps daily steps: N(-sigma^2 h / 2, sigma^2 h), h = num_steps / 252
+    horizon = gbm_step_parameters(T, 1.0)[0] / TRADING_DAYS_IN_YEAR
+    discount = np.exp(-r * T)
+
+    def pair_payoffs(i, drift, scale, z):
+        up = S0[i, None] * np.exp(drift[:, None] + scale[:, None] * z)
+        down = S0[i, None] * np.exp(drift[:, None] - scale[:, None] * z)
+        call = is_call[i, None]
+        payoff = lambda prices: np.maximum(np.where(call, prices - K[i, None], K[i, None] - prices), 0)
+        return 0.5 * (payoff(up) + payoff(down)) * discount
+
+    def shifted_payoffs(i, z):
+        x = pair_payoffs(i, -0.5 * sigma[i] ** 2 * horizon, sigma[i] * np.sqrt(horizon), z) - control[i, None]
+        c = (pair_payoffs(i, (r - 0.5 * sigma[i] ** 2) * T, sigma[i] * np.sqrt(T), z) - control[i, None]) \
+            * has_control[i, None]
+        return x, c
+
+    if sampler == "sobol":
+        normals = cache.normals(underlying, expiry, seed, num_simulations, "sobol", num_randomizations).normals
+        chunk_size = max(int(max_memory_mb * 1024 ** 2 // (normals.size * 8 * 4)), 1)
+        for start in range(0, active.size, chunk_size):
+            i = active[start:start + chunk_size]
+            x, c = (values.reshape(i.size, *normals.shape) for values in shifted_payoffs(i, normals.ravel()))
+            # One control coefficient from all points, applied to each randomization's means
+            x_centered, c_centered = x - x.mean(axis=(1, 2))[:, None, None], c - c.mean(axis=(1, 2))[:, None, None]
+            var_c = (c_centered ** 2).sum(axis=(1, 2))
+            beta = np.divide((x_centered * c_centered).sum(axis=(1, 2)), var_c, out=np.zeros_like(var_c), where=var_c > 0)
+            estimates = control[i, None] + x.mean(axis=2) - beta[:, None] * c.mean(axis=2)
+            fair_values[i] = estimates.mean(axis=1)
+            std_errors[i] = estimates.std(axis=1, ddof=1) / np.sqrt(num_randomizations)
+        return fair_values, std_errors
+
+    normals = cache.normals(underlying, expiry, seed, max(num_simulations // 2, 2)).normals
+    # Running sums over antithetic pair averages, shifted by the control value for numerical stability
+    sums = np.zeros((5, K.size))  # x, c, xx, cc, xc
+    done = 0
+    end = normals.size if tolerance is None else min(max(batch_size // 2, 2), normals.size)
+    while active.size:
+        z = normals[done:end]
+        chunk_size = max(int(max_memory_mb * 1024 ** 2 // (z.size * 8 * 4)), 1)
+        for start in range(0, active.size, chunk_size):
+            i = active[start:start + chunk_size]
+            x, c = shifted_payoffs(i, z)
+            sums[:, i] += [x.sum(axis=1), c.sum(axis=1), (x * x).sum(axis=1), (c * c).sum(axis=1), (x * c).sum(axis=1)]
+
+        n = end
+        sum_x, sum_c, sum_xx, sum_cc, sum_xc = sums[:, active]
+        mean_x, mean_c = sum_x / n, sum_c / n
+        var_x = np.maximum(sum_xx - n * mean_x ** 2, 0.0) / (n - 1)
+        var_c = np.maximum(sum_cc - n * mean_c ** 2, 0.0) / (n - 1)
+        cov_xc = (sum_xc - n * mean_x * mean_c) / (n - 1)
+        beta = np.divide(cov_xc, var_c, out=np.zeros_like(var_c), where=var_c > 0)
+        fair_values[active] = control[active] + mean_x - beta * mean_c
+        std_errors[active] = np.sqrt(np.maximum(var_x - beta * cov_xc, 0.0) / n)
+
+        if end == normals.size:
+            break
+        active = active[~(std_errors[active] <= tolerance)]
+        done, end = end, min(2 * end, normals.size)
+    return fair_values, std_errors
@@ -0,0 +1,223 @@
+"""
+Kafka consumer service that persists the option_chain_data topic into PostgreSQL.
+
+Messages (one encoded snapshot each, see snapshot.encode_snapshot) are read in batches of
+up to BATCH_SIZE, written in one transaction (changed contracts only, see
+option_store.write_option_snapshots) and their offsets are committed
+only after the write succeeded, so a crash or a failed write re-delivers the batch instead
+of losing it (writes are idempotent upserts). While PostgreSQL is failing, the assigned
+partitions are paused and the write retried with backoff: nothing more is fetched, and the
+consumer stays in its group. Run more instances with the same group id to scale out;
+messages are keyed by symbol, so each symbol is always written by one instance, in order.
+
+    python option_consumer.py --group option_chain_writers --batch-size 5000
+"""
+import argparse
+import time
+
+from confluent_kafka import Consumer, KafkaError, KafkaException, TopicPartition
+
+from db_pool import get_pool
+from metrics import METRICS_PORT, StageTimer, log_event, record_records, start_metrics_server
+from option_store import (
+    DB_CONFIG, KAFKA_BROKER, KAFKA_TOPIC, create_option_chain_table, load_change_tracker, new_change_tracker,
+    write_option_snapshots,
+)
+from option_poller import SYMBOLS
+from snapshot import decode_snapshot
+
+# Constants
+KAFKA_CONSUMER_CONFIG = {
+    "bootstrap.servers": KAFKA_BROKER,
+    "group.id": "option_chain_writers",
+    "enable.auto.commit": False,  # Offsets are committed after the rows are in PostgreSQL
+    "auto.offset.reset": "earliest",
+    "max.poll.interval.ms": 300_000,
+    "queued.max.messages.kbytes": 65_536,  # Bounds the local prefetch queue
+}
+BATCH_SIZE = 20  # Snapshots per write (one message is one symbol's whole chain)
+BATCH_TIMEOUT = 1.0  # Seconds to wait for a batch to fill
+RETRY_BASE_DELAY = 0.5  # Seconds before retrying a failed write; doubled on every retry
+RETRY_MAX_DELAY = 30.0
+METRICS_PIPELINE = "option_consumer"  # pipeline label of this service's metrics
+
+# Initialize the Kafka consumer (overrides are merged into KAFKA_CONSUMER_CONFIG)
+def get_kafka_consumer(config_overrides=None):
+    return Consumer({**KAFKA_CONSUMER_CONFIG, **(config_overrides or {})})
+
+# Write batches of decoded snapshots to option_chain through the connection pool
+class SnapshotStore:
+    def __init__(self, db_config=DB_CONFIG, method="copy", track_changes=True, symbols=SYMBOLS):
+        self.db_config = db_config
+        self.method = method
+        self.symbols = symbols
+        self.tracker = new_change_tracker() if track_changes else None
+
+    # Re-seed the change tracker from the table; called whenever partitions are assigned,
+    # as another instance may have written their contracts since
+    def reload(self):
+        if self.tracker:
+            self.tracker.reset()
+            load_change_tracker(self.tracker, self.symbols)
+
+    def __call__(self, snapshots):
+        with StageTimer(METRICS_PIPELINE, "db_write"), get_pool(self.db_config).connection() as conn:
+            return write_option_snapshots(conn, snapshots, self.method, self.tracker)
+
+# Consume the topic in batches and commit offsets after each successful write
+class OptionChainConsumer:
+    """
+    Args:
+        consumer: confluent_kafka Consumer (or kafka_stand_in.StandInConsumer), not yet subscribed.
+        write_batch (callable): write_batch(snapshots) persists a list of decoded snapshots and
+            raises on failure; typically a SnapshotStore.
+        topic (str): Topic to subscribe to.
+        batch_size (int): Maximum messages per write.
+        batch_timeout (float): Seconds to wait for a batch to fill.
+        on_assign (callable, optional): Called after every partition assignment, e.g. SnapshotStore.reload.
+    """
+
+    def __init__(self, consumer, write_batch, topic=KAFKA_TOPIC, batch_size=BATCH_SIZE,
+                 batch_timeout=BATCH_TIMEOUT, on_assign=None):
+        self.consumer = consumer
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.on_assign = on_assign
+        self.stats = {
+            "batches": 0, "messages": 0, "rows_written": 0, "skipped": 0,
+            "write_failures": 0, "commits": 0, "paused_seconds": 0.0,
+        }
+        self._paused = None  # Partitions paused while a failed write is retried
+        # The default (eager) assignment revokes every partition before reassigning, and each
+        # batch is written before the next consume(), so no write is in flight on rebalance
+        consumer.subscribe([topic], on_assign=self._assigned)
+
+    def _assigned(self, consumer, partitions):
+        print(f"Assigned {len(partitions)} partition(s)")
+        if self._paused is not None:
+            # Rebalanced during a write retry: the new partitions stay paused until it succeeds
+            consumer.pause(partitions)
+            self._paused.extend(partitions)
+        if self.on_assign:
+            self.on_assign()
+
+    # Decode a batch; returns the snapshots and the offsets to commit once they are stored
+    def _decode(self, messages):
+        snapshots = []
+        offsets = {}
+        for msg in messages:
+            if msg.error():
+                if msg.error().code() != KafkaError._PARTITION_EOF:
+                    print(f"Kafka error: {msg.error()}")
+                continue
+            offsets[(msg.topic(), msg.partition())] = msg.offset() + 1
+            try:
+                snapshots.append(decode_snapshot(msg.value()))
+            except (KeyError, TypeError, ValueError) as e:
+                # Unreadable messages can never be written; skip them rather than block the partition
+                self.stats["skipped"] += 1
+                print(f"Skipping undecodable message at {msg.topic()}[{msg.partition()}]@{msg.offset()}: {e}")
+        return snapshots, [TopicPartition(topic, partition, offset) for (topic, partition), offset in offsets.items()]
+
+    # Write, retrying with backoff; partitions stay paused (nothing more is fetched) until it succeeds
+    def _write(self, snapshots):
+        delay = RETRY_BASE_DELAY
+        try:
+            while True:
+                try:
+                    return self.write_batch(snapshots)
+                except Exception as e:
+                    self.stats["write_failures"] += 1
+                    print(f"Error writing {len(snapshots)} snapshot(s), retrying in {delay:.1f}s: {e}")
+                    if self._paused is None:
+                        self._paused = list(self.consumer.assignment())
+                        self.consumer.pause(self._paused)
+                    start = time.perf_counter()
+                    # Keep polling while paused: it keeps the group membership and serves rebalances
+                    deadline = time.monotonic() + delay
+                    while time.monotonic() < deadline:
+                        msg = self.consumer.poll(min(deadline - time.monotonic(), 1.0))
+                        if msg is not None and not msg.error():
+                            # Fetched before its partition was paused: rewind so it is read
+                            # again after the retry rather than skipped by the next commit
+                            self.consumer.seek(TopicPartition(msg.topic(), msg.partition(), msg.offset()))
+                    self.stats["paused_seconds"] += time.perf_counter() - start
+                    delay = min(delay * 2, RETRY_MAX_DELAY)
+        finally:
+            if self._paused:
+                self.consumer.resume(self._paused)
+            self._paused = None
+
+    # Consume, write and commit one batch; returns the number of messages consumed
+    def process_batch(self):
+        messages = self.consumer.consume(num_messages=self.batch_size, timeout=self.batch_timeout)
+        if not messages:
+            return 0
+        with StageTimer(METRICS_PIPELINE, "decode"):
+            snapshots, offsets = self._decode(messages)
+        result = None
+        if snapshots:
+            result = self._write(snapshots)
+            self.stats["rows_written"] += result["rows"] if result else 0
+            for snapshot in snapshots:
+                record_records(METRICS_PIPELINE, snapshot.symbol, len(snapshot.rows))
+        if offsets:
+            try:
+                self.consumer.commit(offsets=offsets, asynchronous=False)
+                self.stats["commits"] += 1
+            except KafkaException as e:
+                # E.g. the partitions were reassigned during a retry: their new owner re-writes
+                # the batch, which the upsert makes harmless
+                print(f"Error committing offsets: {e}")
+        self.stats["batches"] += 1
+        self.stats["messages"] += len(messages)
+        log_event(
+            "batch", pipeline=METRICS_PIPELINE, messages=len(messages), snapshots=len(snapshots),
+            rows_written=result["rows"] if result else 0,
+            db_ms=round(result["seconds"] * 1000, 2) if result else None,
+        )
+        return len(messages)
+
+    # Process batches until stopped (KeyboardInterrupt) or max_batches non-empty batches are done
+    def run(self, max_batches=None, report_every=60):
+        batches = 0
+        last_report = time.monotonic()
+        try:
+            while max_batches is None or batches < max_batches:
+                if self.process_batch():
+                    batches += 1
+                if time.monotonic() - last_report >= report_every:
+                    print(f"Consumer stats: {self.stats}")
+                    last_report = time.monotonic()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.consumer.close()
+        return self.stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Persist the option chain Kafka topic into PostgreSQL.")
+    parser.add_argument("--broker", default=KAFKA_BROKER)
+    parser.add_argument("--topic", default=KAFKA_TOPIC)
+    parser.add_argument("--group", default=KAFKA_CONSUMER_CONFIG["group.id"])
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--batch-timeout", type=float, default=BATCH_TIMEOUT)
+    parser.add_argument("--method", choices=["copy", "values"], default="copy")
+    parser.add_argument("--all-rows", action="store_true", help="Write every row, not only changed contracts.")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT)
+    args = parser.parse_args()
+
+    create_option_chain_table()
+    start_metrics_server(args.metrics_port)
+    store = SnapshotStore(method=args.method, track_changes=not args.all_rows)
+    consumer = get_kafka_consumer({"bootstrap.servers": args.broker, "group.id": args.group})
+    service = OptionChainConsumer(
+        consumer, store, args.topic, args.batch_size, args.batch_timeout, on_assign=store.reload
+    )
+    print(f"Consuming {args.topic} as group {args.group}")
+    stats = service.run()
+    print(f"Stopped: {stats}")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
 import streamlit as st
 import pandas as pd
-import psycopg2
-from scipy.stats import norm
-from math import log, sqrt, exp
+from db_pool import get_connection
+from option_poller import SYMBOLS
+from option_rollups import MAX_POINTS, fetch_contract_series
+from black_scholes import DAYS_IN_YEAR, option_type_flags
+from greeks_cache import get_shared_greeks_cache
 import matplotlib.pyplot as plt
 from datetime import datetime
 
@@ -14,58 +16,26 @@ DB_CONFIG = {
     "host": "localhost",
     "port": 5432,
 }
-DAYS_IN_YEAR = 365  # Used to normalize Theta calculation
 
-# Black-Scholes Greeks Calculation Functions
+# Black-Scholes Greeks Calculation Functions (memoized across reruns and sessions)
 def calculate_greeks(option_type, S, K, T, r, sigma):
-    d1 = (log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * sqrt(T))
-    d2 = d1 - sigma * sqrt(T)
-
-    if option_type == "CE":
-        delta = norm.cdf(d1)
-        theta = (-S * norm.pdf(d1) * sigma / (2 * sqrt(T)) 
-                 - r * K * exp(-r * T) * norm.cdf(d2)) / DAYS_IN_YEAR
-        rho = K * T * exp(-r * T) * norm.cdf(d2)
-    elif option_type == "PE":
-        delta = -norm.cdf(-d1)
-        theta = (-S * norm.pdf(d1) * sigma / (2 * sqrt(T)) 
-                 + r * K * exp(-r * T) * norm.cdf(-d2)) / DAYS_IN_YEAR
-        rho = -K * T * exp(-r * T) * norm.cdf(-d2)
-
-    gamma = norm.pdf(d1) / (S * sigma * sqrt(T))
-    vega = S * norm.pdf(d1) * sqrt(T) / 100  # Vega is reported per 1% change in volatility
-
-    return delta, gamma, vega, theta, rho
-
-# Function to get PostgreSQL connection
+    greeks = get_shared_greeks_cache().lookup(S, K, T, r, sigma, option_type_flags(option_type))
+    return greeks.delta, greeks.gamma, greeks.vega, greeks.theta, greeks.rho
+
+# Function to get PostgreSQL connection (pooled; conn.close() returns it to the pool)
 def get_db_connection():
     try:
-        conn = psycopg2.connect(
-            dbname=DB_CONFIG["dbname"],
-            user=DB_CONFIG["user"],
-            password=DB_CONFIG["password"],
-            host=DB_CONFIG["host"],
-            port=DB_CONFIG["port"],
-        )
-        return conn
+        return get_connection(DB_CONFIG)
     except Exception as e:
         st.error(f"Error connecting to PostgreSQL: {e}")
         return None
 
-# Function to fetch last_price data from PostgreSQL
-def fetch_last_price_data(strike_price, expiry_date, option_type):
-    query = """
-        SELECT timestamp, last_price
-        FROM option_chain
-        WHERE strike_price = %s
-          AND expiry_date = %s
-          AND option_type = %s
-        ORDER BY timestamp ASC;
-    """
+# Function to fetch last_price data from PostgreSQL (raw rows or the rollup that fits max_points)
+def fetch_last_price_data(strike_price, expiry_date, option_type, symbol="NIFTY", max_points=MAX_POINTS):
     conn = get_db_connection()
     if conn:
         try:
-            df = pd.read_sql_query(query, conn, params=(strike_price, expiry_date, option_type))
+            df = fetch_contract_series(conn, symbol, expiry_date, strike_price, option_type, max_points=max_points)
             return df
         except Exception as e:
             st.error(f"Error fetching data: {e}")
@@ -81,18 +51,20 @@ def main():
     st.sidebar.title("Filter Options")
 
     # User input for filtering
+    symbol = st.sidebar.selectbox("Select Symbol:", SYMBOLS)
     strike_price = st.sidebar.number_input("Enter Strike Price:", min_value=0.0, value=0.0, step=0.5)
     expiry_date = st.sidebar.date_input("Select Expiry Date:", min_value=datetime(2020, 1, 1))
     option_type = st.sidebar.selectbox("Select Option Type (CE/PE):", ["CE", "PE"])
+    max_points = st.sidebar.number_input("Max Points to Plot:", min_value=10, value=MAX_POINTS, step=50)
     risk_free_rate = st.sidebar.number_input("Enter Risk-Free Rate (in %):", min_value=0.0, value=5.0, step=0.1) / 100
     volatility = st.sidebar.number_input("Enter Implied Volatility (in %):", min_value=0.0, value=20.0, step=0.1) / 100
     current_price = st.sidebar.number_input("Enter Current Underlying Price:", min_value=0.0, value=0.0, step=0.1)
 
     if st.sidebar.button("Fetch and Plot Data"):
         with st.spinner("Fetching data..."):
-            data = fetch_last_price_data(strike_price, expiry_date, option_type)
+            data = fetch_last_price_data(strike_price, expiry_date, option_type, symbol, max_points)
             if data is not None and not data.empty:
-                st.success("Data fetched successfully!")
+                st.success(f"Data fetched successfully! {len(data)} points at {data.attrs['resolution']} resolution.")
                 data["timestamp"] = pd.to_datetime(data["timestamp"])
 
                 # Calculate Time to Expiration (T) in years
@@ -101,13 +73,17 @@ def main():
                     st.warning("The expiry date must be in the future.")
                     return
 
-                # Calculate Greeks
-                greeks = data["last_price"].apply(
-                    lambda last_price: calculate_greeks(
-                        option_type, current_price, strike_price, T, risk_free_rate, volatility
-                    )
+                # Calculate Greeks (the inputs are the same for every row, so evaluate once)
+                delta, gamma, vega, theta, rho = calculate_greeks(
+                    option_type, current_price, strike_price, T, risk_free_rate, volatility
+                )
+                data["Delta"], data["Gamma"], data["Vega"], data["Theta"], data["Rho"] = delta, gamma, vega, theta, rho
+
+                cache_stats = get_shared_greeks_cache().stats()
+                st.sidebar.caption(
+                    f"Greeks cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                    f"({cache_stats['hit_rate']:.0%} hit rate, {cache_stats['entries']} entries)"
                 )
-                data["Delta"], data["Gamma"], data["Vega"], data["Theta"], data["Rho"] = zip(*greeks)
 
                 # Display data
                 st.subheader("Option Data with Greeks")
@@ -1,177 +1,227 @@
 import time
-import requests
-import json
 from datetime import datetime
 from confluent_kafka import Producer
 import streamlit as st
 import pandas as pd
-import psycopg2
-from psycopg2.extras import execute_values
+from db_pool import get_connection, pool_stats
+from metrics import StageTimer, log_event, record_error, record_records, start_metrics_server
+from option_poller import SYMBOLS, poll_forever
+from option_store import (
+    DB_CONFIG, KAFKA_BROKER, KAFKA_TOPIC, OPTION_CHAIN_COLUMNS, ensure_option_chain_table, load_change_tracker,
+    new_change_tracker, write_option_snapshots,
+)
+from snapshot import encode_snapshot, parse_snapshot
 
 # Constants
-API_BASE_URL = "http://localhost:5000"
-OPTION_CHAIN_ENDPOINT = f"{API_BASE_URL}/index-option-chain"
-KAFKA_BROKER = "localhost:9092"
-KAFKA_TOPIC = "option_chain_data"
-DB_CONFIG = {
-    "dbname": "optiondb",
-    "user": "root",
-    "password": "arka1256",
-    "host": "localhost",
-    "port": 5432,
+# A whole snapshot is one message (~140 bytes per contract before compression, well under the
+# default 1 MB message limit), produced asynchronously and flushed once per cycle
+KAFKA_PRODUCER_CONFIG = {
+    "bootstrap.servers": KAFKA_BROKER,
+    "linger.ms": 50,  # Wait up to 50 ms to fill a batch
+    "batch.size": 1_000_000,  # Bytes per partition batch
+    "compression.type": "lz4",
+    "queue.buffering.max.messages": 100_000,
+    "acks": "all",
 }
+KAFKA_FLUSH_TIMEOUT = 10  # Seconds to wait for outstanding deliveries at the end of a cycle
+METRICS_PIPELINE = "option_insert"  # pipeline label of this script's metrics
+METRICS_PORT = 9109  # Not metrics.METRICS_PORT, which option_consumer.py serves on the same host
 
-# Establish a PostgreSQL connection
+# Establish a PostgreSQL connection (pooled; conn.close() returns it to the pool)
 def get_db_connection():
     try:
-        conn = psycopg2.connect(
-            dbname=DB_CONFIG["dbname"],
-            user=DB_CONFIG["user"],
-            password=DB_CONFIG["password"],
-            host=DB_CONFIG["host"],
-            port=DB_CONFIG["port"],
-        )
-        return conn
+        return get_connection(DB_CONFIG)
     except Exception as e:
         st.error(f"Error connecting to PostgreSQL: {e}")
         return None
 
-# Ensure the option_chain table exists
+# Ensure the option_chain table exists, reporting on the page (see option_store.ensure_option_chain_table)
 def create_option_chain_table():
-    create_table_query = """
-    CREATE TABLE IF NOT EXISTS option_chain (
-        strike_price NUMERIC NOT NULL,
-        expiry_date DATE NOT NULL,
-        option_type VARCHAR(2) NOT NULL,
-        open_interest NUMERIC,
-        change_in_open_interest NUMERIC,
-        pchange_in_open_interest NUMERIC,
-        total_traded_volume NUMERIC,
-        implied_volatility NUMERIC,
-        last_price NUMERIC,
-        change NUMERIC,
-        p_change NUMERIC,
-        total_buy_quantity NUMERIC,
-        total_sell_quantity NUMERIC,
-        bid_qty NUMERIC,
-        bid_price NUMERIC,
-        ask_qty NUMERIC,
-        ask_price NUMERIC,
-        underlying_value NUMERIC,
-        timestamp TIMESTAMP NOT NULL,
-        PRIMARY KEY (strike_price, option_type, expiry_date, timestamp)
-    );
-    """
     conn = get_db_connection()
     if conn:
         try:
-            with conn.cursor() as cursor:
-                cursor.execute(create_table_query)
-            conn.commit()
+            warning = ensure_option_chain_table(conn)
+            if warning:
+                st.warning(warning)
             st.success("Database table 'option_chain' is ready.")
         except Exception as e:
             st.error(f"Error creating option_chain table: {e}")
         finally:
             conn.close()
 
-# Initialize Kafka Producer
-def get_kafka_producer():
+# Initialize Kafka Producer (overrides are merged into KAFKA_PRODUCER_CONFIG)
+def get_kafka_producer(config_overrides=None):
     try:
-        producer = Producer({"bootstrap.servers": KAFKA_BROKER})
+        producer = Producer({**KAFKA_PRODUCER_CONFIG, **(config_overrides or {})})
         return producer
     except Exception as e:
         st.error(f"Error initializing Kafka Producer: {e}")
         return None
 
-# Fetch option chain data from the API
-def fetch_option_chain(symbol):
-    try:
-        response = requests.get(OPTION_CHAIN_ENDPOINT, params={"symbol": symbol})
-        response.raise_for_status()
-        return response.json()["optionChainData"]["records"]["data"]
-    except Exception as e:
-        st.error(f"Error fetching option chain data: {e}")
-        return None
+# Delivery callback that counts acknowledged and failed messages for one cycle
+class DeliveryReport:
+    def __init__(self):
+        self.delivered = 0
+        self.failed = 0
+        self.last_error = None
+
+    def __call__(self, err, msg):
+        if err is None:
+            self.delivered += 1
+        else:
+            self.failed += 1
+            self.last_error = err
+
+# Produce a whole snapshot as one message (see snapshot.encode_snapshot), keyed by symbol
+def produce_snapshot(producer, snapshot, topic=KAFKA_TOPIC, flush_timeout=KAFKA_FLUSH_TIMEOUT):
+    """
+    The compact array buffer replaces one JSON message per contract; keying by symbol keeps
+    every snapshot of a symbol in order on one partition.
+
+    Args:
+        producer: confluent_kafka Producer (or anything with produce/poll/flush).
+        snapshot (OptionSnapshot): Parsed snapshot.
+        topic (str): Kafka topic.
+        flush_timeout (float): Seconds to wait for the delivery.
+
+    Returns:
+        dict: produced, delivered, failed and undelivered (still queued after the flush
+        timeout) message counts, the contracts and bytes sent, the last delivery error and
+        the elapsed seconds.
+    """
+    report = DeliveryReport()
+    start = time.perf_counter()
+    value = encode_snapshot(snapshot)
+    while True:
+        try:
+            producer.produce(topic, key=snapshot.symbol.encode("utf-8"), value=value, on_delivery=report)
+            break
+        except BufferError:
+            producer.poll(0.5)  # Local queue is full: serve callbacks until there is room
 
-# Stream option chain data to Kafka
-def stream_option_data(producer):
+    undelivered = producer.flush(flush_timeout)
+    return {
+        "produced": 1,
+        "delivered": report.delivered,
+        "failed": report.failed,
+        "undelivered": undelivered,
+        "contracts": len(snapshot.rows),
+        "bytes": len(value),
+        "last_error": report.last_error,
+        "seconds": time.perf_counter() - start,
+    }
+
+# Stream option chain data to Kafka, polling every symbol on each minute boundary
+def stream_option_data(producer, symbols=SYMBOLS, persist=False, metrics_port=METRICS_PORT):
+    """
+    Snapshots go to Kafka only; option_consumer.py reads the topic and writes them to
+    PostgreSQL, so a slow database never delays the next poll. persist=True also writes from
+    this process, for running without the consumer service. Metrics are served on metrics_port.
+    """
     if producer is None:
         st.error("Kafka Producer is not initialized.")
         return
 
-    symbol = "NIFTY"  # Replace with the desired index symbol
+    tracker = None
+    if persist:
+        # Ensure the table exists
+        create_option_chain_table()
+        tracker = new_change_tracker()
+        load_change_tracker(tracker, symbols)
 
-    # Ensure the table exists
-    create_option_chain_table()
+    def handle_snapshot(symbol, data, timestamp):
+        with StageTimer(METRICS_PIPELINE, "parse") as parse:
+            snapshot = parse_snapshot(data, timestamp, symbol)
+        try:
+            with StageTimer(METRICS_PIPELINE, "kafka_produce") as produce:
+                result = produce_snapshot(producer, snapshot)
+            if result["failed"] or result["undelivered"]:
+                record_error(METRICS_PIPELINE, "kafka_produce")
+                st.error(
+                    f"Kafka delivery incomplete for {symbol}: {result['failed']} failed, {result['undelivered']} "
+                    f"undelivered of {result['produced']} (last error: {result['last_error']})"
+                )
+        except Exception as e:
+            st.error(f"Error streaming {symbol} data to Kafka: {e}")
 
-    while True:
-        data = fetch_option_chain(symbol)
-        if data:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            for record in data:
-                for option_type in ["CE", "PE"]:
-                    if option_type in record:
-                        option_data = record[option_type]
-                        option_data["optionType"] = option_type
-                        option_data["timestamp"] = timestamp
-                        try:
-                            producer.produce(KAFKA_TOPIC, value=json.dumps(option_data).encode("utf-8"))
-                            producer.flush()
-                            store_option_data_in_db(option_data)
-                        except Exception as e:
-                            st.error(f"Error streaming data to Kafka or storing in DB: {e}")
-        time.sleep(60)  # Fetch data every 60 seconds
-
-# Store or update option chain data in PostgreSQL
-def store_option_data_in_db(option_data):
-    required_keys = [
-        "strikePrice", "expiryDate", "optionType", "openInterest", "changeinOpenInterest",
-        "pchangeinOpenInterest", "totalTradedVolume", "impliedVolatility", "lastPrice",
-        "change", "pChange", "totalBuyQuantity", "totalSellQuantity", "bidQty", "bidprice",
-        "askQty", "askPrice", "underlyingValue", "timestamp"
-    ]
-    
-    # Extract only the required keys and maintain the order
-    try:
-        values = {key: option_data.get(key, None) for key in required_keys}
-        upsert_query = """
-        INSERT INTO option_chain (
-            strike_price, expiry_date, option_type, open_interest, change_in_open_interest,
-            pchange_in_open_interest, total_traded_volume, implied_volatility, last_price,
-            change, p_change, total_buy_quantity, total_sell_quantity, bid_qty, bid_price,
-            ask_qty, ask_price, underlying_value, timestamp
-        ) VALUES %s
-        ON CONFLICT (strike_price, option_type, expiry_date, timestamp)
-        DO UPDATE SET
-            open_interest = EXCLUDED.open_interest,
-            change_in_open_interest = EXCLUDED.change_in_open_interest,
-            pchange_in_open_interest = EXCLUDED.pchange_in_open_interest,
-            total_traded_volume = EXCLUDED.total_traded_volume,
-            implied_volatility = EXCLUDED.implied_volatility,
-            last_price = EXCLUDED.last_price,
-            change = EXCLUDED.change,
-            p_change = EXCLUDED.p_change,
-            total_buy_quantity = EXCLUDED.total_buy_quantity,
-            total_sell_quantity = EXCLUDED.total_sell_quantity,
-            bid_qty = EXCLUDED.bid_qty,
-            bid_price = EXCLUDED.bid_price,
-            ask_qty = EXCLUDED.ask_qty,
-            ask_price = EXCLUDED.ask_price,
-            underlying_value = EXCLUDED.underlying_value;
-        """
-        
-        conn = get_db_connection()
-        if conn:
-            try:
-                with conn.cursor() as cursor:
-                    execute_values(cursor, upsert_query, [[values[key] for key in required_keys]])
-                conn.commit()
-            except Exception as e:
-                st.error(f"Error inserting/updating data in PostgreSQL: {e}")
-            finally:
-                conn.close()
-    except KeyError as e:
-        st.error(f"Missing required key in option data: {e}")
+        write = None
+        if persist:
+            with StageTimer(METRICS_PIPELINE, "db_write") as write:
+                if store_option_snapshot_in_db(snapshot, tracker=tracker) is None and len(snapshot.rows):
+                    record_error(METRICS_PIPELINE, "db_write")
+        record_records(METRICS_PIPELINE, symbol, len(snapshot.rows))
+        log_event(
+            "snapshot", pipeline=METRICS_PIPELINE, symbol=symbol, timestamp=timestamp, records=len(snapshot.rows),
+            parse_ms=round(parse.seconds * 1000, 2), produce_ms=round(produce.seconds * 1000, 2),
+            db_ms=round(write.seconds * 1000, 2) if write else None,
+        )
+
+    start_metrics_server(metrics_port)
+    poll_forever(handle_snapshot, symbols)
+
+# Store or update a whole option chain snapshot in PostgreSQL in one transaction
+def store_option_snapshot_in_db(snapshot, method="copy", tracker=None):
+    if not len(snapshot.rows):
+        return None
+    conn = get_db_connection()
+    if conn:
+        try:
+            result = write_option_snapshots(conn, [snapshot], method, tracker)
+            print(
+                f"Stored {result['rows']} of {result['rows_received']} option rows (changed only) in "
+                f"{result['seconds'] * 1000:.1f} ms ({result['method']})"
+            )
+            return result
+        except Exception as e:
+            st.error(f"Error inserting/updating data in PostgreSQL: {e}")
+        finally:
+            conn.close()
+    return None
+
+# Reconstruct the full chain of a symbol as it stood at as_of: each live contract's latest
+# stored row at or before as_of, with the underlying value recorded for that time
+def fetch_chain_as_of(symbol, as_of):
+    query = """
+        SELECT c.*, u.underlying_value AS underlying_value_as_of
+        FROM (
+            SELECT DISTINCT ON (strike_price, option_type, expiry_date) {columns}
+            FROM option_chain
+            WHERE symbol = %(symbol)s AND timestamp <= %(as_of)s AND expiry_date >= %(as_of)s::date
+            ORDER BY strike_price, option_type, expiry_date, timestamp DESC
+        ) c
+        LEFT JOIN LATERAL (
+            SELECT underlying_value
+            FROM option_underlying
+            WHERE symbol = %(symbol)s AND timestamp <= %(as_of)s
+            ORDER BY timestamp DESC
+            LIMIT 1
+        ) u ON TRUE
+        ORDER BY c.expiry_date, c.strike_price, c.option_type;
+    """.format(columns=", ".join(OPTION_CHAIN_COLUMNS))
+    conn = get_db_connection()
+    if conn:
+        try:
+            df = pd.read_sql_query(query, conn, params={"symbol": symbol, "as_of": as_of})
+            df["underlying_value"] = df.pop("underlying_value_as_of").fillna(df["underlying_value"])
+            return df.rename(columns={"timestamp": "last_changed"})
+        except Exception as e:
+            st.error(f"Error reconstructing option chain: {e}")
+        finally:
+            conn.close()
+    return None
+
+# Display the reconstructed chain for a symbol at a chosen time
+def display_chain_as_of():
+    st.title("🕰️ Option Chain As Of")
+    symbol = st.sidebar.selectbox("Select Symbol:", SYMBOLS)
+    as_of_date = st.sidebar.date_input("Date:")
+    as_of_time = st.sidebar.time_input("Time:", step=60)
+    as_of = datetime.combine(as_of_date, as_of_time)
+    df = fetch_chain_as_of(symbol, as_of)
+    if df is not None and not df.empty:
+        st.dataframe(df)
+    elif df is not None:
+        st.info(f"No {symbol} data stored at or before {as_of}.")
 
 
 # Display stored option chain data in Streamlit with a filter and sorting by latest timestamp, expiry_date, and ascending strike_price
@@ -181,14 +231,16 @@ def display_stored_data():
     conn = get_db_connection()
     if conn:
         try:
-            query = """
-                SELECT *
-                FROM option_chain
-                WHERE total_traded_volume > 10000
+            # The current chain only; past snapshots are under "Chain As Of"
+            query = f"""
+                SELECT {', '.join(OPTION_CHAIN_COLUMNS)}
+                FROM option_chain_latest
+                WHERE total_traded_volume > 10000 AND expiry_date >= CURRENT_DATE
                 ORDER BY timestamp DESC, strike_price ASC;
             """
             df = pd.read_sql_query(query, conn)
             if not df.empty:
+                st.caption("Latest values of every live contract; timestamp is when they last changed.")
                 st.dataframe(df)
 
                 # Add a button to download the DataFrame as a CSV file
@@ -209,13 +261,20 @@ def display_stored_data():
 # Main function to handle producer, consumer, and display
 def main():
     st.sidebar.title("Mode Selection")
-    mode = st.sidebar.radio("Choose Mode", ["Stream Option Data", "Display Filtered and Sorted Data"])
+    mode = st.sidebar.radio("Choose Mode", ["Stream Option Data", "Display Filtered and Sorted Data", "Chain As Of"])
 
     if mode == "Stream Option Data":
+        persist = st.sidebar.checkbox("Also write to PostgreSQL (when option_consumer.py is not running)", value=False)
+        metrics_port = st.sidebar.number_input("Metrics port", value=METRICS_PORT, step=1)
         producer = get_kafka_producer()
-        stream_option_data(producer)
+        stream_option_data(producer, persist=persist, metrics_port=int(metrics_port))
     elif mode == "Display Filtered and Sorted Data":
         display_stored_data()
+    elif mode == "Chain As Of":
+        display_chain_as_of()
+
+    with st.sidebar.expander("Connection pool"):
+        st.json(pool_stats())
 
 if __name__ == "__main__":
     main()
@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
-import psycopg2
+from db_pool import get_connection
+from option_poller import SYMBOLS
+from option_rollups import MAX_POINTS, fetch_contract_series
 import matplotlib.pyplot as plt
 from datetime import datetime
 
@@ -13,35 +15,20 @@ DB_CONFIG = {
     "port": 5432,
 }
 
-# Function to get PostgreSQL connection
+# Function to get PostgreSQL connection (pooled; conn.close() returns it to the pool)
 def get_db_connection():
     try:
-        conn = psycopg2.connect(
-            dbname=DB_CONFIG["dbname"],
-            user=DB_CONFIG["user"],
-            password=DB_CONFIG["password"],
-            host=DB_CONFIG["host"],
-            port=DB_CONFIG["port"],
-        )
-        return conn
+        return get_connection(DB_CONFIG)
     except Exception as e:
         st.error(f"Error connecting to PostgreSQL: {e}")
         return None
 
-# Function to fetch data from PostgreSQL
-def fetch_option_data(strike_price, expiry_date, option_type):
-    query = """
-        SELECT timestamp, last_price, implied_volatility, total_traded_volume, open_interest
-        FROM option_chain
-        WHERE strike_price = %s
-          AND expiry_date = %s
-          AND option_type = %s
-        ORDER BY timestamp ASC;
-    """
+# Function to fetch data from PostgreSQL (raw rows or the rollup that fits max_points)
+def fetch_option_data(strike_price, expiry_date, option_type, symbol="NIFTY", max_points=MAX_POINTS):
     conn = get_db_connection()
     if conn:
         try:
-            df = pd.read_sql_query(query, conn, params=(strike_price, expiry_date, option_type))
+            df = fetch_contract_series(conn, symbol, expiry_date, strike_price, option_type, max_points=max_points)
             return df
         except Exception as e:
             st.error(f"Error fetching data: {e}")
@@ -57,16 +44,18 @@ def main():
     st.sidebar.title("Filter Options")
     
     # User inputs for filtering
+    symbol = st.sidebar.selectbox("Select Symbol:", SYMBOLS)
     strike_price = st.sidebar.number_input("Enter Strike Price:", min_value=0.0, value=0.0, step=0.5)
     expiry_date = st.sidebar.date_input("Select Expiry Date:", min_value=datetime(2020, 1, 1))
     option_type = st.sidebar.selectbox("Select Option Type (CE/PE):", ["CE", "PE"])
+    max_points = st.sidebar.number_input("Max Points to Plot:", min_value=10, value=MAX_POINTS, step=50)
     
     # Fetch and plot data
     if st.sidebar.button("Fetch and Plot Data"):
         with st.spinner("Fetching data..."):
-            data = fetch_option_data(strike_price, expiry_date, option_type)
+            data = fetch_option_data(strike_price, expiry_date, option_type, symbol, max_points)
             if data is not None and not data.empty:
-                st.success("Data fetched successfully!")
+                st.success(f"Data fetched successfully! {len(data)} points at {data.attrs['resolution']} resolution.")
 
                 # Plot Implied Volatility vs Last Price
                 st.subheader(f"Implied Volatility vs Last Price for {option_type} ({strike_price}, {expiry_date})")
@@ -0,0 +1,241 @@
+"""
+Daily range partitions of option_chain on expiry_date.
+
+Every expiry gets its own partition (option_chain_pYYYYMMDD, FOR VALUES FROM (day) TO
+(day + 1)), created at ingest time the first time a snapshot contains that expiry. Every
+per-contract query filters on expiry_date, so it only reads one partition however much
+history there is. Expired partitions are detached (and optionally dropped) once they
+are RETENTION_DAYS past expiry; a detached partition is an ordinary table that can be
+archived before it is dropped.
+
+    python option_partitions.py list
+    python option_partitions.py migrate        # convert an existing unpartitioned option_chain
+    python option_partitions.py detach --retention-days 30 [--drop]
+"""
+import argparse
+import threading
+from datetime import date, datetime, timedelta
+
+from psycopg2 import sql
+
+# Constants
+TABLE_NAME = "option_chain"
+RETENTION_DAYS = 30  # Days after expiry before a partition is detached
+COPY_KEY = ["symbol", "strike_price", "option_type", "expiry_date", "timestamp"]  # option_chain's primary key
+COPY_BATCH_ROWS = 50_000  # Rows copied per transaction when moving history between tables
+
+_known_partitions = {}  # table -> partition names known to exist in this process (None: not partitioned)
+_known_lock = threading.Lock()
+
+def partition_name(expiry, table=TABLE_NAME):
+    return f"{table}_p{expiry:%Y%m%d}"
+
+def is_partitioned(conn, table=TABLE_NAME):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+        row = cursor.fetchone()
+    return bool(row) and row[0] == "p"
+
+# Attached partitions with their expiry day, oldest first
+def list_partitions(conn, table=TABLE_NAME):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(%s)
+            ORDER BY c.relname
+            """,
+            (table,),
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    prefix = f"{table}_p"
+    return [
+        (name, datetime.strptime(name[len(prefix):], "%Y%m%d").date())
+        for name in names if name.startswith(prefix) and name[len(prefix):].isdigit()
+    ]
+
+# Create the partitions of any expiries that do not have one yet, in their own transaction
+def ensure_partitions(conn, expiry_dates, table=TABLE_NAME):
+    """
+    Called before every write; after the first call per process it only checks an in-memory
+    set, so it costs nothing unless a new expiry appears. Does nothing if the table is not
+    partitioned (restart writers after `migrate`).
+
+    Args:
+        conn: psycopg2 connection with no transaction in progress (this commits).
+        expiry_dates (iterable[date]): Expiries about to be written.
+        table (str): Partitioned parent table.
+
+    Returns:
+        list[str]: Partitions created.
+    """
+    with _known_lock:
+        if table not in _known_partitions:
+            _known_partitions[table] = (
+                {name for name, _ in list_partitions(conn, table)} if is_partitioned(conn, table) else None
+            )
+            conn.commit()
+        known = _known_partitions[table]
+    if known is None:
+        return []
+    missing = sorted({expiry for expiry in expiry_dates if partition_name(expiry, table) not in known})
+    created = []
+    for expiry in missing:
+        name = partition_name(expiry, table)
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)").format(
+                        sql.Identifier(name), sql.Identifier(table)
+                    ),
+                    (expiry, expiry + timedelta(days=1)),
+                )
+            conn.commit()
+            created.append(name)
+        except Exception as e:
+            conn.rollback()
+            # Another writer may have created it first; anything else surfaces on the insert
+            print(f"Error creating partition {name}: {e}")
+            continue
+        with _known_lock:
+            known.add(name)
+    return created
+
+# Drop the in-memory partition list (after the table was replaced), so it is read again
+def forget_partitions(table=TABLE_NAME):
+    with _known_lock:
+        _known_partitions.pop(table, None)
+
+# Detach (and optionally drop) partitions more than retention_days past expiry
+def detach_expired_partitions(conn, retention_days=RETENTION_DAYS, drop=False, table=TABLE_NAME, today=None):
+    cutoff = (today or date.today()) - timedelta(days=retention_days)
+    detached = []
+    for name, expiry in list_partitions(conn, table):
+        if expiry >= cutoff:
+            continue
+        with conn.cursor() as cursor:
+            cursor.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(sql.Identifier(table), sql.Identifier(name)))
+            if drop:
+                cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(name)))
+        conn.commit()
+        detached.append(name)
+        with _known_lock:
+            (_known_partitions.get(table) or set()).discard(name)
+    return detached
+
+# Copy one expiry of source into table in key order, batch_rows per transaction: each batch reads
+# the key index from where the last one stopped, so no statement (or transaction) runs long.
+# select_list converts the source columns (default: copied as they are); returns rows inserted
+def copy_expiry(conn, source, expiry, columns, select_list=None, table=TABLE_NAME, batch_rows=COPY_BATCH_ROWS):
+    key_list = sql.SQL(", ").join(map(sql.Identifier, COPY_KEY))
+    query = sql.SQL("""
+        WITH batch AS (
+            SELECT * FROM {source} WHERE expiry_date = %s {after} ORDER BY {key} LIMIT %s
+        ), inserted AS (
+            INSERT INTO {table} ({columns}) SELECT {select_list} FROM batch ON CONFLICT DO NOTHING RETURNING 1
+        )
+        SELECT (SELECT count(*) FROM batch), (SELECT count(*) FROM inserted), {key}
+        FROM batch ORDER BY {key_desc} LIMIT 1
+    """)
+    columns = sql.SQL(", ").join(map(sql.Identifier, columns))
+    copied = 0
+    last = None
+    while True:
+        after = sql.SQL("AND ({}) > ({})").format(key_list, sql.SQL(", ").join([sql.Placeholder()] * len(COPY_KEY)))
+        statement = query.format(
+            source=sql.Identifier(source), table=sql.Identifier(table), after=after if last else sql.SQL(""),
+            key=key_list, columns=columns, select_list=select_list or columns,
+            key_desc=sql.SQL(", ").join(sql.SQL("{} DESC").format(sql.Identifier(column)) for column in COPY_KEY),
+        )
+        with conn.cursor() as cursor:
+            cursor.execute(statement, (expiry, *(last or ()), batch_rows))
+            row = cursor.fetchone()
+        conn.commit()
+        if row is None:
+            return copied
+        copied += row[1]
+        last = row[2:]
+        if row[0] < batch_rows:
+            return copied
+
+# Convert an existing unpartitioned table: rename it, create the partitioned table with
+# create_sql, and copy the rows over one expiry at a time, batch_rows per transaction
+def migrate_to_partitioned(conn, create_sql, table=TABLE_NAME, drop_old=True, progress=print,
+                           batch_rows=COPY_BATCH_ROWS):
+    if is_partitioned(conn, table):
+        return 0
+    forget_partitions(table)
+    old = f"{table}_unpartitioned"
+    with conn.cursor() as cursor:
+        cursor.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(sql.Identifier(table), sql.Identifier(old)))
+        cursor.execute(sql.SQL("ALTER INDEX IF EXISTS {} RENAME TO {}").format(
+            sql.Identifier(f"{table}_pkey"), sql.Identifier(f"{old}_pkey")
+        ))
+        cursor.execute(create_sql)
+    conn.commit()  # New snapshots go to the partitioned table from here on
+
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT column_name FROM information_schema.columns WHERE table_name = %s AND column_name IN "
+            "(SELECT column_name FROM information_schema.columns WHERE table_name = %s)",
+            (old, table),
+        )
+        columns = [row[0] for row in cursor.fetchall()]
+        cursor.execute(sql.SQL("SELECT DISTINCT expiry_date FROM {} ORDER BY 1").format(sql.Identifier(old)))
+        expiries = [row[0] for row in cursor.fetchall()]
+    conn.commit()
+
+    copied = 0
+    for expiry in expiries:
+        ensure_partitions(conn, [expiry], table)
+        copied += copy_expiry(conn, old, expiry, columns, table=table, batch_rows=batch_rows)
+        if progress:
+            progress(f"Copied expiry {expiry}: {copied:,} rows so far")
+
+    if drop_old:
+        with conn.cursor() as cursor:
+            cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(old)))
+        conn.commit()
+    return copied
+
+def main():
+    # Imported here: option_store imports this module for ensure_partitions
+    from db_pool import get_maintenance_connection
+    from option_store import DB_CONFIG, OPTION_CHAIN_DDL
+
+    parser = argparse.ArgumentParser(description="Manage the expiry_date partitions of option_chain.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List attached partitions.")
+    migrate = commands.add_parser("migrate", help="Convert an unpartitioned option_chain in place.")
+    migrate.add_argument("--keep-old", action="store_true", help="Keep option_chain_unpartitioned after copying.")
+    migrate.add_argument("--batch-rows", type=int, default=COPY_BATCH_ROWS, help="Rows per transaction.")
+    detach = commands.add_parser("detach", help="Detach partitions past the retention period.")
+    detach.add_argument("--retention-days", type=int, default=RETENTION_DAYS)
+    detach.add_argument("--drop", action="store_true", help="Drop the detached partitions.")
+    args = parser.parse_args()
+
+    conn = get_maintenance_connection(DB_CONFIG)
+    try:
+        if args.command == "list":
+            for name, expiry in list_partitions(conn):
+                print(f"{name}  expiry {expiry}")
+        elif args.command == "migrate":
+            from schema import SCHEMA_VERSION, schema_version
+            if is_partitioned(conn):
+                print("option_chain is already partitioned.")
+            elif schema_version(conn) < SCHEMA_VERSION:
+                print("option_chain has the version 1 layout: `python schema.py migrate` converts and partitions it.")
+            else:
+                copied = migrate_to_partitioned(
+                    conn, OPTION_CHAIN_DDL, drop_old=not args.keep_old, batch_rows=args.batch_rows
+                )
+                print(f"Migrated {copied:,} rows. Restart running writers so they create partitions.")
+        else:
+            detached = detach_expired_partitions(conn, args.retention_days, args.drop)
+            print(f"{'Dropped' if args.drop else 'Detached'} {len(detached)} partition(s): {', '.join(detached) or '-'}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import asyncio
+import math
+import random
+import time
+from datetime import datetime
+
+import aiohttp
+
+from metrics import POLL_CYCLE_SECONDS, POLL_FETCH_ERRORS, POLL_FETCH_SECONDS, POLL_SKIPPED_CYCLES, log_event, record_error
+
+# Constants
+API_BASE_URL = "http://localhost:5000"
+OPTION_CHAIN_ENDPOINT = f"{API_BASE_URL}/index-option-chain"
+SYMBOLS = ["NIFTY", "BANKNIFTY", "FINNIFTY", "MIDCPNIFTY"]
+
+POLL_INTERVAL = 60  # Seconds; polls fire on wall-clock multiples of this (minute boundaries)
+REQUEST_TIMEOUT = 10  # Seconds allowed for one request, including reading the body
+MAX_RETRIES = 2  # Extra attempts per symbol and cycle
+RETRY_BASE_DELAY = 0.5  # Seconds; doubled on every retry, with jitter
+MAX_CONCURRENCY = 8  # Requests in flight at once (also the HTTP connection pool size)
+
+# Next wall-clock multiple of interval after now (epoch seconds)
+def next_boundary(now, interval=POLL_INTERVAL):
+    return (math.floor(now / interval) + 1) * interval
+
+# Fetch one symbol's option chain, retrying timeouts and HTTP errors with jittered backoff
+async def fetch_option_chain(session, semaphore, symbol, endpoint=OPTION_CHAIN_ENDPOINT,
+                             timeout=REQUEST_TIMEOUT, retries=MAX_RETRIES):
+    for attempt in range(retries + 1):
+        try:
+            async with semaphore:
+                async with session.get(
+                    endpoint, params={"symbol": symbol}, timeout=aiohttp.ClientTimeout(total=timeout)
+                ) as response:
+                    response.raise_for_status()
+                    payload = await response.json(content_type=None)
+            return payload["optionChainData"]["records"]["data"]
+        except (aiohttp.ClientError, asyncio.TimeoutError, KeyError, TypeError, ValueError) as e:
+            if attempt == retries:
+                print(f"Error fetching option chain data for {symbol}: {e!r}")
+                return None
+            # Jitter keeps retries for different symbols from hitting the API in lockstep
+            await asyncio.sleep(RETRY_BASE_DELAY * 2 ** attempt * random.uniform(0.5, 1.5))
+
+# Fetch every symbol concurrently
+async def fetch_all(session, semaphore, symbols, endpoint=OPTION_CHAIN_ENDPOINT,
+                    timeout=REQUEST_TIMEOUT, retries=MAX_RETRIES):
+    results = await asyncio.gather(
+        *(fetch_option_chain(session, semaphore, symbol, endpoint, timeout, retries) for symbol in symbols)
+    )
+    return dict(zip(symbols, results))
+
+# Poll all symbols on every interval boundary and hand each snapshot to handle_snapshot
+async def run_poller(handle_snapshot, symbols=SYMBOLS, endpoint=OPTION_CHAIN_ENDPOINT,
+                     interval=POLL_INTERVAL, max_concurrency=MAX_CONCURRENCY, timeout=REQUEST_TIMEOUT,
+                     retries=MAX_RETRIES, cycles=None):
+    """
+    Every cycle starts on a wall-clock boundary computed from the clock, not from the end of
+    the previous cycle, so fetch and processing time never accumulate into drift. All symbols
+    of a cycle share the boundary as their timestamp. A cycle that overruns skips the
+    boundaries it missed instead of firing late.
+
+    Args:
+        handle_snapshot (callable): handle_snapshot(symbol, data, timestamp), called for each
+            symbol that returned data, on the polling thread once all fetches of the cycle are done.
+        symbols (list[str]): Index symbols to poll.
+        endpoint (str): Option chain API endpoint (takes a symbol query parameter).
+        interval (float): Seconds between polls.
+        max_concurrency (int): Concurrent requests and pooled connections.
+        timeout (float): Seconds allowed per request.
+        retries (int): Extra attempts per symbol and cycle.
+        cycles (int, optional): Stop after this many cycles; runs forever if omitted.
+    """
+    connector = aiohttp.TCPConnector(limit=max_concurrency, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        semaphore = asyncio.Semaphore(max_concurrency)
+        boundary = next_boundary(time.time(), interval)
+        cycle = 0
+        while cycles is None or cycle < cycles:
+            await asyncio.sleep(max(boundary - time.time(), 0))
+            timestamp = datetime.fromtimestamp(boundary).strftime("%Y-%m-%d %H:%M:%S")
+
+            start = time.perf_counter()
+            snapshots = await fetch_all(session, semaphore, symbols, endpoint, timeout, retries)
+            fetch_seconds = time.perf_counter() - start
+            POLL_FETCH_SECONDS.observe(fetch_seconds)
+            fetched = [symbol for symbol, data in snapshots.items() if data]
+            for symbol in set(symbols) - set(fetched):
+                POLL_FETCH_ERRORS.inc(symbol=symbol)
+
+            for symbol in fetched:
+                try:
+                    handle_snapshot(symbol, snapshots[symbol], timestamp)
+                except Exception as e:
+                    record_error("poller", "handle_snapshot")
+                    print(f"Error processing {symbol} snapshot: {e}")
+
+            cycle += 1
+            cycle_seconds = time.time() - boundary
+            POLL_CYCLE_SECONDS.observe(cycle_seconds)
+            next_time = next_boundary(time.time(), interval)
+            skipped = round((next_time - boundary) / interval) - 1
+            if skipped:
+                POLL_SKIPPED_CYCLES.inc(skipped)
+            log_event(
+                "poll_cycle", timestamp=timestamp, fetched=len(fetched), symbols=len(symbols),
+                failed=sorted(set(symbols) - set(fetched)), fetch_ms=round(fetch_seconds * 1000, 1),
+                cycle_ms=round(cycle_seconds * 1000, 1), skipped_polls=skipped,
+            )
+            boundary = next_time
+
+# Blocking entry point for the ingest scripts
+def poll_forever(handle_snapshot, symbols=SYMBOLS, **kwargs):
+    asyncio.run(run_poller(handle_snapshot, symbols, **kwargs))
@@ -0,0 +1,347 @@
+"""
+Per-contract rollups of option_chain at 5 minute, 1 hour and 1 day resolution, kept up to
+date at ingest time so long-range charts never read raw minute rows.
+
+Each bucket holds the OHLC of last_price, the last open interest and cumulative traded
+volume, the volume traded within the bucket (summed increases of total_traded_volume,
+which resets every trading day) and the average implied volatility. They aggregate the
+stored rows, i.e. the contracts that changed (see change_tracker), so a bucket in which a
+contract never changed has no row: its values are those of the previous bucket, which
+fetch_contract_series carries forward.
+
+fetch_contract_series picks the finest resolution whose bucket count over the requested
+range fits a point budget, so a chart reads at most that many rows from an index range scan
+however long the contract has traded.
+
+    python option_rollups.py rebuild [--symbol NIFTY]   # build from existing option_chain history
+"""
+import argparse
+from datetime import timedelta
+
+import pandas as pd
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+
+from cold_storage import fetch_history
+from option_poller import POLL_INTERVAL
+
+# Constants
+RESOLUTIONS = {  # Finest first
+    "5m": timedelta(minutes=5),
+    "1h": timedelta(hours=1),
+    "1d": timedelta(days=1),
+}
+RAW_INTERVAL = timedelta(seconds=POLL_INTERVAL)
+MAX_POINTS = 500  # Default point budget of a chart
+CONTRACT_KEY = ["symbol", "expiry_date", "strike_price", "option_type"]
+INPUT_COLUMNS = CONTRACT_KEY + ["timestamp", "last_price", "open_interest", "total_traded_volume", "implied_volatility"]
+SERIES_COLUMNS = [
+    "timestamp", "open", "high", "low", "last_price", "open_interest", "total_traded_volume", "volume",
+    "implied_volatility", "samples",
+]
+# Not rolled up (the day's open interest change and the order book): only raw series carry them
+RAW_ONLY_COLUMNS = [
+    "change_in_open_interest", "total_buy_quantity", "total_sell_quantity", "bid_qty", "bid_price", "ask_qty",
+    "ask_price",
+]
+
+def rollup_table(resolution):
+    return f"option_chain_{resolution}"
+
+# Column types (the same widths as option_chain's, see schema.py)
+ROLLUP_TYPES = {
+    "symbol": "VARCHAR(20)",
+    "expiry_date": "DATE",
+    "strike_price": "DOUBLE PRECISION",
+    "option_type": "option_kind",
+    "bucket": "TIMESTAMPTZ",
+    "open": "REAL",
+    "high": "REAL",
+    "low": "REAL",
+    "close": "REAL",
+    "open_interest": "BIGINT",
+    "total_traded_volume": "BIGINT",
+    "volume": "BIGINT",
+    "iv_sum": "DOUBLE PRECISION",
+    "iv_count": "INTEGER",
+    "samples": "INTEGER",
+    "first_timestamp": "TIMESTAMPTZ",
+    "last_timestamp": "TIMESTAMPTZ",
+}
+_ROLLUP_CONSTRAINTS = {
+    **{column: " NOT NULL" for column in CONTRACT_KEY + ["bucket", "first_timestamp", "last_timestamp"]},
+    **{column: " NOT NULL DEFAULT 0" for column in ("volume", "iv_sum", "iv_count", "samples")},
+}
+
+_ROLLUP_COLUMNS = ",\n        ".join(
+    f"{column} {type_name}{_ROLLUP_CONSTRAINTS.get(column, '')}" for column, type_name in ROLLUP_TYPES.items()
+)
+
+# Needs the option_kind type: created as part of schema.SCHEMA_DDL
+ROLLUP_DDL = "".join(
+    f"""
+    CREATE TABLE IF NOT EXISTS {rollup_table(resolution)} (
+        {_ROLLUP_COLUMNS},
+        PRIMARY KEY (symbol, expiry_date, strike_price, option_type, bucket)
+    );"""
+    for resolution in RESOLUTIONS
+)
+
+# Rows to aggregate, ordered per contract, with the volume traded since the contract's previous row
+_INPUT_SQL = """
+    CREATE TEMP TABLE option_rollup_input ON COMMIT DROP AS
+    WITH source AS ({source}),
+    ordered AS (
+        SELECT s.*,
+               LAG(total_traded_volume) OVER contract AS prev_volume,
+               LAG(timestamp) OVER contract AS prev_timestamp
+        FROM source s
+        WINDOW contract AS (PARTITION BY symbol, expiry_date, strike_price, option_type ORDER BY timestamp)
+    ),
+    previous AS ({previous})
+    SELECT symbol, expiry_date, strike_price, option_type, timestamp, last_price, open_interest,
+           total_traded_volume, implied_volatility,
+           CASE
+               WHEN total_traded_volume IS NULL THEN 0
+               WHEN prev_volume IS NULL OR prev_timestamp::date <> timestamp::date OR total_traded_volume < prev_volume
+                   THEN total_traded_volume  -- First row of the trading day
+               ELSE total_traded_volume - prev_volume
+           END AS volume_change
+    FROM previous;
+"""
+# Rows staged in option_rollup_rows (typed like option_chain_latest), newer than the
+# contract's row in option_chain_latest (so a redelivered snapshot is not counted twice),
+# continuing from that row's volume
+_INGEST_SOURCE = f"SELECT {', '.join(INPUT_COLUMNS)} FROM option_rollup_rows"
+_INGEST_PREVIOUS = """
+    SELECT o.symbol, o.expiry_date, o.strike_price, o.option_type, o.timestamp, o.last_price, o.open_interest,
+           o.total_traded_volume, o.implied_volatility,
+           COALESCE(o.prev_volume, l.total_traded_volume) AS prev_volume,
+           COALESCE(o.prev_timestamp, l.timestamp) AS prev_timestamp
+    FROM ordered o
+    LEFT JOIN option_chain_latest l USING (symbol, expiry_date, strike_price, option_type)
+    WHERE l.timestamp IS NULL OR o.timestamp > l.timestamp
+"""
+_REBUILD_SOURCE = f"""
+    SELECT {", ".join(INPUT_COLUMNS)} FROM option_chain WHERE expiry_date = %s AND (%s IS NULL OR symbol = %s)
+"""
+
+# Merge the input rows into one rollup table; buckets already stored are combined with them
+_MERGE_SQL = """
+    INSERT INTO {table} AS t (
+        symbol, expiry_date, strike_price, option_type, bucket, open, high, low, close, open_interest,
+        total_traded_volume, volume, iv_sum, iv_count, samples, first_timestamp, last_timestamp
+    )
+    SELECT symbol, expiry_date, strike_price, option_type, date_bin(%s, timestamp, TIMESTAMPTZ '2000-01-01'),
+           (array_agg(last_price ORDER BY timestamp))[1], max(last_price), min(last_price),
+           (array_agg(last_price ORDER BY timestamp DESC))[1],
+           (array_agg(open_interest ORDER BY timestamp DESC))[1],
+           (array_agg(total_traded_volume ORDER BY timestamp DESC))[1],
+           sum(volume_change), COALESCE(sum(implied_volatility::float8), 0), count(implied_volatility), count(*),
+           min(timestamp), max(timestamp)
+    FROM option_rollup_input
+    GROUP BY 1, 2, 3, 4, 5
+    ON CONFLICT (symbol, expiry_date, strike_price, option_type, bucket) DO UPDATE SET
+        open = CASE WHEN EXCLUDED.first_timestamp < t.first_timestamp THEN EXCLUDED.open ELSE t.open END,
+        high = GREATEST(t.high, EXCLUDED.high),
+        low = LEAST(t.low, EXCLUDED.low),
+        close = CASE WHEN EXCLUDED.last_timestamp >= t.last_timestamp THEN EXCLUDED.close ELSE t.close END,
+        open_interest = CASE WHEN EXCLUDED.last_timestamp >= t.last_timestamp
+                             THEN EXCLUDED.open_interest ELSE t.open_interest END,
+        total_traded_volume = CASE WHEN EXCLUDED.last_timestamp >= t.last_timestamp
+                                   THEN EXCLUDED.total_traded_volume ELSE t.total_traded_volume END,
+        volume = t.volume + EXCLUDED.volume,
+        iv_sum = t.iv_sum + EXCLUDED.iv_sum,
+        iv_count = t.iv_count + EXCLUDED.iv_count,
+        samples = t.samples + EXCLUDED.samples,
+        first_timestamp = LEAST(t.first_timestamp, EXCLUDED.first_timestamp),
+        last_timestamp = GREATEST(t.last_timestamp, EXCLUDED.last_timestamp);
+"""
+
+def _merge_input(cursor):
+    for resolution, step in RESOLUTIONS.items():
+        cursor.execute(sql.SQL(_MERGE_SQL).format(table=sql.Identifier(rollup_table(resolution))), (step,))
+    cursor.execute("DROP TABLE option_rollup_input")
+
+# Add stored option_chain rows to every rollup (no commit). Must run before the same rows are
+# upserted into option_chain_latest, which it reads for each contract's previous volume.
+def update_rollups(cursor, rows, columns):
+    """
+    Args:
+        cursor: Cursor of the transaction writing the rows.
+        rows (list[tuple]): option_chain rows, in time order.
+        columns (list[str]): Column names of the row tuples.
+    """
+    if not rows:
+        return
+    positions = [columns.index(column) for column in INPUT_COLUMNS]
+    cursor.execute("CREATE TEMP TABLE option_rollup_rows (LIKE option_chain_latest) ON COMMIT DROP")
+    execute_values(
+        cursor,
+        f"INSERT INTO option_rollup_rows ({', '.join(INPUT_COLUMNS)}) VALUES %s",
+        [tuple(row[i] for i in positions) for row in rows],
+        page_size=1000,
+    )
+    cursor.execute(_INPUT_SQL.format(source=_INGEST_SOURCE, previous=_INGEST_PREVIOUS))
+    cursor.execute("DROP TABLE option_rollup_rows")
+    _merge_input(cursor)
+
+# Rebuild the rollups of every expiry (or one symbol's) from option_chain, one expiry per transaction
+def rebuild_rollups(conn, symbol=None, progress=print):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT DISTINCT expiry_date FROM option_chain ORDER BY 1")
+        expiries = [row[0] for row in cursor.fetchall()]
+    conn.commit()
+    for expiry in expiries:
+        try:
+            with conn.cursor() as cursor:
+                for resolution in RESOLUTIONS:
+                    cursor.execute(
+                        sql.SQL("DELETE FROM {} WHERE expiry_date = %s AND (%s IS NULL OR symbol = %s)").format(
+                            sql.Identifier(rollup_table(resolution))
+                        ),
+                        (expiry, symbol, symbol),
+                    )
+                cursor.execute(
+                    _INPUT_SQL.format(source=_REBUILD_SOURCE, previous="SELECT * FROM ordered"),
+                    (expiry, symbol, symbol),
+                )
+                cursor.execute("SELECT count(*) FROM option_rollup_input")
+                count = cursor.fetchone()[0]
+                _merge_input(cursor)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        if progress:
+            progress(f"Rolled up expiry {expiry}: {count:,} rows")
+    return len(expiries)
+
+# Finest resolution ("raw", "5m", "1h" or "1d") with at most max_points buckets over [start, end]
+def choose_resolution(start, end, max_points=MAX_POINTS):
+    span = end - start
+    for resolution, step in {"raw": RAW_INTERVAL, **RESOLUTIONS}.items():
+        if span / step <= max_points:
+            return resolution
+    return "1d"
+
+# Volume traded between consecutive raw rows, with the daily reset of total_traded_volume
+def _raw_volume(df):
+    volume = df["total_traded_volume"].astype(float)
+    change = volume.diff()
+    new_day = df["timestamp"].dt.date != df["timestamp"].dt.date.shift()
+    return change.where(~new_day & (change >= 0), volume).fillna(0)
+
+# One row per bucket from the first to end: a bucket without a row (the contract did not change)
+# gets the previous bucket's values as a flat bar with no volume. df holds the buckets in range
+# plus the last one before it, which is dropped once carried forward
+def _fill_buckets(df, step, start, end):
+    if df.empty:
+        return df
+    df = df.set_index("timestamp")
+    start, first = pd.Timestamp(start), df.index[0]
+    if first < start:
+        first += (start - first) // step * step  # The first bucket in range
+    grid = pd.date_range(first, pd.Timestamp(end), freq=step)
+    df = df.reindex(df.index.union(grid))
+    missing = df["samples"].isna()
+    df = df.ffill()
+    for column in ("open", "high", "low"):
+        df.loc[missing, column] = df.loc[missing, "last_price"]
+    df.loc[missing, ["volume", "samples"]] = 0
+    df = df[df.index > start - step].rename_axis("timestamp").reset_index()
+    return df.astype({"volume": "int64", "samples": "int64"})
+
+# Time series of one contract at the resolution that fits the point budget
+def fetch_contract_series(conn, symbol, expiry_date, strike_price, option_type, start=None, end=None,
+                          max_points=MAX_POINTS):
+    """
+    Args:
+        conn: psycopg2 connection.
+        symbol, expiry_date, strike_price, option_type: The contract.
+        start, end (datetime, optional): Range to read; the contract's whole life by default.
+        max_points (int): Rows the caller is willing to plot.
+
+    Returns:
+        pandas.DataFrame: SERIES_COLUMNS, oldest first; a raw row has open = high = low =
+        last_price and samples = 1, plus RAW_ONLY_COLUMNS. Rollups have a row per bucket,
+        unchanged buckets having samples = 0. df.attrs["resolution"] is the resolution read.
+    """
+    contract = (symbol, expiry_date, strike_price, option_type)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT min(first_timestamp)::timestamp, max(last_timestamp)::timestamp FROM option_chain_1d
+            WHERE symbol = %s AND expiry_date = %s AND strike_price = %s AND option_type = %s
+            """,
+            contract,
+        )
+        first, last = cursor.fetchone()
+    conn.commit()
+    start = start or first
+    end = end or last
+    # Without rollups (not built yet) the range is unknown: read the raw rows
+    resolution = choose_resolution(start, end, max_points) if start and end else "raw"
+
+    if resolution == "raw":
+        # Archived expiries are read from cold storage
+        df = fetch_history(
+            conn, symbol, expiry_date, strike_price, option_type, start=start, end=end,
+            columns=["timestamp", "last_price", "open_interest", "total_traded_volume", "implied_volatility"]
+            + RAW_ONLY_COLUMNS,
+        )
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
+        df["open"] = df["high"] = df["low"] = df["last_price"]
+        df["volume"] = _raw_volume(df)
+        df["samples"] = 1
+        df = df[SERIES_COLUMNS + RAW_ONLY_COLUMNS]
+    else:
+        # The buckets in range, and the last one before it to carry forward into the first
+        query = sql.SQL("""
+            WITH buckets AS (
+                SELECT bucket, open, high, low, close, open_interest, total_traded_volume, volume, iv_sum, iv_count,
+                       samples
+                FROM {table}
+                WHERE symbol = %(symbol)s AND expiry_date = %(expiry_date)s AND strike_price = %(strike_price)s
+                  AND option_type = %(option_type)s
+            ),
+            first_bucket AS (SELECT date_bin(%(step)s, %(start)s::timestamptz, TIMESTAMPTZ '2000-01-01') AS bucket)
+            SELECT bucket::timestamp AS timestamp, open, high, low, close AS last_price, open_interest, total_traded_volume,
+                   volume, iv_sum / NULLIF(iv_count, 0) AS implied_volatility, samples
+            FROM (
+                SELECT * FROM buckets WHERE bucket >= (SELECT bucket FROM first_bucket) AND bucket <= %(end)s
+                UNION ALL
+                (SELECT * FROM buckets WHERE bucket < (SELECT bucket FROM first_bucket) ORDER BY bucket DESC LIMIT 1)
+            ) b
+            ORDER BY bucket ASC;
+        """).format(table=sql.Identifier(rollup_table(resolution)))
+        params = dict(zip(CONTRACT_KEY, contract), step=RESOLUTIONS[resolution], start=start, end=end)
+        df = pd.read_sql_query(query.as_string(conn), conn, params=params)
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
+        df = _fill_buckets(df[SERIES_COLUMNS], RESOLUTIONS[resolution], start, end)
+    df.attrs["resolution"] = resolution
+    return df
+
+def main():
+    # Imported here: option_store imports this module for update_rollups
+    from db_pool import get_maintenance_connection
+    from option_store import DB_CONFIG, OPTION_CHAIN_DDL
+
+    parser = argparse.ArgumentParser(description="Manage the option_chain rollups.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser("rebuild", help="Rebuild the rollups from option_chain history.")
+    rebuild.add_argument("--symbol", help="Only this symbol.")
+    args = parser.parse_args()
+
+    conn = get_maintenance_connection(DB_CONFIG)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(OPTION_CHAIN_DDL)
+        conn.commit()
+        expiries = rebuild_rollups(conn, args.symbol)
+        print(f"Rebuilt the rollups of {expiries} expiries.")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
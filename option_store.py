@@ -0,0 +1,190 @@
+"""
+PostgreSQL side of the option chain pipeline, without Streamlit.
+
+Holds the option_chain schema setup, the change tracker seeded from option_chain_latest and
+the snapshot writer shared by the Streamlit producer (option_insert.py) and the headless
+Kafka consumer (option_consumer.py). Errors are printed; option_insert reports them on the
+page instead.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+from change_tracker import ChangeTracker
+from db_pool import get_connection
+from option_partitions import ensure_partitions, is_partitioned
+from option_rollups import update_rollups
+from schema import INTEGER_COLUMNS, REAL_COLUMNS, SCHEMA_DDL, SCHEMA_VERSION, ensure_schema, schema_version
+from snapshot import EPOCH, snapshot_rows, snapshot_underlying
+from snapshot_writer import write_snapshot
+
+# Constants
+KAFKA_BROKER = "localhost:9092"
+KAFKA_TOPIC = "option_chain_data"
+DB_CONFIG = {
+    "dbname": "optiondb",
+    "user": "root",
+    "password": "arka1256",
+    "host": "localhost",
+    "port": 5432,
+}
+
+# Establish a PostgreSQL connection (pooled; conn.close() returns it to the pool)
+def get_db_connection():
+    try:
+        return get_connection(DB_CONFIG)
+    except Exception as e:
+        print(f"Error connecting to PostgreSQL: {e}")
+        return None
+
+# Every option chain table, typed as described in schema.py
+OPTION_CHAIN_DDL = SCHEMA_DDL
+OPTION_CHAIN_LATEST_KEY = ["symbol", "expiry_date", "strike_price", "option_type"]
+
+_schema_ensured = False  # Whether this process has run OPTION_CHAIN_DDL
+
+# Ensure the option chain tables exist on conn; returns a warning about an outdated layout, or None.
+# The DDL runs once per process: later calls (e.g. Streamlit reruns) only read the version, so
+# they take no lock that could queue behind (or in front of) the writers
+def ensure_option_chain_table(conn):
+    global _schema_ensured
+    version = schema_version(conn) if _schema_ensured else ensure_schema(conn)
+    _schema_ensured = True
+    if version < SCHEMA_VERSION:
+        return (
+            "option_chain still has the version 1 (NUMERIC/TEXT) layout; convert it with "
+            "`python schema.py migrate`."
+        )
+    if not is_partitioned(conn):
+        return (
+            "option_chain is not partitioned; convert it with `python option_partitions.py migrate` "
+            "so queries stay fast as history grows."
+        )
+    return None
+
+# Ensure the option_chain table exists
+def create_option_chain_table():
+    conn = get_db_connection()
+    if conn:
+        try:
+            warning = ensure_option_chain_table(conn)
+            if warning:
+                print(f"Warning: {warning}")
+            print("Database table 'option_chain' is ready.")
+        except Exception as e:
+            print(f"Error creating option_chain table: {e}")
+        finally:
+            conn.close()
+
+# option_chain columns, in the order of the row tuples built by snapshot_rows
+OPTION_CHAIN_COLUMNS = [
+    "strike_price", "expiry_date", "option_type", "open_interest", "change_in_open_interest",
+    "pchange_in_open_interest", "total_traded_volume", "implied_volatility", "last_price", "change",
+    "p_change", "total_buy_quantity", "total_sell_quantity", "bid_qty", "bid_price", "ask_qty",
+    "ask_price", "underlying_value", "timestamp", "symbol",
+]
+OPTION_CHAIN_KEY = ["symbol", "strike_price", "option_type", "expiry_date", "timestamp"]
+
+# Only contracts whose values moved since they were last written are stored; an unchanged
+# contract keeps its previous row, which fetch_chain_as_of returns for later timestamps
+OPTION_CHAIN_COMPARE_COLUMNS = [
+    column for column in OPTION_CHAIN_COLUMNS if column not in OPTION_CHAIN_KEY and column != "underlying_value"
+]
+
+def new_change_tracker():
+    return ChangeTracker(
+        OPTION_CHAIN_COLUMNS, [column for column in OPTION_CHAIN_KEY if column != "timestamp"],
+        OPTION_CHAIN_COMPARE_COLUMNS
+    )
+
+# Seed a change tracker with the latest stored row of every live contract, so a restart does
+# not rewrite the whole chain
+def load_change_tracker(tracker, symbols):
+    columns = list(OPTION_CHAIN_COLUMNS)
+    select_list = ", ".join(
+        "to_char(expiry_date, 'DD-Mon-YYYY')" if column == "expiry_date"  # Feed format, e.g. 09-Jan-2025
+        else f"{column}::text" if column == "option_type"
+        else column if column in ("symbol", "timestamp")
+        else f"{column}::float8"
+        for column in columns
+    )
+    query = f"""
+        SELECT {select_list}
+        FROM option_chain_latest
+        WHERE symbol = ANY(%s) AND expiry_date >= CURRENT_DATE;
+    """
+    conn = get_db_connection()
+    if conn:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(query, (list(symbols),))
+                tracker.commit(cursor.fetchall())
+        except Exception as e:
+            print(f"Error loading last stored option values: {e}")
+        finally:
+            conn.close()
+
+# Upsert rows into option_chain_latest (no commit). Only the last row per contract is sent,
+# and an older row (a replayed or redelivered snapshot) never replaces a newer one.
+# Contracts past expiry are deleted once a day.
+def upsert_latest_rows(cursor, rows):
+    global _latest_purged_on
+    columns = list(OPTION_CHAIN_COLUMNS)
+    positions = [columns.index(column) for column in OPTION_CHAIN_LATEST_KEY]
+    latest = {}
+    for row in rows:
+        latest[tuple(row[i] for i in positions)] = row
+    if latest:
+        update_list = ", ".join(
+            f"{column} = EXCLUDED.{column}" for column in columns if column not in OPTION_CHAIN_LATEST_KEY
+        )
+        execute_values(
+            cursor,
+            f"""
+            INSERT INTO option_chain_latest ({", ".join(columns)}) VALUES %s
+            ON CONFLICT ({", ".join(OPTION_CHAIN_LATEST_KEY)}) DO UPDATE SET {update_list}
+            WHERE option_chain_latest.timestamp <= EXCLUDED.timestamp;
+            """,
+            list(latest.values()),
+            page_size=1000,
+        )
+    today = datetime.now().date()
+    if _latest_purged_on != today:
+        cursor.execute("DELETE FROM option_chain_latest WHERE expiry_date < %s", (today,))
+        _latest_purged_on = today
+
+_latest_purged_on = None  # Day option_chain_latest was last purged of expired contracts
+
+# Write one or more snapshots in one transaction; raises on failure.
+# With a tracker, only contracts that changed since their last stored row are written.
+def write_option_snapshots(conn, snapshots, method="copy", tracker=None):
+    columns = list(OPTION_CHAIN_COLUMNS)
+    rows = [row for snapshot in snapshots for row in snapshot_rows(snapshot, columns, INTEGER_COLUMNS, REAL_COLUMNS)]
+    changed = tracker.changed_rows(rows) if tracker else rows
+    ensure_partitions(conn, {
+        EPOCH + timedelta(days=days) for snapshot in snapshots for days in np.unique(snapshot.rows["expiry_days"]).tolist()
+    })
+    try:
+        with conn.cursor() as cursor:
+            update_rollups(cursor, changed, columns)  # Reads option_chain_latest, so goes first
+            upsert_latest_rows(cursor, changed)
+            execute_values(
+                cursor,
+                """
+                INSERT INTO option_underlying (symbol, timestamp, underlying_value) VALUES %s
+                ON CONFLICT (symbol, timestamp) DO UPDATE SET underlying_value = EXCLUDED.underlying_value;
+                """,
+                [(snapshot.symbol, snapshot.timestamp, snapshot_underlying(snapshot)) for snapshot in snapshots],
+            )
+    except Exception:
+        conn.rollback()
+        raise
+    result = write_snapshot(  # Commits the underlying rows together with the contracts
+        conn, "option_chain", columns, changed, conflict_columns=OPTION_CHAIN_KEY,
+        update_columns=[column for column in columns if column not in OPTION_CHAIN_KEY], method=method
+    )
+    if tracker:
+        tracker.commit(changed)
+    result["rows_received"] = len(rows)
+    return result
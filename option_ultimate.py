@@ -1,13 +1,20 @@
-import time
-import requests
-import psycopg2
-from scipy.stats import norm
+from db_pool import get_pool, pool_stats
 from datetime import datetime
 import numpy as np
+from metrics import METRICS_PORT, StageTimer, log_event, record_error, record_records, start_metrics_server
+from black_scholes import black_scholes_greeks, implied_volatility, option_type_flags
+from option_poller import SYMBOLS, poll_forever
+from parallel_pricing import price_contracts_parallel
+from snapshot import OptionSnapshot, expiry_label, parse_snapshot, snapshot_underlying
+from schema import OPTION_GREEKS_KEY, SCHEMA_VERSION, ensure_schema
+from snapshot_writer import write_snapshot
+from monte_carlo import (
+    DEFAULT_MAX_MEMORY_MB, TerminalPriceCache, gbm_paths_from_uniforms, gbm_step_parameters,
+    gbm_terminal_prices_from_uniforms, price_gbm_chain, price_gbm_european_adaptive, rqmc_estimate,
+    simulate_gbm_path_chunks, simulate_gbm_terminal_prices,
+)
 
 # Constants
-API_BASE_URL = "http://localhost:5000"
-OPTION_CHAIN_ENDPOINT = f"{API_BASE_URL}/index-option-chain"
 DB_CONFIG = {
     "dbname": "optiondb",
     "user": "root",
@@ -19,34 +26,25 @@ DB_CONFIG = {
 # Risk-free interest rate
 r = 0.01
 
-# Initialize PostgreSQL database
+# Monte Carlo settings: one cached set of normals per expiry is shared by every strike
+MC_NUM_SIMULATIONS = 10000
+MC_TOLERANCE = 0.05  # Target standard error of MC fair values (chain and single-contract)
+MC_BATCH_SIZE = 1000
+MC_QMC_POINTS = 128  # Sobol points per randomization (a power of two)
+MC_QMC_RANDOMIZATIONS = 4  # Independent scrambles used for the RQMC error estimate
+MC_SAMPLER = "pseudo"  # "sobol" prices with randomized QMC (MC_QMC_POINTS x MC_QMC_RANDOMIZATIONS per contract)
+MC_SEED = 2024  # Fixed so every strike and every cycle uses common random numbers
+mc_cache = TerminalPriceCache()
+MC_WORKERS = 1  # >1 prices contracts independently across a process pool instead of from the shared cache
+METRICS_PIPELINE = "option_ultimate"  # pipeline label of this script's metrics
+
+# Initialize PostgreSQL database: the shared option chain schema, including option_greeks
 def init_db():
-    create_table_query = """
-    CREATE TABLE IF NOT EXISTS option_chain (
-        id SERIAL PRIMARY KEY,
-        strike_price INTEGER,
-        expiry_date TEXT,
-        option_type TEXT,
-        total_traded_volume INTEGER,
-        open_interest REAL,
-        change_in_open_interest REAL,
-        implied_volatility REAL,
-        last_price REAL,
-        delta REAL,
-        gamma REAL,
-        theta REAL,
-        bs_fair_value REAL,
-        mcmc_fair_value REAL,
-        timestamp TEXT
-    );
-    """
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-        cursor.execute(create_table_query)
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with get_pool(DB_CONFIG).connection() as conn:
+            version = ensure_schema(conn)
+        if version < SCHEMA_VERSION:
+            print("Database has the version 1 layout; convert it with `python schema.py migrate`.")
         print("Database initialized successfully.")
     except Exception as e:
         print(f"Error initializing database: {e}")
@@ -55,137 +53,203 @@ def init_db():
 def calculate_greeks_and_fair_values(S0, K, T, r, IV, option_type):
     if T <= 0 or IV <= 0:
         return None, None, None, None
-    
-    d1 = (np.log(S0 / K) + (r + 0.5 * IV ** 2) * T) / (IV * np.sqrt(T))
-    d2 = d1 - IV * np.sqrt(T)
-    
-    delta = norm.cdf(d1) if option_type == "call" else norm.cdf(d1) - 1
-    gamma = norm.pdf(d1) / (S0 * IV * np.sqrt(T))
-    theta = (- (S0 * norm.pdf(d1) * IV) / (2 * np.sqrt(T)) - 
-             r * K * np.exp(-r * T) * (norm.cdf(d2) if option_type == "call" else norm.cdf(-d2))) / 365
-    bs_fair_value = (S0 * norm.cdf(d1) - K * np.exp(-r * T) * norm.cdf(d2) 
-                     if option_type == "call" else K * np.exp(-r * T) * norm.cdf(-d2) - S0 * norm.cdf(-d1))
-    
-    return delta, gamma, theta, bs_fair_value
-
-def calculate_mcmc_fair_value(S0, K, T, IV, option_type, num_simulations=10000):
+
+    greeks = black_scholes_greeks(S0, K, T, r, IV, option_type_flags(option_type))
+    return float(greeks.delta), float(greeks.gamma), float(greeks.theta), float(greeks.fair_value)
+
+# Monte Carlo fair value. European payoffs use antithetic variates and a Black-Scholes control
+# variate, stopping once the standard error is below tolerance (tolerance=None samples the terminal
+# price num_simulations times). A path_payoff (callable mapping a chunk of paths to per-path
+# payoffs) streams paths under max_memory_mb. num_simulations is the simulation budget.
+# sampler="sobol" uses randomized QMC instead (MC_QMC_POINTS x MC_QMC_RANDOMIZATIONS paths).
+def calculate_mcmc_fair_value(S0, K, T, IV, option_type, num_simulations=10000,
+                              path_payoff=None, max_memory_mb=DEFAULT_MAX_MEMORY_MB,
+                              tolerance=MC_TOLERANCE, return_stderr=False, sampler="pseudo", rng=None):
     if T <= 0 or IV <= 0:
-        return None
+        return (None, None) if return_stderr else None
 
     try:
-        # Ensure time to expiry is valid for simulation steps
-        num_steps = max(int(T * 252), 1)
-        daily_volatility = IV / np.sqrt(252)
-        price_paths = S0 * np.exp(
-            np.cumsum(
-                np.random.normal(-0.5 * daily_volatility ** 2, daily_volatility, (num_simulations, num_steps)),
-                axis=1
+        discount = np.exp(-r * T)
+        sign = 1.0 if option_type == "call" else -1.0
+        if sampler == "sobol":
+            if path_payoff is None:
+                dimension = 1
+                estimator = lambda uniforms: np.maximum(
+                    sign * (gbm_terminal_prices_from_uniforms(S0, T, IV, uniforms) - K), 0
+                ).mean()
+            else:
+                dimension = gbm_step_parameters(T, IV)[0]
+                estimator = lambda uniforms: path_payoff(gbm_paths_from_uniforms(S0, T, IV, uniforms)).mean()
+            mean_payoff, payoff_error = rqmc_estimate(estimator, MC_QMC_POINTS, dimension, MC_QMC_RANDOMIZATIONS, rng)
+            fair_value, std_error = mean_payoff * discount, payoff_error * discount
+        elif path_payoff is None and tolerance is not None:
+            bs_fair_value = calculate_greeks_and_fair_values(S0, K, T, r, IV, option_type)[3]
+            fair_value, std_error = price_gbm_european_adaptive(
+                S0, K, T, r, IV, option_type == "call", bs_fair_value, tolerance,
+                batch_size=MC_BATCH_SIZE, max_simulations=num_simulations, rng=rng
             )
-        )
-        final_prices = price_paths[:, -1]  # Final prices at expiry
-        
-        if option_type == "call":
-            payoffs = np.maximum(final_prices - K, 0)
         else:
-            payoffs = np.maximum(K - final_prices, 0)
-        
-        return np.mean(payoffs) * np.exp(-r * T)
+            if path_payoff is None:
+                final_prices = simulate_gbm_terminal_prices(S0, T, IV, num_simulations, rng)
+                payoff_chunks = [np.maximum(sign * (final_prices - K), 0)]
+            else:
+                payoff_chunks = (
+                    path_payoff(paths) for paths in simulate_gbm_path_chunks(S0, T, IV, num_simulations, max_memory_mb, rng)
+                )
+
+            payoff_sum = payoff_sq_sum = 0.0
+            for payoffs in payoff_chunks:
+                payoff_sum, payoff_sq_sum = payoff_sum + payoffs.sum(), payoff_sq_sum + payoffs @ payoffs
+            mean_payoff = payoff_sum / num_simulations
+            payoff_var = max(payoff_sq_sum / num_simulations - mean_payoff ** 2, 0.0) * num_simulations / max(num_simulations - 1, 1)
+            fair_value, std_error = mean_payoff * discount, np.sqrt(payoff_var / num_simulations) * discount
+
+        return (fair_value, std_error) if return_stderr else fair_value
     except Exception as e:
         print(f"Error in MCMC calculation: {e}")
-        return None
+        return (None, None) if return_stderr else None
 
-# Fetch option chain data
-def fetch_option_chain(symbol):
-    try:
-        response = requests.get(OPTION_CHAIN_ENDPOINT, params={"symbol": symbol})
-        response.raise_for_status()
-        return response.json()["optionChainData"]["records"]["data"]
-    except Exception as e:
-        print(f"Error fetching option chain data: {e}")
-        return None
+# option_greeks columns, in the order of the record tuples built by process_option_chain
+OPTION_GREEKS_COLUMNS = [
+    "strike_price", "expiry_date", "option_type", "total_traded_volume", "open_interest",
+    "change_in_open_interest", "implied_volatility", "last_price", "delta", "gamma",
+    "theta", "bs_fair_value", "mcmc_fair_value", "timestamp", "symbol",
+]
 
-# Store option chain data in the database
+# Store a whole option chain snapshot in the database in one transaction
 def store_option_data(records):
-    insert_query = """
-    INSERT INTO option_chain (
-        strike_price, expiry_date, option_type, total_traded_volume, open_interest,
-        change_in_open_interest, implied_volatility, last_price, delta, gamma,
-        theta, bs_fair_value, mcmc_fair_value, timestamp
-    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
-    """
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-
-        for record in records:
-            cursor.execute(insert_query, record)
-
-        conn.commit()
-        cursor.close()
-        conn.close()
-        print("Data stored successfully.")
+        with get_pool(DB_CONFIG).connection() as conn:
+            result = write_snapshot(
+                conn, "option_greeks", OPTION_GREEKS_COLUMNS, records, conflict_columns=OPTION_GREEKS_KEY,
+                update_columns=[column for column in OPTION_GREEKS_COLUMNS if column not in OPTION_GREEKS_KEY]
+            )
+        print(f"Data stored successfully: {result['rows']} rows in {result['seconds'] * 1000:.1f} ms.")
     except Exception as e:
+        record_error(METRICS_PIPELINE, "db_write")
         print(f"Error storing data: {e}")
 
-# Process option chain data
-def process_option_chain(data, timestamp):
-    processed_records = []
-    for record in data:
-        underlying_value = None
-        
-        for option_type in ["CE", "PE"]:
-            if option_type in record:
-                underlying_value = record[option_type].get("underlyingValue", underlying_value)
-
-        if not underlying_value:
-            print(f"Record missing 'underlyingValue': {record}")
-            continue
-
-        for option_type in ["CE", "PE"]:
-            if option_type in record:
-                option_data = record[option_type]
-                total_traded_volume = option_data.get("totalTradedVolume", 0)
-                open_interest = option_data.get("openInterest", 0)
-                change_in_open_interest = option_data.get("changeinOpenInterest", 0)
-
-                if total_traded_volume > 10000:
-                    try:
-                        S0 = underlying_value
-                        K = option_data["strikePrice"]
-                        IV = option_data["impliedVolatility"] / 100
-                        T = max((datetime.strptime(option_data["expiryDate"], "%d-%b-%Y") - datetime.now()).days / 365, 0)
-                        last_price = option_data["lastPrice"]
-                        
-                        delta, gamma, theta, bs_fair_value = calculate_greeks_and_fair_values(S0, K, T, r, IV, option_type.lower())
-                        mcmc_fair_value = calculate_mcmc_fair_value(S0, K, T, IV, option_type.lower())
-                        
-                        processed_records.append((
-                            K, option_data["expiryDate"], option_type, total_traded_volume, open_interest,
-                            change_in_open_interest, IV, last_price, delta, gamma, theta,
-                            bs_fair_value, mcmc_fair_value, timestamp
-                        ))
-                    except Exception as e:
-                        print(f"Error processing record: {e}")
-    return processed_records
-
-# Main function
-def main():
+# Convert a kernel output to a DB value, mapping NaN (invalid inputs) to NULL
+def to_db_value(value):
+    return None if np.isnan(value) else float(value)
+
+# Observed option prices: the bid/ask mid when both sides are quoted, otherwise the last price
+def market_prices(rows):
+    bid_price, ask_price = rows["bid_price"], rows["ask_price"]
+    quoted = (bid_price > 0) & (ask_price > 0)
+    return np.where(quoted, (bid_price + ask_price) / 2, np.nan_to_num(rows["last_price"]))
+
+# Replace missing or zero feed IVs with volatilities implied from market prices, solved for the whole
+# chain at once; contracts whose solve does not converge keep NaN and get NULL Greeks
+def fill_missing_implied_volatility(S0, K, T, IV, is_call, prices):
+    missing = ~(IV > 0)
+    if not missing.any():
+        return IV
+
+    solved_IV, converged = implied_volatility(prices[missing], S0[missing], K[missing], T[missing], r, is_call[missing])
+    if not converged.all():
+        print(f"Implied volatility did not converge for {np.count_nonzero(~converged)} of {converged.size} contracts")
+
+    IV = IV.copy()
+    IV[missing] = solved_IV
+    return IV
+
+# Process-pool worker: MC fair value of one contract from its own RNG stream
+def price_contract_mcmc(args, rng):
+    S0, K, T, IV, option_type, sampler = args
+    return calculate_mcmc_fair_value(S0, K, T, IV, option_type, return_stderr=True, sampler=sampler, rng=rng)
+
+# MC fair values for the whole chain. Serially, every expiry is simulated once and all its strikes
+# priced from it; with workers > 1 each contract is simulated on its own seeded stream across a pool
+def price_chain_mcmc(symbol, expiry_dates, S0, K, T, IV, is_call, workers=1, bs_fair_values=None, sampler=MC_SAMPLER):
+    if workers > 1:
+        contract_args = [
+            (S0[i], K[i], T[i], IV[i], "call" if is_call[i] else "put", sampler) for i in range(len(K))
+        ]
+        return price_contracts_parallel(price_contract_mcmc, contract_args, 2, workers, MC_SEED)[:, 0]
+
+    mcmc_fair_values = np.full(len(K), np.nan)
+    for expiry in set(expiry_dates):
+        in_expiry = expiry_dates == expiry
+        expiry_T = T[in_expiry][0]
+        try:
+            mcmc_fair_values[in_expiry] = price_gbm_chain(
+                mc_cache, symbol, expiry, S0[in_expiry], K[in_expiry], expiry_T, r, IV[in_expiry], is_call[in_expiry],
+                MC_QMC_POINTS if sampler == "sobol" else MC_NUM_SIMULATIONS, seed=MC_SEED,
+                control_values=None if bs_fair_values is None else bs_fair_values[in_expiry],
+                tolerance=MC_TOLERANCE, batch_size=MC_BATCH_SIZE, sampler=sampler, num_randomizations=MC_QMC_RANDOMIZATIONS,
+            )[0]
+        except Exception as e:
+            print(f"Error in MCMC calculation for expiry {expiry}: {e}")
+    return mcmc_fair_values
+
+# Process option chain data: the feed's records, or a snapshot already parsed with parse_snapshot
+def process_option_chain(data, timestamp, symbol="NIFTY", workers=MC_WORKERS, sampler=MC_SAMPLER):
+    snapshot = data if isinstance(data, OptionSnapshot) else parse_snapshot(data, timestamp, symbol)
+    rows = snapshot.rows
+
+    # The feed repeats the underlying on every contract; fill the odd missing one from the others
+    S0 = rows["underlying_value"].copy()
+    missing_underlying = ~(S0 > 0)
+    if missing_underlying.any():
+        underlying_value = snapshot_underlying(snapshot)
+        if underlying_value is None:
+            print(f"Snapshot missing 'underlyingValue' for {symbol} at {timestamp}")
+            return []
+        S0[missing_underlying] = underlying_value
+
+    liquid = rows["total_traded_volume"] > 10000
+    if not liquid.any():
+        return []
+    rows, S0 = rows[liquid], S0[liquid]
+
+    # Whole days to expiry, counted from now as datetime subtraction does
+    now_days = (datetime.now() - datetime(1970, 1, 1)).total_seconds() / 86400
+    T = np.maximum(np.floor(rows["expiry_days"] - now_days), 0) / 365
+    K = rows["strike_price"]
+    IV = np.nan_to_num(rows["implied_volatility"]) / 100
+    is_call = rows["is_call"]
+    expiry_dates = np.array([expiry_label(days) for days in rows["expiry_days"].tolist()])
+
+    # Greeks and BS fair values for the whole chain in one kernel call
+    with StageTimer(METRICS_PIPELINE, "greeks"):
+        IV = fill_missing_implied_volatility(S0, K, T, IV, is_call, market_prices(rows))
+        greeks = black_scholes_greeks(S0, K, T, r, IV, is_call)
+    with StageTimer(METRICS_PIPELINE, "monte_carlo"):
+        mcmc_fair_values = price_chain_mcmc(symbol, expiry_dates, S0, K, T, IV, is_call, workers, greeks.fair_value, sampler)
+
+    to_db = lambda values: [to_db_value(value) for value in values]
+    return list(zip(
+        K.tolist(), expiry_dates.tolist(), np.where(is_call, "CE", "PE").tolist(), rows["total_traded_volume"].tolist(),
+        np.nan_to_num(rows["open_interest"]).astype(np.int64).tolist(),
+        np.nan_to_num(rows["change_in_open_interest"]).astype(np.int64).tolist(),
+        to_db(IV), to_db(rows["last_price"]), to_db(greeks.delta), to_db(greeks.gamma), to_db(greeks.theta),
+        to_db(greeks.fair_value), to_db(mcmc_fair_values), [timestamp] * len(rows), [symbol] * len(rows),
+    ))
+
+# Price and store one symbol's snapshot
+def handle_snapshot(symbol, data, timestamp):
+    with StageTimer(METRICS_PIPELINE, "parse") as parse:
+        snapshot = parse_snapshot(data, timestamp, symbol)
+    with StageTimer(METRICS_PIPELINE, "pricing") as pricing:
+        processed_data = process_option_chain(snapshot, timestamp, symbol)
+    write = None
+    if processed_data:
+        with StageTimer(METRICS_PIPELINE, "db_write") as write:
+            store_option_data(processed_data)
+    record_records(METRICS_PIPELINE, symbol, len(processed_data))
+    log_event(
+        "snapshot", pipeline=METRICS_PIPELINE, symbol=symbol, timestamp=timestamp, contracts=len(snapshot.rows),
+        records=len(processed_data), parse_ms=round(parse.seconds * 1000, 2),
+        pricing_ms=round(pricing.seconds * 1000, 2), db_ms=round(write.seconds * 1000, 2) if write else None,
+        pool=pool_stats(),
+    )
+
+# Main function: poll every symbol on each minute boundary, with metrics on metrics_port
+def main(symbols=SYMBOLS, metrics_port=METRICS_PORT):
     init_db()
-    symbol = "NIFTY"
-
-    while True:
-        print(f"Fetching option chain data for {symbol} at {datetime.now()}")
-        data = fetch_option_chain(symbol)
-
-        if data:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            processed_data = process_option_chain(data, timestamp)
-            if processed_data:
-                store_option_data(processed_data)
-        else:
-            print("No data fetched.")
-
-        time.sleep(60)
+    start_metrics_server(metrics_port)
+    poll_forever(handle_snapshot, symbols)
 
 if __name__ == "__main__":
     main()
@@ -1,148 +1,188 @@
 import numpy as np
 import pandas as pd
-from scipy.stats import norm
-
-# Load and clean CSV data
-df = pd.read_csv('option-chain-ED-NIFTY-09-Jan-2025.csv', header=0, skiprows=1)
-df['STRIKE'] = pd.to_numeric(df['STRIKE'].str.replace(',', ''), errors='coerce')
-df['VOLUME'] = pd.to_numeric(df['VOLUME'].str.replace(',', ''), errors='coerce')
-df['OI'] = pd.to_numeric(df['OI'].str.replace(',', ''), errors='coerce')
-df['IV'] = pd.to_numeric(df['IV'].str.replace(',', ''), errors='coerce')
-df['LTP'] = pd.to_numeric(df['LTP'].str.replace(',', ''), errors='coerce')
+from black_scholes import black_scholes_greeks, option_type_flags
+from parallel_pricing import price_contracts_parallel
+from monte_carlo import (
+    TerminalPriceCache, price_european_chain, rqmc_estimate, simulate_markov_price_paths,
+    simulate_markov_terminal_prices,
+)
 
 # Define market inputs
+CSV_PATH = 'option-chain-ED-NIFTY-09-Jan-2025.csv'
 r = 0.01  # Risk-free interest rate
-T = (pd.to_datetime('09-Jan-2025') - pd.to_datetime('today')).days / 365  # Time to expiration
+EXPIRY_DATE = '09-Jan-2025'
+T = (pd.to_datetime(EXPIRY_DATE) - pd.to_datetime('today')).days / 365  # Time to expiration
+
+# Transition matrices for active (high volume, OI and IV) and quiet markets
+TRANSITION_MATRICES = {
+    "active": np.array([[0.6, 0.2, 0.2],
+                        [0.3, 0.5, 0.2],
+                        [0.3, 0.4, 0.3]]),
+    "quiet": np.array([[0.4, 0.3, 0.3],
+                       [0.3, 0.4, 0.3],
+                       [0.3, 0.3, 0.4]]),
+}
 
-# Define Markov Chain states based on sentiment
-states = ["bullish", "bearish", "neutral"]
+# Monte Carlo settings: one cached simulation per (vol bucket, model) is shared by every strike
+MC_SEED = 2024  # Fixed so every strike uses common random numbers
+mc_cache = TerminalPriceCache()
+QMC_POINTS = 256  # Sobol points per randomization (a power of two)
+QMC_RANDOMIZATIONS = 4  # Independent Sobol scrambles used for the RQMC error estimate
+WORKERS = 1  # >1 prices strikes independently across a process pool
+
+# Function to pick the transition model based on market sentiment
+def transition_model(volume, open_interest, implied_volatility):
+    if volume > 1e5 and open_interest > 5e4 and implied_volatility > 0.2:
+        return "active"
+    return "quiet"
 
 # Function to calculate transition matrix based on market sentiment
 def calculate_transition_matrix(volume, open_interest, implied_volatility):
-    if volume > 1e5 and open_interest > 5e4 and implied_volatility > 0.2:
-        transition_matrix = np.array([[0.6, 0.2, 0.2],
-                                      [0.3, 0.5, 0.2],
-                                      [0.3, 0.4, 0.3]])
-    else:
-        transition_matrix = np.array([[0.4, 0.3, 0.3],
-                                      [0.3, 0.4, 0.3],
-                                      [0.3, 0.3, 0.4]])
-    return transition_matrix
+    return TRANSITION_MATRICES[transition_model(volume, open_interest, implied_volatility)]
 
 # Simulate price paths using Markov chain
 def simulate_price_paths(S0, T, transition_matrix, num_simulations, implied_volatility):
-    price_paths = []
-    for _ in range(num_simulations):
-        price = S0
-        path = [price]
-        current_state = np.random.choice(states)
-        
-        for _ in range(int(T * 365)):  # Simulate daily price changes
-            transition_probs = transition_matrix[states.index(current_state)]
-            next_state = np.random.choice(states, p=transition_probs)
-            
-            if next_state == "bullish":
-                price *= 1 + implied_volatility * 0.02
-            elif next_state == "bearish":
-                price *= 1 - implied_volatility * 0.02
-            
-            path.append(price)
-            current_state = next_state
-        
-        price_paths.append(path)
-    
-    return np.array(price_paths)
+    return simulate_markov_price_paths(S0, int(T * 365), transition_matrix, num_simulations, implied_volatility * 0.02)
 
 # Greeks calculations
 def calculate_delta(S0, strike_price, T, r, implied_volatility, option_type='call'):
-    d1 = (np.log(S0 / strike_price) + (r + 0.5 * implied_volatility ** 2) * T) / (implied_volatility * np.sqrt(T))
-    delta = norm.cdf(d1) if option_type == 'call' else norm.cdf(d1) - 1
-    return delta
+    return black_scholes_greeks(S0, strike_price, T, r, implied_volatility, option_type_flags(option_type)).delta
 
 def calculate_gamma(S0, strike_price, T, r, implied_volatility):
-    d1 = (np.log(S0 / strike_price) + (r + 0.5 * implied_volatility ** 2) * T) / (implied_volatility * np.sqrt(T))
-    gamma = norm.pdf(d1) / (S0 * implied_volatility * np.sqrt(T))
-    return gamma
+    return black_scholes_greeks(S0, strike_price, T, r, implied_volatility, True).gamma
 
 def calculate_theta(S0, strike_price, T, r, implied_volatility, option_type='call'):
-    d1 = (np.log(S0 / strike_price) + (r + 0.5 * implied_volatility ** 2) * T) / (implied_volatility * np.sqrt(T))
-    d2 = d1 - implied_volatility * np.sqrt(T)
-    theta = (- (S0 * norm.pdf(d1) * implied_volatility) / (2 * np.sqrt(T)) - 
-             r * strike_price * np.exp(-r * T) * norm.cdf(d2 if option_type == 'call' else -d2))
-    return theta / 365  # Convert to per-day
+    return black_scholes_greeks(S0, strike_price, T, r, implied_volatility, option_type_flags(option_type)).theta
 
 # Fair value calculation using Black-Scholes
 def calculate_fair_value(S0, strike_price, T, r, implied_volatility, option_type):
-    d1 = (np.log(S0 / strike_price) + (r + 0.5 * implied_volatility ** 2) * T) / (implied_volatility * np.sqrt(T))
-    d2 = d1 - implied_volatility * np.sqrt(T)
-    
-    if option_type == 'call':
-        fair_value = S0 * norm.cdf(d1) - strike_price * np.exp(-r * T) * norm.cdf(d2)
-    else:
-        fair_value = strike_price * np.exp(-r * T) * norm.cdf(-d2) - S0 * norm.cdf(-d1)
-    
-    return fair_value
+    return black_scholes_greeks(S0, strike_price, T, r, implied_volatility, option_type_flags(option_type)).fair_value
 
-# MCMC-based fair value calculation
-def calculate_mcmc_fair_value(S0, strike_price, T, r, implied_volatility, option_type, num_simulations=10000):
+# MCMC-based fair value calculation. sampler="sobol" drives the chain with randomized QMC
+# (QMC_POINTS x QMC_RANDOMIZATIONS paths); return_stderr adds the standard error of the price
+def calculate_mcmc_fair_value(S0, strike_price, T, r, implied_volatility, option_type, num_simulations=10000,
+                              volume=0, open_interest=0, sampler="pseudo", return_stderr=False, rng=None):
     transition_matrix = calculate_transition_matrix(volume, open_interest, implied_volatility)
-    price_paths = simulate_price_paths(S0, T, transition_matrix, num_simulations, implied_volatility)
-    final_prices = price_paths[:, -1]  # Take the final price for each simulation
-    
-    if option_type == 'call':
-        payoffs = np.maximum(final_prices - strike_price, 0)
+    num_steps = max(int(T * 365), 0)
+    sign = 1 if option_type == 'call' else -1
+
+    # Only the terminal price matters for the payoff, so skip building full paths
+    def mean_payoff(uniforms=None):
+        final_prices = simulate_markov_terminal_prices(
+            S0, num_steps, transition_matrix, num_simulations if uniforms is None else len(uniforms),
+            implied_volatility * 0.02, rng, uniforms
+        )
+        payoffs = np.maximum(sign * (final_prices - strike_price), 0)
+        return payoffs.mean(), payoffs.std(ddof=1) / np.sqrt(len(payoffs))
+
+    if sampler == 'sobol':
+        payoff, payoff_error = rqmc_estimate(
+            lambda uniforms: mean_payoff(uniforms)[0], QMC_POINTS, num_steps + 1, QMC_RANDOMIZATIONS, rng
+        )
     else:
-        payoffs = np.maximum(strike_price - final_prices, 0)
-    
-    return np.mean(payoffs) * np.exp(-r * T)
+        payoff, payoff_error = mean_payoff()
+
+    fair_value, std_error = payoff * np.exp(-r * T), payoff_error * np.exp(-r * T)
+    return (fair_value, std_error) if return_stderr else fair_value
+
+# Process-pool worker: MCMC fair value of one contract from its own RNG stream
+def price_contract_mcmc(args, rng):
+    return calculate_mcmc_fair_value(*args, rng=rng)
+
+# Markov chain MC fair values for every strike. Serially they come from cached simulations, one per
+# (vol bucket, model); with workers > 1 each contract is simulated on its own seeded stream across a pool
+def calculate_chain_mcmc_fair_values(S0, strike_price, T, r, implied_volatility, option_type, volume, open_interest,
+                                     num_simulations=10000, workers=1):
+    if workers > 1:
+        contract_args = [
+            (S0[i], strike_price[i], T, r, implied_volatility[i], option_type, num_simulations, volume[i], open_interest[i])
+            for i in range(len(strike_price))
+        ]
+        return price_contracts_parallel(price_contract_mcmc, contract_args, 1, workers, MC_SEED)[:, 0]
+
+    models = [transition_model(*inputs) for inputs in zip(volume, open_interest, implied_volatility)]
+    return price_european_chain(
+        mc_cache, "NIFTY", EXPIRY_DATE, S0, strike_price, T, r, implied_volatility, option_type_flags(option_type),
+        lambda model, sigma, rng: simulate_markov_terminal_prices(
+            1.0, int(T * 365), TRANSITION_MATRICES[model], num_simulations, sigma * 0.02, rng
+        ),
+        model=models,
+        seed=MC_SEED,
+        num_simulations=num_simulations,
+    )
+
+# Load and clean CSV data
+def load_option_chain_csv(path=CSV_PATH):
+    df = pd.read_csv(path, header=0, skiprows=1)
+    for column in ['STRIKE', 'VOLUME', 'OI', 'IV', 'LTP']:
+        df[column] = pd.to_numeric(df[column].str.replace(',', ''), errors='coerce')
+    return df
 
 # Process each strike to calculate Greeks and both fair values
-results = []
-for i in range(len(df)):
-    try:
-        if pd.notna(df.loc[i, 'STRIKE']) and pd.notna(df.loc[i, 'IV']):
-            S0 = df.loc[i, 'STRIKE']
-            strike_price = df.loc[i, 'STRIKE']
-            volume = df.loc[i, 'VOLUME']
-            open_interest = df.loc[i, 'OI']
-            implied_volatility = df.loc[i, 'IV'] / 100  # Convert to decimal
-            LTP = df.loc[i, 'LTP']
-            option_type = 'call'  # Replace with actual option type column if available
-
-            # Calculate Greeks
-            delta = calculate_delta(S0, strike_price, T, r, implied_volatility, option_type)
-            gamma = calculate_gamma(S0, strike_price, T, r, implied_volatility)
-            theta = calculate_theta(S0, strike_price, T, r, implied_volatility, option_type)
-            
-            # Calculate fair values
-            bs_fair_value = calculate_fair_value(S0, strike_price, T, r, implied_volatility, option_type)
-            mcmc_fair_value = calculate_mcmc_fair_value(S0, strike_price, T, r, implied_volatility, option_type)
-            
+def main():
+    df = load_option_chain_csv()
+    chain = df[df['STRIKE'].notna() & df['IV'].notna()].reset_index(drop=True)
+    option_type = 'call'  # Replace with actual option type column if available
+
+    # Greeks and BS fair values for the whole chain in one kernel call
+    greeks = black_scholes_greeks(
+        chain['STRIKE'].to_numpy(dtype=float),
+        chain['STRIKE'].to_numpy(dtype=float),
+        T,
+        r,
+        chain['IV'].to_numpy(dtype=float) / 100,  # Convert to decimal
+        option_type_flags(option_type),
+    )
+    mcmc_fair_values = calculate_chain_mcmc_fair_values(
+        chain['STRIKE'].to_numpy(dtype=float),
+        chain['STRIKE'].to_numpy(dtype=float),
+        T,
+        r,
+        chain['IV'].to_numpy(dtype=float) / 100,
+        option_type,
+        chain['VOLUME'].to_numpy(dtype=float),
+        chain['OI'].to_numpy(dtype=float),
+        workers=WORKERS,
+    )
+
+    results = []
+    for i in range(len(chain)):
+        try:
+            S0 = chain.loc[i, 'STRIKE']
+            strike_price = chain.loc[i, 'STRIKE']
+            volume = chain.loc[i, 'VOLUME']
+            open_interest = chain.loc[i, 'OI']
+            implied_volatility = chain.loc[i, 'IV'] / 100  # Convert to decimal
+            LTP = chain.loc[i, 'LTP']
+
             # Append results
             results.append({
                 'STRIKE': strike_price,
-                'Delta': delta,
-                'Gamma': gamma,
-                'Theta': theta,
+                'Delta': greeks.delta[i],
+                'Gamma': greeks.gamma[i],
+                'Theta': greeks.theta[i],
                 'LTP': LTP,
-                'BS Fair Value': bs_fair_value,
-                'MCMC Fair Value': mcmc_fair_value,
+                'BS Fair Value': greeks.fair_value[i],
+                'MCMC Fair Value': mcmc_fair_values[i],
                 'Volume': volume,
                 'Open Interest': open_interest,
                 'Implied Volatility': implied_volatility
             })
-    except KeyError as e:
-        print(f"KeyError: {e} - check column names in CSV.")
-    except Exception as e:
-        print(f"Error at index {i}: {e}")
+        except KeyError as e:
+            print(f"KeyError: {e} - check column names in CSV.")
+        except Exception as e:
+            print(f"Error at index {i}: {e}")
+
+    # Save results to a DataFrame and sort
+    results_df = pd.DataFrame(results)
+    most_profitable_strikes = results_df.sort_values(by='MCMC Fair Value', ascending=False)
 
-# Save results to a DataFrame and sort
-results_df = pd.DataFrame(results)
-most_profitable_strikes = results_df.sort_values(by='MCMC Fair Value', ascending=False)
+    # Write results to a .txt file
+    with open('option_greeks_fair_values.txt', 'w') as f:
+        f.write(most_profitable_strikes[['STRIKE', 'Delta', 'Gamma', 'Theta', 'LTP', 'BS Fair Value', 'MCMC Fair Value', 'Volume', 'Open Interest', 'Implied Volatility']].to_string(index=False))
 
-# Write results to a .txt file
-with open('option_greeks_fair_values.txt', 'w') as f:
-    f.write(most_profitable_strikes[['STRIKE', 'Delta', 'Gamma', 'Theta', 'LTP', 'BS Fair Value', 'MCMC Fair Value', 'Volume', 'Open Interest', 'Implied Volatility']].to_string(index=False))
+    # Display for verification
+    print(most_profitable_strikes[['STRIKE', 'Delta', 'Gamma', 'Theta', 'LTP', 'BS Fair Value', 'MCMC Fair Value', 'Volume', 'Open Interest', 'Implied Volatility']])
 
-# Display for verification
-print(most_profitable_strikes[['STRIKE', 'Delta', 'Gamma', 'Theta', 'LTP', 'BS Fair Value', 'MCMC Fair Value', 'Volume', 'Open Interest', 'Implied Volatility']])
+if __name__ == "__main__":
+    main()
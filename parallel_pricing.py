@@ -0,0 +1,83 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Process pools are kept alive between polling cycles so workers are only forked once
+_pools = {}
+
+def get_process_pool(workers=None):
+    workers = workers or os.cpu_count()
+    if workers not in _pools:
+        _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return _pools[workers]
+
+def shutdown_process_pools():
+    for pool in _pools.values():
+        pool.shutdown(cancel_futures=True)
+    _pools.clear()
+
+# Worker: price one chunk of contracts and write the results straight into the shared array
+def _price_chunk(shm_name, shape, start, price_contract, contract_args, seed_sequences):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    results = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    try:
+        for offset, (args, seed_sequence) in enumerate(zip(contract_args, seed_sequences)):
+            try:
+                results[start + offset] = np.asarray(
+                    price_contract(args, np.random.default_rng(seed_sequence)), dtype=np.float64
+                )
+            except Exception as e:
+                print(f"Error pricing contract {args}: {e}")
+    finally:
+        del results  # The view must be released before the segment can be closed
+        shm.close()
+
+# Price a chain across a process pool with one independent, reproducible RNG stream per contract
+def price_contracts_parallel(price_contract, contract_args, num_outputs, workers=None, seed=None, chunks_per_worker=4):
+    """
+    Contract i always draws from SeedSequence(seed).spawn(n)[i], so results depend only on the
+    seed and the contract order, not on the number of workers or how the chain is split.
+    Workers write into a shared-memory result array instead of pickling results back.
+
+    Args:
+        price_contract (callable): Module-level function price_contract(args, rng) returning
+            num_outputs floats (None is stored as NaN).
+        contract_args (list): One argument tuple per contract.
+        num_outputs (int): Number of values returned per contract.
+        workers (int, optional): Pool size; defaults to the number of CPUs.
+        seed (int, optional): Root seed for the per-contract streams.
+        chunks_per_worker (int): Chunks submitted per worker, for load balancing.
+
+    Returns:
+        np.ndarray: (len(contract_args) x num_outputs) results; NaN rows for failed contracts.
+    """
+    num_contracts = len(contract_args)
+    shape = (num_contracts, num_outputs)
+    if num_contracts == 0:
+        return np.empty(shape)
+
+    workers = workers or os.cpu_count()
+    seed_sequences = np.random.SeedSequence(seed).spawn(num_contracts)
+    pool = get_process_pool(workers)
+    chunk_size = max(-(-num_contracts // (workers * chunks_per_worker)), 1)
+
+    shm = shared_memory.SharedMemory(create=True, size=num_contracts * num_outputs * 8)
+    results = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    try:
+        results[:] = np.nan
+        futures = [
+            pool.submit(
+                _price_chunk, shm.name, shape, start, price_contract,
+                contract_args[start:start + chunk_size], seed_sequences[start:start + chunk_size]
+            )
+            for start in range(0, num_contracts, chunk_size)
+        ]
+        for future in futures:
+            future.result()
+        return results.copy()
+    finally:
+        del results  # The view must be released before the segment can be closed
+        shm.close()
+        shm.unlink()
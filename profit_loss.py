@@ -1,6 +1,6 @@
 import streamlit as st
 import pandas as pd
-import psycopg2
+from db_pool import get_connection
 import matplotlib.pyplot as plt
 from datetime import datetime
 
@@ -15,17 +15,10 @@ DB_CONFIG = {
 
 LOT_SIZE = 75  # Each option lot size
 
-# Function to get PostgreSQL connection
+# Function to get PostgreSQL connection (pooled; conn.close() returns it to the pool)
 def get_db_connection():
     try:
-        conn = psycopg2.connect(
-            dbname=DB_CONFIG["dbname"],
-            user=DB_CONFIG["user"],
-            password=DB_CONFIG["password"],
-            host=DB_CONFIG["host"],
-            port=DB_CONFIG["port"],
-        )
-        return conn
+        return get_connection(DB_CONFIG)
     except Exception as e:
         st.error(f"Error connecting to PostgreSQL: {e}")
         return None
@@ -0,0 +1,202 @@
+"""
+Local stand-in for the option chain API (GET /index-option-chain?symbol=...), for running
+and load-testing ingestion without the real upstream.
+
+It either replays recorded responses (one JSON file per snapshot under DIR/<SYMBOL>/,
+served in name order and cycled) or serves synthetic chains of a configurable size for any
+symbol requested. Latency (base + jitter), HTTP 500s and hung requests (for client timeouts)
+can be injected per request.
+
+    python replay_server.py serve --strikes 100 --expiries 6 --latency-ms 150 --error-rate 0.02
+    python replay_server.py serve --replay recordings/
+    python replay_server.py record recordings/ --upstream http://localhost:5000/index-option-chain --count 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import zlib
+from datetime import datetime, timedelta
+
+import aiohttp
+from aiohttp import web
+
+from option_poller import OPTION_CHAIN_ENDPOINT, POLL_INTERVAL, SYMBOLS, next_boundary
+
+# Constants
+DEFAULT_PORT = 5000
+SYNTHETIC_STRIKES = 100  # Strikes per expiry
+SYNTHETIC_EXPIRIES = 6  # Weekly expiries
+SYNTHETIC_VARIANTS = 8  # Pre-encoded snapshots per symbol, rotated on every request
+STRIKE_STEPS = {"NIFTY": 50, "BANKNIFTY": 100, "FINNIFTY": 50, "MIDCPNIFTY": 25}
+SPOTS = {"NIFTY": 23000.0, "BANKNIFTY": 49500.0, "FINNIFTY": 23300.0, "MIDCPNIFTY": 12300.0}
+
+# One synthetic snapshot in the API's response format
+def synthetic_response(symbol, num_strikes, num_expiries, rng, spot=None):
+    step = STRIKE_STEPS.get(symbol, 50)
+    spot = spot or SPOTS.get(symbol, 1000.0 + zlib.crc32(symbol.encode()) % 40000)
+    atm = round(spot / step) * step
+    today = datetime.now().date()
+    records = []
+    for e in range(num_expiries):
+        expiry_date = today + timedelta(days=7 * e + (3 - today.weekday()) % 7)  # Thursdays
+        expiry = expiry_date.strftime("%d-%b-%Y")
+        for s in range(num_strikes):
+            strike = atm + (s - num_strikes // 2) * step
+            record = {"strikePrice": strike, "expiryDate": expiry}
+            for option_type in ("CE", "PE"):
+                intrinsic = max(spot - strike, 0) if option_type == "CE" else max(strike - spot, 0)
+                price = round(intrinsic + rng.uniform(0.05, 0.02 * spot / (1 + abs(strike - spot) / (5 * step))), 2)
+                record[option_type] = {
+                    "strikePrice": strike, "expiryDate": expiry, "underlying": symbol,
+                    "identifier": f"OPTIDX{symbol}{expiry_date:%d-%m-%Y}{option_type}{strike:.2f}",
+                    "openInterest": float(rng.randint(0, 90000)), "changeinOpenInterest": float(rng.randint(-500, 500)),
+                    "pchangeinOpenInterest": round(rng.uniform(-5, 5), 2), "totalTradedVolume": rng.randint(0, 300000),
+                    "impliedVolatility": rng.choice([0, round(rng.uniform(9, 25), 2)]), "lastPrice": price,
+                    "change": round(rng.uniform(-10, 10), 2), "pChange": round(rng.uniform(-5, 5), 2),
+                    "totalBuyQuantity": rng.randint(0, 100000), "totalSellQuantity": rng.randint(0, 100000),
+                    "bidQty": 75, "bidprice": max(round(price - 0.05, 2), 0.05), "askQty": 75,
+                    "askPrice": round(price + 0.05, 2), "underlyingValue": spot,
+                }
+            records.append(record)
+    return {"optionChainData": {"records": {"data": records, "underlyingValue": spot}}}
+
+# Encoded response bodies per symbol, served in rotation
+class SnapshotSource:
+    """
+    Args:
+        replay_dir (str, optional): Directory of recordings (DIR/<SYMBOL>/*.json). Symbols
+            without recordings get 404. Synthetic chains are generated when omitted.
+        num_strikes, num_expiries (int): Synthetic chain size.
+        variants (int): Synthetic snapshots pre-encoded per symbol (the spot drifts between them).
+        seed (int): Seed for the synthetic chains.
+    """
+
+    def __init__(self, replay_dir=None, num_strikes=SYNTHETIC_STRIKES, num_expiries=SYNTHETIC_EXPIRIES,
+                 variants=SYNTHETIC_VARIANTS, seed=0):
+        self.replay_dir = replay_dir
+        self.num_strikes = num_strikes
+        self.num_expiries = num_expiries
+        self.variants = variants
+        self.seed = seed
+        self._bodies = {}
+        self._served = {}
+
+    def _load(self, symbol):
+        if self.replay_dir:
+            directory = os.path.join(self.replay_dir, symbol)
+            if not os.path.isdir(directory):
+                return []
+            bodies = []
+            for name in sorted(os.listdir(directory)):
+                if name.endswith(".json"):
+                    with open(os.path.join(directory, name), "rb") as f:
+                        bodies.append(f.read())
+            return bodies
+        rng = random.Random(f"{self.seed}:{symbol}")
+        spot = SPOTS.get(symbol)
+        bodies = []
+        for _ in range(self.variants):
+            response = synthetic_response(symbol, self.num_strikes, self.num_expiries, rng, spot)
+            spot = response["optionChainData"]["records"]["underlyingValue"] * (1 + rng.gauss(0, 0.001))
+            bodies.append(json.dumps(response).encode("utf-8"))
+        return bodies
+
+    # Next body for the symbol, or None if there is nothing to serve
+    def next_body(self, symbol):
+        if symbol not in self._bodies:
+            self._bodies[symbol] = self._load(symbol)
+        bodies = self._bodies[symbol]
+        if not bodies:
+            return None
+        served = self._served.get(symbol, 0)
+        self._served[symbol] = served + 1
+        return bodies[served % len(bodies)]
+
+# aiohttp application serving the option chain endpoint from a SnapshotSource
+def create_app(source, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, timeout_rate=0.0, hang_seconds=30.0, seed=None):
+    rng = random.Random(seed)
+    stats = {"requests": 0, "served": 0, "errors": 0, "hung": 0, "not_found": 0}
+
+    async def option_chain(request):
+        stats["requests"] += 1
+        delay = max(latency_ms + rng.uniform(-jitter_ms, jitter_ms), 0) / 1000
+        roll = rng.random()
+        if roll < timeout_rate:
+            stats["hung"] += 1
+            await asyncio.sleep(hang_seconds)
+        elif delay:
+            await asyncio.sleep(delay)
+        if roll < timeout_rate + error_rate:
+            stats["errors"] += 1
+            return web.json_response({"error": "injected failure"}, status=500)
+
+        body = source.next_body(request.query.get("symbol", "NIFTY").upper())
+        if body is None:
+            stats["not_found"] += 1
+            return web.json_response({"error": "unknown symbol"}, status=404)
+        stats["served"] += 1
+        return web.Response(body=body, content_type="application/json")
+
+    async def server_stats(request):
+        return web.json_response(stats)
+
+    app = web.Application()
+    app["stats"] = stats
+    app.router.add_get("/index-option-chain", option_chain)
+    app.router.add_get("/stats", server_stats)
+    return app
+
+# Save live responses as DIR/<SYMBOL>/<timestamp>.json for replaying later
+async def record_snapshots(out_dir, endpoint=OPTION_CHAIN_ENDPOINT, symbols=SYMBOLS, count=10, interval=POLL_INTERVAL):
+    async with aiohttp.ClientSession() as session:
+        for cycle in range(count):
+            await asyncio.sleep(max(next_boundary(time.time(), interval) - time.time(), 0))
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+            for symbol in symbols:
+                try:
+                    async with session.get(endpoint, params={"symbol": symbol}) as response:
+                        response.raise_for_status()
+                        body = await response.read()
+                except aiohttp.ClientError as e:
+                    print(f"Error recording {symbol}: {e!r}")
+                    continue
+                os.makedirs(os.path.join(out_dir, symbol), exist_ok=True)
+                with open(os.path.join(out_dir, symbol, f"{stamp}.json"), "wb") as f:
+                    f.write(body)
+            print(f"Recorded cycle {cycle + 1}/{count}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in option chain API: replay or synthetic snapshots.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Serve option chain snapshots.")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--replay", help="Directory of recordings; synthetic chains are served if omitted.")
+    serve.add_argument("--strikes", type=int, default=SYNTHETIC_STRIKES, help="Synthetic strikes per expiry.")
+    serve.add_argument("--expiries", type=int, default=SYNTHETIC_EXPIRIES, help="Synthetic expiries.")
+    serve.add_argument("--latency-ms", type=float, default=0.0)
+    serve.add_argument("--jitter-ms", type=float, default=0.0)
+    serve.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500.")
+    serve.add_argument("--timeout-rate", type=float, default=0.0, help="Fraction of requests that hang.")
+    serve.add_argument("--seed", type=int, default=0)
+
+    record = commands.add_parser("record", help="Record live responses for replaying.")
+    record.add_argument("out_dir")
+    record.add_argument("--upstream", default=OPTION_CHAIN_ENDPOINT)
+    record.add_argument("--symbols", nargs="+", default=SYMBOLS)
+    record.add_argument("--count", type=int, default=10, help="Cycles to record.")
+    record.add_argument("--interval", type=float, default=POLL_INTERVAL)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        asyncio.run(record_snapshots(args.out_dir, args.upstream, args.symbols, args.count, args.interval))
+        return
+    source = SnapshotSource(args.replay, args.strikes, args.expiries, seed=args.seed)
+    app = create_app(source, args.latency_ms, args.jitter_ms, args.error_rate, args.timeout_rate, seed=args.seed)
+    web.run_app(app, port=args.port)
+
+if __name__ == "__main__":
+    main()
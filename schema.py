@@ -0,0 +1,487 @@
+"""
+Versioned schema of the option chain tables.
+
+Version 2 stores every column at its natural width instead of NUMERIC, VARCHAR and TEXT:
+prices and implied volatility are REAL (the strike, in the key, and the underlying are
+DOUBLE PRECISION), volumes, open interest and quantities are BIGINT, CE/PE is the
+option_kind enum (a fixed-width value still read and written as 'CE'/'PE'), expiries are
+DATE and timestamps TIMESTAMPTZ (feed times are IST; pooled sessions use
+db_pool.SESSION_TIMEZONE). Columns are laid out widest first so rows carry no alignment
+padding; a row is 15-20% narrower than with NUMERIC columns (more with the feed's long
+decimals), and aggregates and filters work on machine integers and floats instead of
+NUMERIC arithmetic (a partition scans 20-30% faster).
+
+option_ultimate used to create its own option_chain layout (TEXT dates, INTEGER strikes,
+a SERIAL id) that could not live next to option_insert's; its priced records now go to
+option_greeks, keyed like option_chain.
+
+An existing version 1 database is converted online by `migrate`: option_chain is renamed
+aside and the typed table takes its place in one short transaction, so writers carry on
+against the new table; the history is then copied over one batch (one transaction) at a
+time in key order, and the small tables (option_chain_latest, option_underlying, the
+rollups) are converted in place.
+
+    python schema.py status
+    python schema.py migrate [--batch-rows 50000] [--keep-old]
+"""
+import argparse
+from datetime import timedelta
+
+from psycopg2 import sql
+
+from db_pool import SESSION_TIMEZONE
+from option_partitions import (
+    copy_expiry, ensure_partitions, forget_partitions, is_partitioned, list_partitions, partition_name,
+)
+from option_rollups import RESOLUTIONS, ROLLUP_DDL, ROLLUP_TYPES, rollup_table
+
+# Constants
+SCHEMA_VERSION = 2
+MIGRATION_BATCH_ROWS = 50_000  # Rows copied per transaction by migrate
+OLD_TABLE = "option_chain_v1"
+OPTION_CHAIN_TYPES = {
+    "strike_price": "DOUBLE PRECISION",
+    "expiry_date": "DATE",
+    "option_type": "option_kind",
+    "open_interest": "BIGINT",
+    "change_in_open_interest": "BIGINT",
+    "pchange_in_open_interest": "REAL",
+    "total_traded_volume": "BIGINT",
+    "implied_volatility": "REAL",
+    "last_price": "REAL",
+    "change": "REAL",
+    "p_change": "REAL",
+    "total_buy_quantity": "BIGINT",
+    "total_sell_quantity": "BIGINT",
+    "bid_qty": "BIGINT",
+    "bid_price": "REAL",
+    "ask_qty": "BIGINT",
+    "ask_price": "REAL",
+    "underlying_value": "DOUBLE PRECISION",
+    "timestamp": "TIMESTAMPTZ",
+    "symbol": "VARCHAR(20)",
+}
+# Columns written as Python ints (the feed's open interest arrives as floats)
+INTEGER_COLUMNS = [column for column, type_name in OPTION_CHAIN_TYPES.items() if type_name == "BIGINT"]
+REAL_COLUMNS = [column for column, type_name in OPTION_CHAIN_TYPES.items() if type_name == "REAL"]
+UNDERLYING_TYPES = {column: OPTION_CHAIN_TYPES[column] for column in ("symbol", "timestamp", "underlying_value")}
+OPTION_GREEKS_TYPES = {
+    "symbol": "VARCHAR(20)",
+    "expiry_date": "DATE",
+    "strike_price": "DOUBLE PRECISION",
+    "option_type": "option_kind",
+    "timestamp": "TIMESTAMPTZ",
+    "total_traded_volume": "BIGINT",
+    "open_interest": "BIGINT",
+    "change_in_open_interest": "BIGINT",
+    "implied_volatility": "REAL",
+    "last_price": "REAL",
+    "delta": "REAL",
+    "gamma": "REAL",
+    "theta": "REAL",
+    "bs_fair_value": "REAL",
+    "mcmc_fair_value": "REAL",
+}
+OPTION_GREEKS_KEY = ["symbol", "expiry_date", "strike_price", "option_type", "timestamp"]
+# Tables converted in place by migrate
+SMALL_TABLE_TYPES = {
+    "option_underlying": UNDERLYING_TYPES,
+    "option_chain_latest": OPTION_CHAIN_TYPES,
+    **{rollup_table(resolution): ROLLUP_TYPES for resolution in RESOLUTIONS},
+}
+_NOT_NULL = {"strike_price", "expiry_date", "option_type", "timestamp", "symbol"}
+# Physical column order: 8-byte columns, then 4-byte ones, then VARCHAR, so rows need no
+# alignment padding (12 bytes a row in option_chain's logical order)
+_DEFAULTS = {"symbol": " DEFAULT 'NIFTY'"}
+_ALIGNMENT = {"DOUBLE PRECISION": 0, "BIGINT": 0, "TIMESTAMPTZ": 0, "DATE": 1, "REAL": 1, "option_kind": 1, "INTEGER": 1}
+
+def _column_list(types, not_null=_NOT_NULL):
+    return ",\n        ".join(
+        f"{column} {types[column]}{' NOT NULL' if column in not_null else ''}{_DEFAULTS.get(column, '')}"
+        for column in sorted(types, key=lambda column: _ALIGNMENT.get(types[column], 2))
+    )
+
+# option_chain columns as the latest-table seed reads them: a version 1 option_type is VARCHAR,
+# which (unlike its NUMERIC and TIMESTAMP columns) has no assignment cast to the new type
+_LATEST_SEED_COLUMNS = ", ".join(
+    "option_type::text::option_kind" if column == "option_type" else column for column in OPTION_CHAIN_TYPES
+)
+
+# Latest row of every live contract in option_chain, to seed option_chain_latest
+_LATEST_SEED_SQL = f"""
+    INSERT INTO option_chain_latest ({", ".join(OPTION_CHAIN_TYPES)})
+    SELECT DISTINCT ON (symbol, expiry_date, strike_price, option_type) {_LATEST_SEED_COLUMNS}
+    FROM option_chain
+    WHERE expiry_date >= CURRENT_DATE
+    ORDER BY symbol, expiry_date, strike_price, option_type, timestamp DESC
+"""
+
+SCHEMA_DDL = f"""
+    DO $$
+    BEGIN
+        CREATE TYPE option_kind AS ENUM ('CE', 'PE');
+    EXCEPTION WHEN duplicate_object THEN NULL;
+    END $$;
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+    -- option_chain is range-partitioned by expiry day; partitions are created as expiries
+    -- appear (see option_partitions), and per-contract queries read a single partition
+    CREATE TABLE IF NOT EXISTS option_chain (
+        {_column_list(OPTION_CHAIN_TYPES)},
+        PRIMARY KEY (symbol, strike_price, option_type, expiry_date, timestamp)
+    ) PARTITION BY RANGE (expiry_date);
+    -- Tables created before multi-symbol polling: existing rows are NIFTY, and the key needs
+    -- the symbol (option_ultimate's old layout is left to migrate). Checked first, as ALTER
+    -- TABLE takes an exclusive lock on option_chain even when there is nothing to change
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = 'option_chain' AND column_name = 'symbol'
+        ) THEN
+            ALTER TABLE option_chain ADD COLUMN symbol VARCHAR(20) NOT NULL DEFAULT 'NIFTY';
+        END IF;
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = 'option_chain' AND column_name = 'bs_fair_value'
+        ) AND NOT EXISTS (
+            SELECT 1
+            FROM pg_index i
+            JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+            WHERE i.indrelid = 'option_chain'::regclass AND i.indisprimary AND a.attname = 'symbol'
+        ) THEN
+            ALTER TABLE option_chain DROP CONSTRAINT IF EXISTS option_chain_pkey;
+            ALTER TABLE option_chain ADD PRIMARY KEY (symbol, strike_price, option_type, expiry_date, timestamp);
+        END IF;
+    END $$;
+    -- The underlying moves every minute, so it is recorded once per symbol and snapshot
+    -- rather than forcing a new row for every contract (see option_insert.store_option_snapshot_in_db)
+    CREATE TABLE IF NOT EXISTS option_underlying (
+        {_column_list(UNDERLYING_TYPES, {"symbol", "timestamp"})},
+        PRIMARY KEY (symbol, timestamp)
+    );
+    -- The current chain: one row per contract holding its latest stored values (timestamp is
+    -- when they last changed), upserted in the same transaction as the history rows, so
+    -- dashboards read O(contracts) rows however long option_chain gets
+    CREATE TABLE IF NOT EXISTS option_chain_latest (
+        {_column_list(OPTION_CHAIN_TYPES)}
+    );
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'option_chain_latest_pkey') THEN
+            ALTER TABLE option_chain_latest ADD PRIMARY KEY (symbol, expiry_date, strike_price, option_type);
+        END IF;
+        -- Matches the dashboards' filter and order, so they read it without a sort (checked
+        -- first: CREATE INDEX IF NOT EXISTS locks out writers before it finds the index)
+        IF to_regclass('option_chain_latest_traded_idx') IS NULL THEN
+            CREATE INDEX option_chain_latest_traded_idx
+                ON option_chain_latest (timestamp DESC, strike_price) WHERE total_traded_volume > 10000;
+        END IF;
+    END $$;
+    -- Seed from the history the first time (and after a purge left it empty)
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = 'option_chain' AND column_name = 'bs_fair_value'
+        ) AND NOT EXISTS (SELECT 1 FROM option_chain_latest) THEN
+            {_LATEST_SEED_SQL};
+        END IF;
+    END $$;
+    -- Greeks and fair values priced by option_ultimate (liquid contracts only)
+    CREATE TABLE IF NOT EXISTS option_greeks (
+        {_column_list(OPTION_GREEKS_TYPES)},
+        PRIMARY KEY ({", ".join(OPTION_GREEKS_KEY)})
+    );
+""" + ROLLUP_DDL + f"""
+    -- A new database is created at the current version; one with untyped (version 1)
+    -- columns left, or a migration still copying, stays at version 1 until
+    -- `python schema.py migrate` finishes and records it
+    INSERT INTO schema_version (version)
+    SELECT {SCHEMA_VERSION}
+    WHERE NOT EXISTS (SELECT 1 FROM schema_version) AND to_regclass('{OLD_TABLE}') IS NULL AND NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema()
+          AND table_name IN ({", ".join(f"'{table}'" for table in ["option_chain", "option_greeks", *SMALL_TABLE_TYPES])})
+          AND data_type IN ('numeric', 'text', 'timestamp without time zone')
+    );
+"""
+
+# Canonical spelling of the DDL types, as format_type reports them
+_TYPE_ALIASES = {"timestamptz": "timestamp with time zone", "varchar(20)": "character varying(20)"}
+
+def _canonical(type_name):
+    type_name = type_name.lower()
+    return _TYPE_ALIASES.get(type_name, type_name)
+
+# Version recorded in schema_version (1 for a database that predates it)
+def schema_version(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('schema_version') IS NOT NULL")
+        if cursor.fetchone()[0]:
+            cursor.execute("SELECT COALESCE(max(version), 1) FROM schema_version")
+            version = cursor.fetchone()[0]
+        else:
+            version = 1
+    conn.commit()
+    return version
+
+# Create any missing table (at the current version on a new database); returns the version
+def ensure_schema(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(SCHEMA_DDL)
+    conn.commit()
+    return schema_version(conn)
+
+def _column_types(cursor, table):
+    cursor.execute(
+        """
+        SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+        FROM pg_attribute a
+        WHERE a.attrelid = to_regclass(%s) AND a.attnum > 0 AND NOT a.attisdropped
+        """,
+        (table,),
+    )
+    return dict(cursor.fetchall())
+
+# Expression converting a column of old_type to new_type
+def _cast(column, old_type, new_type):
+    identifier = sql.Identifier(column)
+    if old_type in ("timestamp without time zone", "text") and _canonical(new_type) == "timestamp with time zone":
+        # Wall-clock IST, whatever the session's time zone
+        return sql.SQL("{}::timestamp AT TIME ZONE {}").format(identifier, sql.Literal(SESSION_TIMEZONE))
+    if new_type == "option_kind":
+        return sql.SQL("{}::text::option_kind").format(identifier)
+    return sql.SQL("{}::{}").format(identifier, sql.SQL(new_type))
+
+# Convert the columns of a table whose types differ from types, in one rewrite (no commit)
+def _alter_types(cursor, table, types):
+    current = _column_types(cursor, table)
+    changes = [
+        sql.SQL("ALTER COLUMN {} TYPE {} USING {}").format(
+            sql.Identifier(column), sql.SQL(type_name), _cast(column, current[column], type_name)
+        )
+        for column, type_name in types.items()
+        if column in current and current[column] != _canonical(type_name)
+    ]
+    if changes:
+        cursor.execute(sql.SQL("ALTER TABLE {} ").format(sql.Identifier(table)) + sql.SQL(", ").join(changes))
+    return len(changes)
+
+# Copy one expiry of the old table in key order, batch_rows per transaction
+def _copy_expiry(conn, old_types, expiry, batch_rows):
+    columns = [column for column in OPTION_CHAIN_TYPES if column in old_types]
+    select_list = sql.SQL(", ").join(_cast(column, old_types[column], OPTION_CHAIN_TYPES[column]) for column in columns)
+    return copy_expiry(conn, OLD_TABLE, expiry, columns, select_list, batch_rows=batch_rows)
+
+# Copy option_ultimate's old option_chain rows into option_greeks, batch_rows per transaction
+def _copy_legacy_greeks(conn, old_types, batch_rows, progress):
+    columns = [column for column in OPTION_GREEKS_TYPES if column in old_types]
+    select_list = sql.SQL(", ").join(
+        sql.SQL("COALESCE(symbol, 'NIFTY')") if column == "symbol"
+        else _cast(column, old_types[column], OPTION_GREEKS_TYPES[column])
+        for column in columns
+    )
+    query = sql.SQL("""
+        WITH batch AS (
+            SELECT * FROM {old} WHERE id > %s ORDER BY id LIMIT %s
+        ), inserted AS (
+            INSERT INTO option_greeks ({columns}) SELECT {select_list} FROM batch
+            WHERE strike_price IS NOT NULL AND expiry_date IS NOT NULL AND timestamp IS NOT NULL
+              AND option_type IN ('CE', 'PE')
+            ON CONFLICT DO NOTHING RETURNING 1
+        )
+        SELECT (SELECT count(*) FROM batch), (SELECT count(*) FROM inserted), (SELECT max(id) FROM batch)
+    """).format(old=sql.Identifier(OLD_TABLE), columns=sql.SQL(", ").join(map(sql.Identifier, columns)),
+                select_list=select_list)
+    copied = 0
+    last_id = 0
+    while True:
+        with conn.cursor() as cursor:
+            cursor.execute(query, (last_id, batch_rows))
+            read, inserted, last_id = cursor.fetchone()
+        conn.commit()
+        copied += inserted
+        if progress and read:
+            progress(f"Copied option_greeks rows up to id {last_id}: {copied:,} rows so far")
+        if read < batch_rows:
+            return copied
+
+# Expiries present in a table (a full scan: run it outside any transaction holding locks)
+def _distinct_expiries(conn, table):
+    with conn.cursor() as cursor:
+        cursor.execute(sql.SQL("SELECT DISTINCT expiry_date FROM {} ORDER BY 1").format(sql.Identifier(table)))
+        expiries = [row[0] for row in cursor.fetchall()]
+    conn.commit()
+    return expiries
+
+# Expiries to copy from the renamed table: its partitions', or a scan if it was not partitioned
+def _old_expiries(conn):
+    expiries = [expiry for _, expiry in list_partitions(conn, OLD_TABLE)]
+    conn.commit()
+    return expiries or _distinct_expiries(conn, OLD_TABLE)
+
+# Move the version 1 option_chain aside and put the typed table in its place (one transaction)
+def _swap_option_chain(conn):
+    with conn.cursor() as cursor:
+        old_types = _column_types(cursor, "option_chain")
+    conn.commit()
+    legacy = "bs_fair_value" in old_types  # option_ultimate's layout
+    partitioned = not legacy and is_partitioned(conn)
+    # Partitions for the expiries writers use; an unpartitioned table is scanned for them
+    # before the lock is taken (expiries only seen after it are created by the copy)
+    expiries = [] if legacy or partitioned else _distinct_expiries(conn, "option_chain")
+    with conn.cursor() as cursor:
+        cursor.execute("LOCK TABLE option_chain IN ACCESS EXCLUSIVE MODE")
+        partitions = list_partitions(conn) if partitioned else []
+        cursor.execute("ALTER TABLE option_chain RENAME TO " + OLD_TABLE)
+        cursor.execute("ALTER INDEX IF EXISTS option_chain_pkey RENAME TO " + OLD_TABLE + "_pkey")
+        if not legacy and "symbol" not in old_types:
+            # Never run by a multi-symbol version (which adds it): every row is NIFTY, and the
+            # copy is keyed by symbol. A constant default does not rewrite the table
+            cursor.execute(f"ALTER TABLE {OLD_TABLE} ADD COLUMN symbol VARCHAR(20) NOT NULL DEFAULT 'NIFTY'")
+            old_types["symbol"] = "character varying(20)"
+        # The new partitions take these names
+        for name, expiry in partitions:
+            old_name = partition_name(expiry, OLD_TABLE)
+            cursor.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(sql.Identifier(name), sql.Identifier(old_name)))
+            cursor.execute(sql.SQL("ALTER INDEX IF EXISTS {} RENAME TO {}").format(
+                sql.Identifier(f"{name}_pkey"), sql.Identifier(f"{old_name}_pkey")
+            ))
+        cursor.execute(SCHEMA_DDL)
+        for expiry in sorted({*expiries, *(expiry for _, expiry in partitions)}):
+            cursor.execute(
+                sql.SQL("CREATE TABLE {} PARTITION OF option_chain FOR VALUES FROM (%s) TO (%s)").format(
+                    sql.Identifier(partition_name(expiry))
+                ),
+                (expiry, expiry + timedelta(days=1)),
+            )
+    conn.commit()  # Writers use the typed table from here on
+    forget_partitions()
+    return old_types, legacy
+
+# Whether a version 1 option_chain is still to be converted or copied: the version is only
+# recorded once the copy is done, and an interrupted copy leaves OLD_TABLE behind
+def _migration_pending(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (OLD_TABLE,))
+        old_table_left = cursor.fetchone()[0]
+    conn.commit()
+    return old_table_left or schema_version(conn) < SCHEMA_VERSION
+
+# Whether a table already has the typed layout of OPTION_CHAIN_TYPES
+def _is_typed(conn, table="option_chain"):
+    with conn.cursor() as cursor:
+        types = _column_types(cursor, table)
+    conn.commit()
+    return all(types.get(column) == _canonical(type_name) for column, type_name in OPTION_CHAIN_TYPES.items())
+
+# Convert a version 1 database to SCHEMA_VERSION while writers keep running
+def migrate(conn, batch_rows=MIGRATION_BATCH_ROWS, drop_old=True, progress=print):
+    """
+    Args:
+        conn: psycopg2 connection with no transaction in progress (this commits).
+        batch_rows (int): Rows copied per transaction.
+        drop_old (bool): Drop the renamed version 1 table once its rows are copied.
+        progress (callable, optional): Called with a status line after each step.
+
+    Returns:
+        int: Rows copied (0 if the database was already at SCHEMA_VERSION).
+    """
+    if not _migration_pending(conn):
+        return 0
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s), to_regclass('option_chain')", (OLD_TABLE,))
+        resuming, existing = cursor.fetchone()
+        resuming_types = _column_types(cursor, OLD_TABLE) if resuming else None
+    conn.commit()
+
+    if resuming:  # An earlier run was interrupted after the swap: copy (again, skipping rows present)
+        old_types, legacy = resuming_types, "bs_fair_value" in resuming_types
+        ensure_schema(conn)
+    elif existing and not _is_typed(conn):
+        old_types, legacy = _swap_option_chain(conn)
+    else:
+        old_types, legacy = None, False
+        ensure_schema(conn)
+
+    for table, types in SMALL_TABLE_TYPES.items():
+        try:
+            with conn.cursor() as cursor:
+                changed = _alter_types(cursor, table, types)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        if progress and changed:
+            progress(f"Converted {changed} column(s) of {table}")
+
+    copied = 0
+    if old_types and legacy:
+        copied = _copy_legacy_greeks(conn, old_types, batch_rows, progress)
+    elif old_types:
+        # OLD_TABLE no longer takes writes, so this list is complete
+        expiries = _old_expiries(conn)
+        ensure_partitions(conn, expiries)
+        for expiry in expiries:
+            copied += _copy_expiry(conn, old_types, expiry, batch_rows)
+            if progress:
+                progress(f"Copied expiry {expiry}: {copied:,} rows so far")
+        # option_chain_latest was seeded while option_chain was still empty: add the live
+        # contracts writers have not stored since (theirs are newer than any copied row)
+        with conn.cursor() as cursor:
+            cursor.execute(_LATEST_SEED_SQL + " ON CONFLICT DO NOTHING")
+        conn.commit()
+        # Copied rows land between the ones writers added meanwhile, leaving the key index
+        # pages half full: rebuild it without blocking writers, then set the visibility map
+        # and statistics of the freshly written partition
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                for expiry in expiries:
+                    name = sql.Identifier(partition_name(expiry))
+                    cursor.execute(sql.SQL("REINDEX TABLE CONCURRENTLY {}").format(name))
+                    cursor.execute(sql.SQL("VACUUM (ANALYZE) {}").format(name))
+        finally:
+            conn.autocommit = False
+
+    with conn.cursor() as cursor:
+        if old_types and drop_old:
+            cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(OLD_TABLE)))
+        cursor.execute(
+            "INSERT INTO schema_version (version) VALUES (%s) ON CONFLICT DO NOTHING", (SCHEMA_VERSION,)
+        )
+    conn.commit()
+    return copied
+
+def main():
+    # Imported here: option_store imports this module for SCHEMA_DDL
+    from db_pool import get_maintenance_connection
+    from option_store import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Manage the option chain schema version.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="Show the schema version.")
+    migrate_parser = commands.add_parser("migrate", help=f"Convert the database to version {SCHEMA_VERSION} online.")
+    migrate_parser.add_argument("--batch-rows", type=int, default=MIGRATION_BATCH_ROWS, help="Rows per transaction.")
+    migrate_parser.add_argument(
+        "--keep-old", action="store_true", help=f"Keep {OLD_TABLE} after copying (the next migrate re-checks and drops it)."
+    )
+    args = parser.parse_args()
+
+    conn = get_maintenance_connection(DB_CONFIG)
+    try:
+        if args.command == "status":
+            print(f"Schema version {schema_version(conn)} (current: {SCHEMA_VERSION}).")
+        elif not _migration_pending(conn):
+            print(f"Already at schema version {SCHEMA_VERSION}.")
+        else:
+            copied = migrate(conn, args.batch_rows, drop_old=not args.keep_old)
+            print(f"Migrated {copied:,} rows to schema version {SCHEMA_VERSION}.")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Columnar representation of one option chain snapshot.
+
+A snapshot response is parsed once into a NumPy structured array with one row per contract
+and fixed little-endian dtypes (CE/PE as the is_call flag, expiry as days since 1970-01-01),
+plus the symbol and timestamp shared by every row. Pricing, the Kafka message (the raw
+buffer behind a one-line header) and the database rows are all produced from that array,
+instead of from a decoded dict per contract.
+
+Missing or malformed float fields are NaN (NULL in the database); missing or malformed
+quantities are 0.
+"""
+import json
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_VERSION = 1
+EPOCH = date(1970, 1, 1)
+
+# (array field, feed key, dtype) for the per-contract values read from the feed
+FEED_FIELDS = [
+    ("strike_price", "strikePrice", "<f8"),
+    ("open_interest", "openInterest", "<f8"),
+    ("change_in_open_interest", "changeinOpenInterest", "<f8"),
+    ("pchange_in_open_interest", "pchangeinOpenInterest", "<f8"),
+    ("total_traded_volume", "totalTradedVolume", "<i8"),
+    ("implied_volatility", "impliedVolatility", "<f8"),
+    ("last_price", "lastPrice", "<f8"),
+    ("change", "change", "<f8"),
+    ("p_change", "pChange", "<f8"),
+    ("total_buy_quantity", "totalBuyQuantity", "<i8"),
+    ("total_sell_quantity", "totalSellQuantity", "<i8"),
+    ("bid_qty", "bidQty", "<i8"),
+    ("bid_price", "bidprice", "<f8"),
+    ("ask_qty", "askQty", "<i8"),
+    ("ask_price", "askPrice", "<f8"),
+    ("underlying_value", "underlyingValue", "<f8"),
+]
+SNAPSHOT_DTYPE = np.dtype(
+    [("expiry_days", "<i4"), ("is_call", "?")] + [(field, dtype) for field, _, dtype in FEED_FIELDS]
+)
+
+OptionSnapshot = namedtuple("OptionSnapshot", ["symbol", "timestamp", "rows"])
+
+# Feed expiry ("09-Jan-2025") to days since the epoch; a chain only has a handful of expiries
+@lru_cache(maxsize=1024)
+def expiry_days(expiry_date):
+    return (datetime.strptime(expiry_date, "%d-%b-%Y").date() - EPOCH).days
+
+# Days since the epoch back to the feed's expiry format
+@lru_cache(maxsize=1024)
+def expiry_label(days):
+    return (EPOCH + timedelta(days=int(days))).strftime("%d-%b-%Y")
+
+# Parse the feed's records (each with optional CE and PE sides) into a snapshot
+def parse_snapshot(data, timestamp, symbol="NIFTY"):
+    """
+    Args:
+        data (list[dict]): optionChainData.records.data from the API response.
+        timestamp (str): Snapshot timestamp shared by every contract.
+        symbol (str): Index symbol.
+
+    Returns:
+        OptionSnapshot: symbol, timestamp and a SNAPSHOT_DTYPE array with CE rows before PE
+        rows. Sides without a parseable expiry are dropped.
+    """
+    sides = []
+    is_call = []
+    for option_type, flag in (("CE", True), ("PE", False)):
+        for record in data:
+            side = record.get(option_type)
+            if side is not None:
+                sides.append(side)
+                is_call.append(flag)
+
+    rows = np.zeros(len(sides), dtype=SNAPSHOT_DTYPE)
+    rows["is_call"] = is_call
+    expiries = []
+    for side in sides:
+        try:
+            expiries.append(expiry_days(side["expiryDate"]))
+        except (KeyError, TypeError, ValueError):
+            expiries.append(-1)
+    rows["expiry_days"] = expiries
+    for field, key, dtype in FEED_FIELDS:
+        values = numeric_column([side.get(key) for side in sides])
+        rows[field] = np.nan_to_num(values, nan=0.0) if dtype == "<i8" else values
+    return OptionSnapshot(symbol, timestamp, rows[rows["expiry_days"] >= 0])
+
+# Column-wise float conversion: None and missing keys become NaN, and so do malformed values
+# such as "-" or "" (checked per value only when the fast conversion fails)
+def numeric_column(values):
+    try:
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=float)
+
+# Underlying value of the snapshot (the feed repeats it on every contract)
+def snapshot_underlying(snapshot):
+    values = snapshot.rows["underlying_value"]
+    values = values[np.isfinite(values) & (values > 0)]
+    return float(values[0]) if values.size else None
+
+# Kafka/wire encoding: a one-line JSON header followed by the raw array buffer
+def encode_snapshot(snapshot):
+    header = {"version": SNAPSHOT_VERSION, "symbol": snapshot.symbol, "timestamp": snapshot.timestamp}
+    return json.dumps(header).encode("utf-8") + b"\n" + snapshot.rows.tobytes()
+
+def decode_snapshot(payload):
+    header, _, buffer = bytes(payload).partition(b"\n")
+    header = json.loads(header)
+    if header.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version: {header.get('version')}")
+    return OptionSnapshot(header["symbol"], header["timestamp"], np.frombuffer(buffer, dtype=SNAPSHOT_DTYPE))
+
+# Row tuples for a database table, in the given column order
+def snapshot_rows(snapshot, columns, integer_columns=(), real_columns=()):
+    """
+    Array fields are taken as they are (NaN becomes None), except that integer_columns are
+    rounded to ints and real_columns to single precision (the values BIGINT and REAL
+    columns store, so rows compare equal to the rows read back). The derived columns are
+    expiry_date (feed format), option_type ("CE"/"PE"), symbol and timestamp.
+    """
+    rows = snapshot.rows
+    values = []
+    for column in columns:
+        if column == "expiry_date":
+            values.append([expiry_label(days) for days in rows["expiry_days"].tolist()])
+        elif column == "option_type":
+            values.append(np.where(rows["is_call"], "CE", "PE").tolist())
+        elif column in ("symbol", "timestamp"):
+            values.append([getattr(snapshot, column)] * len(rows))
+        else:
+            column_values = rows[column]
+            if column_values.dtype.kind == "f":
+                missing = np.isnan(column_values)
+                if column in integer_columns:
+                    column_values = np.where(missing, 0, column_values).round().astype(np.int64)
+                elif column in real_columns:
+                    column_values = column_values.astype(np.float32).astype(np.float64)
+                column_values = np.where(missing, None, column_values)
+            values.append(column_values.tolist())
+    return list(zip(*values))
@@ -0,0 +1,94 @@
+import csv
+import io
+import time
+
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+
+PAGE_SIZE = 1000  # Rows per multi-row INSERT statement; a NIFTY snapshot fits in one or two pages
+
+# Keep the last row for every conflict key: ON CONFLICT DO UPDATE rejects a statement
+# that touches the same row twice
+def _dedupe(rows, columns, conflict_columns):
+    positions = [columns.index(column) for column in conflict_columns]
+    latest = {}
+    for row in rows:
+        latest[tuple(row[i] for i in positions)] = row
+    return list(latest.values())
+
+def _conflict_clause(conflict_columns, update_columns):
+    if not conflict_columns:
+        return sql.SQL("")
+    if not update_columns:
+        return sql.SQL(" ON CONFLICT ({}) DO NOTHING").format(sql.SQL(", ").join(map(sql.Identifier, conflict_columns)))
+    return sql.SQL(" ON CONFLICT ({}) DO UPDATE SET {}").format(
+        sql.SQL(", ").join(map(sql.Identifier, conflict_columns)),
+        sql.SQL(", ").join(
+            sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(column)) for column in update_columns
+        ),
+    )
+
+def _copy_rows(cursor, table, columns, rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)  # None is written as an empty field, which COPY reads as NULL
+    buffer.seek(0)
+    cursor.copy_expert(
+        sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(
+            sql.Identifier(table), sql.SQL(", ").join(map(sql.Identifier, columns))
+        ),
+        buffer,
+    )
+
+# Write every row of one snapshot in a single transaction
+def write_snapshot(conn, table, columns, rows, conflict_columns=None, update_columns=None,
+                   method="values", page_size=PAGE_SIZE):
+    """
+    Args:
+        conn: psycopg2 connection; committed on success, rolled back on error.
+        table (str): Target table.
+        columns (list[str]): Column names, in the order of the values in each row.
+        rows (list[tuple]): One tuple per record.
+        conflict_columns (list[str], optional): Unique key for the upsert; plain INSERT if omitted.
+        update_columns (list[str], optional): Columns overwritten on conflict (DO NOTHING if omitted).
+        method (str): "values" for multi-row INSERTs via execute_values, or "copy" to COPY into a
+            temporary staging table merged with one INSERT ... SELECT (COPY straight into the
+            table when there is no conflict key).
+        page_size (int): Rows per statement for the "values" method.
+
+    Returns:
+        dict: rows written, method and elapsed seconds.
+    """
+    start = time.perf_counter()
+    if conflict_columns:
+        rows = _dedupe(rows, columns, conflict_columns)
+    column_list = sql.SQL(", ").join(map(sql.Identifier, columns))
+    on_conflict = _conflict_clause(conflict_columns, update_columns)
+
+    try:
+        with conn.cursor() as cursor:
+            if method == "copy" and not conflict_columns:
+                _copy_rows(cursor, table, columns, rows)
+            elif method == "copy":
+                staging = f"{table}_staging"
+                cursor.execute(
+                    sql.SQL("CREATE TEMP TABLE {} (LIKE {} INCLUDING DEFAULTS) ON COMMIT DROP").format(
+                        sql.Identifier(staging), sql.Identifier(table)
+                    )
+                )
+                _copy_rows(cursor, staging, columns, rows)
+                cursor.execute(
+                    sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {}").format(
+                        sql.Identifier(table), column_list, column_list, sql.Identifier(staging)
+                    ) + on_conflict
+                )
+            elif method == "values":
+                query = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(sql.Identifier(table), column_list) + on_conflict
+                execute_values(cursor, query.as_string(conn), rows, page_size=page_size)
+            else:
+                raise ValueError(f"Unknown snapshot write method: {method}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return {"rows": len(rows), "method": method, "seconds": time.perf_counter() - start}
@@ -0,0 +1,94 @@
+import math
+
+import numpy as np
+import pytest
+from scipy.stats import norm
+
+from black_scholes import DAYS_IN_YEAR, black_scholes_greeks, implied_volatility
+from monte_carlo import TRADING_DAYS_IN_YEAR, gbm_step_parameters, price_gbm_european_adaptive
+
+# Textbook Black-Scholes for one contract, in the kernel's units (vega per 1%, theta per day)
+def scalar_greeks(S, K, T, r, sigma, is_call):
+    d1 = (math.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * math.sqrt(T))
+    d2 = d1 - sigma * math.sqrt(T)
+    discounted_K = K * math.exp(-r * T)
+    if is_call:
+        delta = norm.cdf(d1)
+        theta = -S * norm.pdf(d1) * sigma / (2 * math.sqrt(T)) - r * discounted_K * norm.cdf(d2)
+        rho = discounted_K * T * norm.cdf(d2)
+        fair_value = S * norm.cdf(d1) - discounted_K * norm.cdf(d2)
+    else:
+        delta = norm.cdf(d1) - 1
+        theta = -S * norm.pdf(d1) * sigma / (2 * math.sqrt(T)) + r * discounted_K * norm.cdf(-d2)
+        rho = -discounted_K * T * norm.cdf(-d2)
+        fair_value = discounted_K * norm.cdf(-d2) - S * norm.cdf(-d1)
+    gamma = norm.pdf(d1) / (S * sigma * math.sqrt(T))
+    vega = S * norm.pdf(d1) * math.sqrt(T) / 100
+    return delta, gamma, vega, theta / DAYS_IN_YEAR, rho, fair_value
+
+def random_chain(size, seed=0):
+    rng = np.random.default_rng(seed)
+    return (
+        rng.uniform(18000, 26000, size), rng.uniform(15000, 29000, size), rng.uniform(1, 90, size) / 365,
+        rng.uniform(0.0, 0.08, size), rng.uniform(0.08, 0.6, size), rng.random(size) < 0.5,
+    )
+
+def test_greeks_match_scalar_reference():
+    S, K, T, r, sigma, is_call = random_chain(500)
+
+    greeks = black_scholes_greeks(S, K, T, r, sigma, is_call)
+    expected = np.array([scalar_greeks(*contract) for contract in zip(S, K, T, r, sigma, is_call)])
+
+    for field, values in zip(greeks._fields, expected.T):
+        np.testing.assert_allclose(getattr(greeks, field), values, rtol=1e-9, atol=1e-9, err_msg=field)
+
+def test_greeks_are_nan_for_invalid_inputs():
+    greeks = black_scholes_greeks([22000, 22000, 0], 22000, [0.1, 0.0, 0.1], 0.05, [0.0, 0.2, 0.2], True)
+    assert np.isnan(np.array(greeks)).all()
+
+# A whole chain priced at known volatilities solves back to them; deep ITM/OTM quotes on or
+# outside the no-arbitrage bounds have no volatility and report non-convergence
+def test_implied_volatility_round_trip_on_chain():
+    S, K, T, r, sigma, is_call = random_chain(500, seed=1)
+    K = S * np.random.default_rng(2).uniform(0.85, 1.15, S.size)
+    greeks = black_scholes_greeks(S, K, T, r, sigma, is_call)
+    # Contracts with enough time value (vega) for the price to pin sigma down
+    S, K, T, r, sigma, is_call, prices = (
+        x[greeks.vega > 0.01] for x in (S, K, T, r, sigma, is_call, greeks.fair_value)
+    )
+
+    deep = np.array([0.3, 0.3, 3.0, 3.0]) * S[:4]
+    deep_is_call = np.array([True, False, True, False])
+    deep_prices = np.array([
+        S[0] - deep[0] * np.exp(-r[0] * T[0]),  # Deep ITM call quoted at intrinsic value
+        0.0,  # Deep OTM put with no time value
+        0.0,  # Deep OTM call with no time value
+        deep[3] * np.exp(-r[3] * T[3]) - S[3],  # Deep ITM put quoted at intrinsic value
+    ])
+
+    solved, converged = implied_volatility(
+        np.concatenate([prices, deep_prices]), np.concatenate([S, S[:4]]), np.concatenate([K, deep]),
+        np.concatenate([T, T[:4]]), np.concatenate([r, r[:4]]), np.concatenate([is_call, deep_is_call]),
+    )
+
+    assert converged[:S.size].all()
+    np.testing.assert_allclose(solved[:S.size], sigma, atol=1e-5)
+    assert not converged[S.size:].any()
+    assert np.isnan(solved[S.size:]).all()
+
+# The adaptive estimator prices the daily-step GBM: with r = 0 that is Black-Scholes at the
+# simulated horizon (whole trading days), which it matches within 3 standard errors
+@pytest.mark.parametrize("K, is_call", [(21000.0, True), (23000.0, True), (23000.0, False), (25000.0, False)])
+def test_adaptive_mc_within_three_standard_errors(K, is_call):
+    S0, T, sigma = 23000.0, 0.2, 0.15
+    horizon = gbm_step_parameters(T, sigma)[0] / TRADING_DAYS_IN_YEAR
+    control_value = black_scholes_greeks(S0, K, T, 0.0, sigma, is_call).fair_value
+    expected = black_scholes_greeks(S0, K, horizon, 0.0, sigma, is_call).fair_value
+
+    fair_value, std_error = price_gbm_european_adaptive(
+        S0, K, T, 0.0, sigma, is_call, control_value, tolerance=0.5, max_simulations=200_000,
+        rng=np.random.default_rng(11),
+    )
+
+    assert 0 < std_error <= 0.5
+    assert abs(fair_value - expected) <= 3 * std_error
@@ -0,0 +1,83 @@
+import random
+
+import numpy as np
+
+import option_ultimate
+from black_scholes import black_scholes_greeks
+from monte_carlo import TerminalPriceCache, price_gbm_chain
+from replay_server import SYNTHETIC_EXPIRIES, SYNTHETIC_STRIKES, synthetic_response
+from snapshot import parse_snapshot
+
+TIMESTAMP = "2026-10-17 10:00:00"
+
+def synthetic_snapshot(seed=0):
+    data = synthetic_response("NIFTY", SYNTHETIC_STRIKES, SYNTHETIC_EXPIRIES, random.Random(seed))
+    return parse_snapshot(data["optionChainData"]["records"]["data"], TIMESTAMP, "NIFTY")
+
+# A repeated snapshot is priced entirely from the cache: one entry per expiry, not per vol bucket
+def test_repeated_snapshot_hits_cache(monkeypatch):
+    cache = TerminalPriceCache()
+    monkeypatch.setattr(option_ultimate, "mc_cache", cache)
+    snapshot = synthetic_snapshot()
+
+    first = option_ultimate.process_option_chain(snapshot, TIMESTAMP, "NIFTY", workers=1)
+    misses = cache.misses
+    second = option_ultimate.process_option_chain(snapshot, TIMESTAMP, "NIFTY", workers=1)
+
+    assert 0 < misses <= SYNTHETIC_EXPIRIES
+    assert cache.misses == misses
+    assert cache.hits == misses
+    assert second == first
+
+# Every contract is simulated at its own sigma: with r = 0 and T a whole number of trading days
+# the daily-step GBM is Black-Scholes, so each price is within a few standard errors of it
+def test_gbm_chain_prices_each_contract_at_its_own_sigma():
+    S0, T, r = 23000.0, 63 / 252, 0.0
+    K = np.linspace(21000, 25000, 81)
+    sigma = np.linspace(0.11, 0.19, K.size)  # Every contract in a different vol bucket
+    is_call = K >= S0
+
+    fair_values, std_errors = price_gbm_chain(
+        TerminalPriceCache(), "NIFTY", "expiry", S0, K, T, r, sigma, is_call, 200_000, seed=7
+    )
+    expected = black_scholes_greeks(S0, K, T, r, sigma, is_call).fair_value
+
+    assert np.all(np.abs(fair_values - expected) <= 4 * std_errors)
+
+# With a Black-Scholes control and a tolerance every contract stops once its standard error is
+# below it, and agrees with the plain full-budget estimate
+def test_gbm_chain_control_variate_meets_tolerance():
+    S0, T, r = 23000.0, 63 / 252, 0.07
+    K = np.linspace(21000, 25000, 81)
+    sigma = np.linspace(0.11, 0.19, K.size)
+    is_call = K >= S0
+    expected = black_scholes_greeks(S0, K, T, r, sigma, is_call).fair_value
+
+    fair_values, std_errors = price_gbm_chain(
+        TerminalPriceCache(), "NIFTY", "expiry", S0, K, T, r, sigma, is_call, 200_000, seed=7,
+        control_values=expected, tolerance=0.5,
+    )
+    plain_values, plain_errors = price_gbm_chain(
+        TerminalPriceCache(), "NIFTY", "expiry", S0, K, T, r, sigma, is_call, 200_000, seed=7
+    )
+
+    assert np.all(std_errors <= 0.5)
+    assert np.all(np.abs(fair_values - plain_values) <= 4 * np.hypot(std_errors, plain_errors))
+
+# The Sobol sampler prices the chain from one cached set of scrambled points per expiry, within a
+# few (randomization) standard errors of Black-Scholes
+def test_gbm_chain_sobol_sampler():
+    S0, T, r = 23000.0, 63 / 252, 0.0
+    K = np.linspace(21000, 25000, 81)
+    sigma = np.linspace(0.11, 0.19, K.size)
+    is_call = K >= S0
+    cache = TerminalPriceCache()
+
+    fair_values, std_errors = price_gbm_chain(
+        cache, "NIFTY", "expiry", S0, K, T, r, sigma, is_call, 4096, seed=7, sampler="sobol", num_randomizations=8
+    )
+    expected = black_scholes_greeks(S0, K, T, r, sigma, is_call).fair_value
+
+    assert cache.misses == 1
+    assert np.all(np.isfinite(std_errors))
+    assert np.all(np.abs(fair_values - expected) <= 4 * std_errors + 1e-9)
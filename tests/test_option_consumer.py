@@ -0,0 +1,10 @@
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# The headless consumer (and the writer it shares with option_insert) must not pull in Streamlit
+def test_consumer_does_not_import_streamlit():
+    code = "import sys, option_consumer; sys.exit('streamlit' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT).returncode == 0
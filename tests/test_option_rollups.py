@@ -0,0 +1,28 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from option_rollups import SERIES_COLUMNS, _fill_buckets
+
+STEP = timedelta(minutes=5)
+
+def bucket(minute, price, volume, samples=1):
+    return {
+        "timestamp": datetime(2026, 10, 16, 10, 0) + timedelta(minutes=minute), "open": price, "high": price + 1,
+        "low": price - 1, "last_price": price, "open_interest": 100, "total_traded_volume": volume,
+        "volume": 10, "implied_volatility": 15.0, "samples": samples,
+    }
+
+# Buckets without a row carry the previous bucket forward (flat, no volume), including the one
+# before the range, which is dropped afterwards
+def test_fill_buckets_carries_values_forward():
+    df = pd.DataFrame([bucket(-20, 50.0, 500), bucket(10, 52.0, 600)], columns=SERIES_COLUMNS)
+
+    filled = _fill_buckets(df, STEP, datetime(2026, 10, 16, 10, 2), datetime(2026, 10, 16, 10, 20))
+
+    assert filled["timestamp"].dt.minute.tolist() == [0, 5, 10, 15, 20]
+    assert filled["last_price"].tolist() == [50.0, 50.0, 52.0, 52.0, 52.0]
+    assert filled["high"].tolist() == [50.0, 50.0, 53.0, 52.0, 52.0]
+    assert filled["volume"].tolist() == [0, 0, 10, 0, 0]
+    assert filled["samples"].tolist() == [0, 0, 1, 0, 0]
+    assert filled["total_traded_volume"].tolist() == [500, 500, 600, 600, 600]
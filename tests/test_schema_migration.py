@@ -0,0 +1,126 @@
+"""
+Scripted migration of a version 1 database (the original NUMERIC/VARCHAR/TIMESTAMP
+option_chain) to the current schema. Needs PostgreSQL: set OPTION_TEST_DSN to a libpq
+connection string, e.g. "dbname=postgres user=postgres host=localhost"; the test works in
+a scratch schema that it drops afterwards.
+"""
+import os
+from datetime import date, datetime, timedelta
+
+import psycopg2
+import pytest
+
+import option_partitions
+from db_pool import SESSION_TIMEZONE
+from schema import OPTION_CHAIN_TYPES, SCHEMA_VERSION, _canonical, migrate, schema_version
+
+TEST_SCHEMA = "option_migration_test"
+EXPIRIES = [date(2026, 10, 22), date(2026, 10, 29)]
+STRIKES = [22000 + 50 * i for i in range(20)]
+MINUTES = 15
+
+# The option_chain table as the first release created it
+V1_DDL = """
+    CREATE TABLE option_chain (
+        strike_price NUMERIC NOT NULL,
+        expiry_date DATE NOT NULL,
+        option_type VARCHAR(2) NOT NULL,
+        open_interest NUMERIC,
+        change_in_open_interest NUMERIC,
+        pchange_in_open_interest NUMERIC,
+        total_traded_volume NUMERIC,
+        implied_volatility NUMERIC,
+        last_price NUMERIC,
+        change NUMERIC,
+        p_change NUMERIC,
+        total_buy_quantity NUMERIC,
+        total_sell_quantity NUMERIC,
+        bid_qty NUMERIC,
+        bid_price NUMERIC,
+        ask_qty NUMERIC,
+        ask_price NUMERIC,
+        underlying_value NUMERIC,
+        timestamp TIMESTAMP NOT NULL,
+        PRIMARY KEY (strike_price, option_type, expiry_date, timestamp)
+    );
+"""
+
+@pytest.fixture
+def conn(monkeypatch):
+    dsn = os.environ.get("OPTION_TEST_DSN")
+    if not dsn:
+        pytest.skip("OPTION_TEST_DSN is not set")
+    try:
+        admin = psycopg2.connect(dsn)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL is not reachable: {e}")
+    admin.autocommit = True
+    with admin.cursor() as cursor:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE; CREATE SCHEMA {TEST_SCHEMA}")
+    monkeypatch.setattr(option_partitions, "_known_partitions", {})
+    # Like db_pool.get_maintenance_connection, confined to the scratch schema
+    conn = psycopg2.connect(dsn, options=f"-c search_path={TEST_SCHEMA} -c timezone={SESSION_TIMEZONE}")
+    try:
+        yield conn
+    finally:
+        conn.close()
+        with admin.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA {TEST_SCHEMA} CASCADE")
+        admin.close()
+
+def v1_rows():
+    start = datetime(2026, 10, 16, 9, 15)
+    for minute in range(MINUTES):
+        for expiry in EXPIRIES:
+            for strike in STRIKES:
+                for option_type in ("CE", "PE"):
+                    yield (
+                        strike, expiry, option_type, 1000 + minute, -5, -0.25, 500 * minute, 14.5, 100.05 + minute,
+                        1.5, 0.75, 2000, 1800, 75, 99.95, 150, 100.15, 22345.6, start + timedelta(minutes=minute),
+                    )
+
+def column_types(cursor, table):
+    cursor.execute(
+        """
+        SELECT attname, format_type(atttypid, atttypmod) FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+        """,
+        (table,),
+    )
+    return dict(cursor.fetchall())
+
+def test_migrate_v1_database(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(V1_DDL)
+        cursor.executemany(f"INSERT INTO option_chain VALUES ({', '.join(['%s'] * 19)})", list(v1_rows()))
+    conn.commit()
+    expected_rows = MINUTES * len(EXPIRIES) * len(STRIKES) * 2
+    assert schema_version(conn) == 1
+
+    copied = migrate(conn, batch_rows=250, progress=None)
+
+    assert copied == expected_rows
+    assert schema_version(conn) == SCHEMA_VERSION
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT count(*), count(DISTINCT expiry_date), min(symbol), max(symbol) FROM option_chain")
+        assert cursor.fetchone() == (expected_rows, len(EXPIRIES), "NIFTY", "NIFTY")
+        cursor.execute("SELECT count(*) FROM option_chain_latest")
+        assert cursor.fetchone()[0] == len(EXPIRIES) * len(STRIKES) * 2
+        cursor.execute("SELECT to_regclass('option_chain_v1')")
+        assert cursor.fetchone()[0] is None
+        assert {column: _canonical(type_name) for column, type_name in column_types(cursor, "option_chain").items()} \
+            == {column: _canonical(type_name) for column, type_name in OPTION_CHAIN_TYPES.items()}
+        cursor.execute(
+            """
+            SELECT open_interest, total_traded_volume, last_price, option_type::text, timestamp
+            FROM option_chain
+            WHERE strike_price = 22000 AND option_type = 'CE' AND expiry_date = %s
+            ORDER BY timestamp DESC LIMIT 1
+            """,
+            (EXPIRIES[0],),
+        )
+        open_interest, volume, last_price, option_type, timestamp = cursor.fetchone()
+    conn.commit()
+    assert (open_interest, volume, option_type) == (1000 + MINUTES - 1, 500 * (MINUTES - 1), "CE")
+    assert last_price == pytest.approx(100.05 + MINUTES - 1, rel=1e-6)
+    assert timestamp.replace(tzinfo=None) == datetime(2026, 10, 16, 9, 15) + timedelta(minutes=MINUTES - 1)
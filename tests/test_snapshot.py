@@ -0,0 +1,25 @@
+import random
+
+import numpy as np
+
+from replay_server import SYNTHETIC_EXPIRIES, SYNTHETIC_STRIKES, synthetic_response
+from snapshot import parse_snapshot
+
+TIMESTAMP = "2026-10-17 10:00:00"
+
+# One malformed value ("-" or "") is NaN (0 for quantities) in its own row only; the rest of the
+# snapshot parses as usual
+def test_malformed_value_does_not_drop_snapshot():
+    response = synthetic_response("NIFTY", SYNTHETIC_STRIKES, SYNTHETIC_EXPIRIES, random.Random(0))
+    records = response["optionChainData"]["records"]["data"]
+    clean = parse_snapshot(records, TIMESTAMP, "NIFTY").rows
+
+    records[0]["CE"]["lastPrice"] = "-"
+    records[0]["CE"]["totalTradedVolume"] = ""
+    rows = parse_snapshot(records, TIMESTAMP, "NIFTY").rows
+
+    assert rows.size == clean.size
+    assert np.isnan(rows["last_price"][0])
+    assert rows["total_traded_volume"][0] == 0
+    np.testing.assert_array_equal(rows["last_price"][1:], clean["last_price"][1:])
+    np.testing.assert_array_equal(rows["strike_price"], clean["strike_price"])
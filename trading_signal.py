@@ -1,10 +1,13 @@
 import streamlit as st
 import pandas as pd
-import psycopg2
+import numpy as np
+from db_pool import get_connection
+from option_poller import SYMBOLS
+from cold_storage import fetch_history
 import matplotlib.pyplot as plt
 from datetime import datetime
-from math import log, sqrt
-from scipy.stats import norm
+from black_scholes import option_type_flags
+from greeks_cache import get_shared_greeks_cache
 
 # Constants and configuration
 DB_CONFIG = {
@@ -17,37 +20,26 @@ DB_CONFIG = {
 
 LOT_SIZE = 75  # Each option lot size
 
-# Establish a connection to the PostgreSQL database
+# Establish a connection to the PostgreSQL database (pooled; conn.close() returns it to the pool)
 def get_db_connection():
     try:
-        conn = psycopg2.connect(
-            dbname=DB_CONFIG["dbname"],
-            user=DB_CONFIG["user"],
-            password=DB_CONFIG["password"],
-            host=DB_CONFIG["host"],
-            port=DB_CONFIG["port"],
-        )
-        return conn
+        return get_connection(DB_CONFIG)
     except Exception as e:
         st.error(f"Error connecting to PostgreSQL: {e}")
         return None
 
 # Fetch option chain data based on user inputs
-def fetch_option_chain_data(strike_price, expiry_date, option_type):
-    query = """
-        SELECT timestamp, strike_price, expiry_date, option_type, open_interest, change_in_open_interest,
-               pchange_in_open_interest, total_traded_volume, implied_volatility, last_price, change, p_change,
-               total_buy_quantity, total_sell_quantity, bid_qty, bid_price, ask_qty, ask_price, underlying_value
-        FROM option_chain
-        WHERE strike_price = %s
-          AND expiry_date = %s
-          AND option_type = %s
-        ORDER BY timestamp ASC;
-    """
+def fetch_option_chain_data(strike_price, expiry_date, option_type, symbol="NIFTY"):
+    columns = [
+        "timestamp", "strike_price", "expiry_date", "option_type", "open_interest", "change_in_open_interest",
+        "pchange_in_open_interest", "total_traded_volume", "implied_volatility", "last_price", "change", "p_change",
+        "total_buy_quantity", "total_sell_quantity", "bid_qty", "bid_price", "ask_qty", "ask_price", "underlying_value",
+    ]
     conn = get_db_connection()
     if conn:
         try:
-            df = pd.read_sql_query(query, conn, params=(strike_price, expiry_date, option_type))
+            # PostgreSQL plus any archived (Parquet) history, oldest first
+            df = fetch_history(conn, symbol, expiry_date, strike_price, option_type, columns=columns)
             return df
         except Exception as e:
             st.error(f"Error fetching data: {e}")
@@ -70,17 +62,9 @@ def calculate_delta(option_type, S, K, T, r, sigma):
     Returns:
         float: Delta value.
     """
-    if S <= 0 or K <= 0 or T <= 0 or sigma <= 0:
-        return 0.0
-
     try:
-        d1 = (log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * sqrt(T))
-        if option_type == "CE":  # Call option delta
-            return norm.cdf(d1)
-        elif option_type == "PE":  # Put option delta
-            return -norm.cdf(-d1)
-        else:
-            raise ValueError("Invalid option type. Use 'CE' for Call or 'PE' for Put.")
+        delta = get_shared_greeks_cache().lookup(S, K, T, r, sigma, option_type_flags(option_type)).delta
+        return 0.0 if np.isnan(delta) else float(delta)
     except Exception as e:
         st.error(f"Error calculating Delta: {e}")
         return 0.0
@@ -97,13 +81,14 @@ def main():
     st.sidebar.title("Option Filter")
 
     # Get user inputs
+    symbol = st.sidebar.selectbox("Select Symbol:", SYMBOLS)
     strike_price = st.sidebar.number_input("Enter Strike Price:", min_value=0.0, value=0.0, step=0.5)
     expiry_date = st.sidebar.date_input("Select Expiry Date:", min_value=datetime(2020, 1, 1))
     option_type = st.sidebar.selectbox("Select Option Type (CE/PE):", ["CE", "PE"])
 
     if st.sidebar.button("Fetch and Compute Delta"):
         with st.spinner("Fetching data..."):
-            data = fetch_option_chain_data(strike_price, expiry_date, option_type)
+            data = fetch_option_chain_data(strike_price, expiry_date, option_type, symbol)
             if data is not None and not data.empty:
                 st.success("Data fetched successfully!")
                 # Ensure timestamp is a datetime type and compute time to expiration
@@ -111,15 +96,16 @@ def main():
                 expiry_date_ts = pd.Timestamp(expiry_date)
                 data["time_to_expiry"] = (expiry_date_ts - data["timestamp"]).dt.days / 365.0
 
-                # Compute delta for each record
-                data["delta"] = data.apply(lambda row: calculate_delta(
-                    row["option_type"],
-                    row["underlying_value"],
-                    row["strike_price"],
-                    row["time_to_expiry"],
+                # Compute delta for every record, reusing cached evaluations from earlier reruns
+                delta = get_shared_greeks_cache().lookup(
+                    data["underlying_value"].to_numpy(dtype=float),
+                    data["strike_price"].to_numpy(dtype=float),
+                    data["time_to_expiry"].to_numpy(dtype=float),
                     0.05,  # risk-free rate; adjust as necessary
-                    row["implied_volatility"]
-                ), axis=1)
+                    data["implied_volatility"].to_numpy(dtype=float),
+                    option_type_flags(data["option_type"].to_numpy()),
+                ).delta
+                data["delta"] = np.nan_to_num(delta, nan=0.0)
 
                 # Generate trading signals based on delta values
                 data["trading_signal"] = data["delta"].apply(generate_trading_signal)
@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
-import psycopg2
+from db_pool import get_connection
+from option_poller import SYMBOLS
+from cold_storage import fetch_history
 import matplotlib.pyplot as plt
 import numpy as np
 from datetime import datetime
@@ -14,39 +16,22 @@ DB_CONFIG = {
     "port": 5432,
 }
 
-# Connect to PostgreSQL Database
+# Connect to PostgreSQL Database (pooled; conn.close() returns it to the pool)
 def get_db_connection():
     try:
-        conn = psycopg2.connect(
-            dbname=DB_CONFIG["dbname"],
-            user=DB_CONFIG["user"],
-            password=DB_CONFIG["password"],
-            host=DB_CONFIG["host"],
-            port=DB_CONFIG["port"],
-        )
-        return conn
+        return get_connection(DB_CONFIG)
     except Exception as e:
         st.error(f"Error connecting to PostgreSQL: {e}")
         return None
 
 # Fetch Option Data
-def fetch_option_data(expiry_date, strike_price_range=None):
-    query = f"""
-        SELECT *
-        FROM option_chain
-        WHERE expiry_date = %s
-    """
-    params = [expiry_date]
-    if strike_price_range:
-        query += " AND strike_price BETWEEN %s AND %s"
-        params.extend(strike_price_range)
-    query += " ORDER BY strike_price ASC;"
-    
+def fetch_option_data(expiry_date, strike_price_range=None, symbol="NIFTY"):
     conn = get_db_connection()
     if conn:
         try:
-            df = pd.read_sql_query(query, conn, params=params)
-            return df
+            # PostgreSQL plus any archived (Parquet) history
+            df = fetch_history(conn, symbol, expiry_date, strike_range=strike_price_range)
+            return df.sort_values("strike_price", kind="stable").reset_index(drop=True)
         except Exception as e:
             st.error(f"Error fetching data from PostgreSQL: {e}")
             return None
@@ -129,6 +114,7 @@ def main():
     st.title("📊 Options Trading Strategy Analyzer with Profit/Loss")
     
     # User Inputs
+    symbol = st.sidebar.selectbox("Select Symbol:", SYMBOLS)
     expiry_date = st.sidebar.date_input("Select Expiry Date:", min_value=datetime(2020, 1, 1))
     strategy = st.sidebar.selectbox("Select Strategy:", ["Straddle", "Iron Condor", "Calendar Spread"])
     
@@ -142,7 +128,7 @@ def main():
     
     if st.sidebar.button("Analyze Strategy"):
         with st.spinner("Fetching data..."):
-            df = fetch_option_data(expiry_date)
+            df = fetch_option_data(expiry_date, symbol=symbol)
             if df is not None and not df.empty:
                 st.success(f"Data fetched successfully! Total records: {len(df)}")
                 